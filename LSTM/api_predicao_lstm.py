@@ -1,22 +1,49 @@
-import numpy as np
+import os
+import sys
 import joblib
-from tensorflow.keras.models import load_model
 from flask import Flask, jsonify, request
+from inferencia_numpy import BufferPorThread, NormalizacaoAfim, carregar_modelo_numpy
+
+# 'metricas.py' fica na raiz do projeto (a API roda de dentro da pasta LSTM)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metricas import RegistroMetricas, instrumentar_flask
+from perfilamento import instrumentar_perfil_flask
 
 print("Iniciando a API de predição com LSTM...")
 
+# 'keras' (padrão) ou 'numpy' para servir sem importar o TensorFlow
+BACKEND_INFERENCIA = os.environ.get('BACKEND_INFERENCIA', 'keras')
+
 # --- 1. CARREGAR OS ARTEFATOS TREINADOS ---
 try:
-    modelo_lstm = load_model('modelo_dengue_lstm.keras')
+    if BACKEND_INFERENCIA == 'numpy':
+        modelo_lstm = carregar_modelo_numpy('modelo_dengue_lstm.keras')
+    else:
+        from tensorflow.keras.models import load_model
+        modelo_lstm = load_model('modelo_dengue_lstm.keras')
     scaler = joblib.load('scaler.joblib')
-    print("Modelo LSTM e normalizador carregados.")
+    # O scaler foi ajustado com 5 colunas (4 features + risco_surto): ficamos só
+    # com scale_/min_ das 4 features que o modelo usa, em float32
+    normalizacao = NormalizacaoAfim.do_scaler(scaler, colunas=range(4))
+    print(f"Modelo LSTM (backend '{BACKEND_INFERENCIA}') e normalizador carregados.")
 except Exception as e:
     print(f"Erro ao carregar os artefatos: {e}")
     modelo_lstm = None
     scaler = None
+    normalizacao = None
+
+# Entrada [1, 14, 4] de cada thread, reaproveitada entre requisições
+buffer_entrada = BufferPorThread((14, 4))
     
 app = Flask(__name__)
 
+# Métricas por etapa em '/metrics' (formato Prometheus) e prontidão em '/health'
+metricas = RegistroMetricas('lstm_')
+etapas = metricas.histograma('etapa_segundos', "Duração de cada etapa da requisição.", ('etapa',))
+instrumentar_flask(app, metricas, lambda: modelo_lstm is not None and scaler is not None)
+# Perfil de uma requisição sob demanda (cabeçalho X-Perfil; ver perfilamento.py)
+instrumentar_perfil_flask(app)
+
 # --- 2. ROTA DE PREDIÇÃO ---
 @app.route('/prever_surto_dengue', methods=['POST'])
 def prever_surto():
@@ -45,31 +72,27 @@ def prever_surto():
 
     # --- 4. PREPARAR OS DADOS PARA PREDIÇÃO ---
     try:
-        # Convertendo para numpy array
-        dados_np = np.array(sequencia)
-
-        # Criamos um 'dummy' array com o formato que o scaler espera (5 colunas)
-        # para poder usar o '.transform' apenas nas nossas 4 colunas.
-        dados_completos_dummy = np.zeros((dados_np.shape[0], 5))
-        dados_completos_dummy[:, :-1] = dados_np # Preenche as 4 primeiras colunas
-        
-        # Normaliza os dados usando o MESMO scaler do treinamento
-        dados_normalizados = scaler.transform(dados_completos_dummy)[:, :-1] # Pega apenas as 4 colunas normalizadas
+        with etapas.cronometrar(etapa='normalizacao'):
+            # Copia a sequência direto para o buffer float32 [1, 14, 4] que o LSTM espera
+            dados_para_previsao = buffer_entrada.obter(1)
+            dados_para_previsao[0] = sequencia
 
-        # Remodela para o formato 3D que o LSTM espera: [1, 14, 4]
-        dados_para_previsao = np.reshape(dados_normalizados, (1, 14, 4))
+            # Normaliza no próprio buffer com os parâmetros do MESMO scaler do treinamento
+            normalizacao.aplicar(dados_para_previsao)
     except Exception as e:
         return jsonify({"erro": f"Erro no processamento dos dados de entrada: {e}"}), 400
 
     # --- 5. FAZER A PREDIÇÃO ---
-    probabilidade_surto = modelo_lstm.predict(dados_para_previsao)[0][0]
+    with etapas.cronometrar(etapa='predict'):
+        probabilidade_surto = modelo_lstm.predict(dados_para_previsao, verbose=0)[0][0]
 
     resultado = {
         "probabilidade_surto": f"{probabilidade_surto * 100:.2f}%",
         "nivel_risco": "ALTO" if probabilidade_surto > 0.5 else "BAIXO"
     }
     
-    return jsonify(resultado)
+    with etapas.cronometrar(etapa='serializacao_json'):
+        return jsonify(resultado)
 
 if __name__ == '__main__':
     app.run(port=5001, debug=True) # Usando a porta 5001 para não conflitar com a outra API
\ No newline at end of file
@@ -0,0 +1,202 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.preprocessing import MinMaxScaler
+
+# -----------------------------------------------------------------------------
+# DATASET DE JANELAS FORA DA MEMÓRIA (OUT-OF-CORE) PARA O TREINO DO LSTM
+# -----------------------------------------------------------------------------
+# O histórico (anos de observações de 3h de todos os bairros) fica num arquivo
+# binário float32 lido por memória mapeada; nada é carregado inteiro. As
+# janelas de 'look_back' passos são views (sliding_window_view) de um bloco
+# do arquivo, e o embaralhamento é feito num buffer de tamanho fixo: a
+# memória usada não cresce com o tamanho do histórico.
+#
+# Formato do diretório do histórico:
+#   features.f32     linhas (n_linhas, n_colunas) em float32, série após série
+#   metadados.json   colunas, n_linhas e o intervalo [inicio, fim) de cada série
+#   scaler.joblib    MinMaxScaler ajustado (partial_fit) enquanto o arquivo é gravado
+#
+# As linhas de cada série (bairro) devem vir em ordem cronológica e as séries
+# não podem se intercalar: uma janela nunca atravessa duas séries.
+
+ARQUIVO_FEATURES = 'features.f32'
+ARQUIVO_METADADOS = 'metadados.json'
+ARQUIVO_SCALER = 'scaler.joblib'
+COLUNAS_PADRAO = ['temperatura', 'umidade', 'chuva_mm', 'iip_bairro', 'risco_surto']
+
+
+# --- 1. GRAVAÇÃO DO HISTÓRICO ---
+
+def gravar_historico(diretorio, blocos, colunas=COLUNAS_PADRAO):
+    """
+    Grava o histórico a partir de um iterável de (nome_da_serie, DataFrame),
+    bloco a bloco: só um bloco fica em memória de cada vez. Blocos seguidos
+    da mesma série são concatenados na mesma série.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    series = []
+    n_linhas = 0
+
+    with open(os.path.join(diretorio, ARQUIVO_FEATURES), 'wb') as arquivo:
+        for nome_serie, bloco in blocos:
+            valores = np.ascontiguousarray(bloco[colunas].to_numpy(dtype=np.float32))
+            if len(valores) == 0:
+                continue
+            arquivo.write(valores.tobytes())
+            scaler.partial_fit(bloco[colunas])
+            if series and series[-1]['nome'] == str(nome_serie):
+                series[-1]['fim'] += len(valores)
+            else:
+                series.append({'nome': str(nome_serie), 'inicio': n_linhas, 'fim': n_linhas + len(valores)})
+            n_linhas += len(valores)
+
+    with open(os.path.join(diretorio, ARQUIVO_METADADOS), 'w', encoding='utf-8') as f:
+        json.dump({'colunas': list(colunas), 'n_linhas': n_linhas, 'series': series}, f, ensure_ascii=False, indent=2)
+    joblib.dump(scaler, os.path.join(diretorio, ARQUIVO_SCALER))
+    print(f"Histórico gravado em '{diretorio}': {n_linhas} linhas, {len(series)} série(s).")
+    return n_linhas
+
+
+def _blocos_por_serie(lotes, coluna_serie):
+    """Quebra cada lote lido do disco nas séries que ele contém (na ordem em que aparecem)."""
+    for lote in lotes:
+        if coluna_serie is None:
+            yield 'serie', lote
+            continue
+        codigos = lote[coluna_serie].to_numpy()
+        mudancas = np.flatnonzero(codigos[1:] != codigos[:-1]) + 1
+        for inicio, fim in zip(np.r_[0, mudancas], np.r_[mudancas, len(lote)]):
+            yield codigos[inicio], lote.iloc[inicio:fim]
+
+
+def gravar_de_csv(caminho_csv, diretorio, coluna_serie=None, colunas=COLUNAS_PADRAO, linhas_por_lote=100_000):
+    """Converte um CSV (ordenado por série e tempo) lendo 'linhas_por_lote' linhas por vez."""
+    lotes = pd.read_csv(caminho_csv, chunksize=linhas_por_lote)
+    return gravar_historico(diretorio, _blocos_por_serie(lotes, coluna_serie), colunas)
+
+
+def gravar_de_parquet(caminho_parquet, diretorio, coluna_serie=None, colunas=COLUNAS_PADRAO, linhas_por_lote=100_000):
+    """Igual a 'gravar_de_csv', lendo o Parquet em lotes (precisa do pyarrow instalado)."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Leitura de Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+
+    arquivo = pq.ParquetFile(caminho_parquet)
+    leitura = colunas + ([coluna_serie] if coluna_serie else [])
+    lotes = (lote.to_pandas() for lote in arquivo.iter_batches(batch_size=linhas_por_lote, columns=leitura))
+    return gravar_historico(diretorio, _blocos_por_serie(lotes, coluna_serie), colunas)
+
+
+# --- 2. LEITURA EM JANELAS ---
+
+class DatasetJanelas:
+    """
+    Itera (X, y) em lotes de 'tamanho_lote':
+      X: (lote, look_back, n_entradas) com as colunas de entrada normalizadas
+      y: (lote,) com a coluna alvo normalizada do passo seguinte à janela
+
+    Cada época percorre os blocos de 'janelas_por_bloco' janelas em ordem
+    aleatória, copia as janelas de cada bloco para um buffer de
+    'tamanho_buffer' janelas e, com o buffer cheio, emite os lotes numa
+    permutação aleatória dele. Memória: ~tamanho_buffer * look_back * colunas
+    floats, independente do tamanho do histórico.
+    """
+
+    def __init__(self, diretorio, look_back=14, tamanho_lote=32, tamanho_buffer=10_000,
+                 janelas_por_bloco=2048, coluna_alvo='risco_surto', scaler=None, semente=None):
+        with open(os.path.join(diretorio, ARQUIVO_METADADOS), encoding='utf-8') as f:
+            self.metadados = json.load(f)
+        colunas = self.metadados['colunas']
+        self.features = np.memmap(os.path.join(diretorio, ARQUIVO_FEATURES), dtype=np.float32, mode='r',
+                                  shape=(self.metadados['n_linhas'], len(colunas)))
+        self.scaler = scaler if scaler is not None else joblib.load(os.path.join(diretorio, ARQUIVO_SCALER))
+        # Normalização do MinMaxScaler como multiplicação + soma, aplicada por bloco
+        self._escala = np.asarray(self.scaler.scale_, dtype=np.float32)
+        self._deslocamento = np.asarray(self.scaler.min_, dtype=np.float32)
+
+        self.look_back = look_back
+        self.tamanho_lote = tamanho_lote
+        self.tamanho_buffer = max(tamanho_buffer, tamanho_lote)
+        self.indice_alvo = colunas.index(coluna_alvo)
+        self.indices_entrada = [i for i in range(len(colunas)) if i != self.indice_alvo]
+        self.rng = np.random.default_rng(semente)
+
+        # Blocos (início, nº de janelas): janela começando em 's' usa as linhas
+        # [s, s + look_back) e o alvo da linha s + look_back, dentro da mesma série
+        self.blocos = []
+        for serie in self.metadados['series']:
+            ultimo_inicio = serie['fim'] - look_back  # exclusivo
+            for inicio in range(serie['inicio'], ultimo_inicio, janelas_por_bloco):
+                self.blocos.append((inicio, min(janelas_por_bloco, ultimo_inicio - inicio)))
+        self.n_janelas = sum(n for _, n in self.blocos)
+
+    def __len__(self):
+        """Número de lotes por época."""
+        return -(-self.n_janelas // self.tamanho_lote)
+
+    @property
+    def n_entradas(self):
+        return len(self.indices_entrada)
+
+    def _janelas_do_bloco(self, inicio, n_janelas):
+        """Lê as linhas do bloco do disco, normaliza e devolve as janelas como view."""
+        linhas = self.features[inicio:inicio + n_janelas + self.look_back]
+        normalizado = linhas * self._escala + self._deslocamento
+        entradas = normalizado[:-1, self.indices_entrada]
+        # (n_janelas, n_entradas, look_back) -> (n_janelas, look_back, n_entradas), sem cópia
+        janelas = sliding_window_view(entradas, self.look_back, axis=0).transpose(0, 2, 1)
+        return janelas, normalizado[self.look_back:, self.indice_alvo]
+
+    def __iter__(self):
+        buffer_x = np.empty((self.tamanho_buffer, self.look_back, self.n_entradas), dtype=np.float32)
+        buffer_y = np.empty(self.tamanho_buffer, dtype=np.float32)
+        ocupado = 0
+
+        for b in self.rng.permutation(len(self.blocos)):
+            janelas, alvos = self._janelas_do_bloco(*self.blocos[b])
+            copiadas = 0
+            while copiadas < len(janelas):
+                n = min(len(janelas) - copiadas, self.tamanho_buffer - ocupado)
+                buffer_x[ocupado:ocupado + n] = janelas[copiadas:copiadas + n]
+                buffer_y[ocupado:ocupado + n] = alvos[copiadas:copiadas + n]
+                ocupado += n
+                copiadas += n
+                if ocupado == self.tamanho_buffer:
+                    yield from self._esvaziar(buffer_x, buffer_y, ocupado, final=False)
+                    # O que sobrou (menos de um lote) foi movido para o começo do buffer
+                    ocupado %= self.tamanho_lote
+
+        yield from self._esvaziar(buffer_x, buffer_y, ocupado, final=True)
+
+    def _esvaziar(self, buffer_x, buffer_y, ocupado, final):
+        """Embaralha o buffer e emite os lotes completos (e o último parcial, se 'final')."""
+        ordem = self.rng.permutation(ocupado)
+        buffer_x[:ocupado] = buffer_x[ordem]
+        buffer_y[:ocupado] = buffer_y[ordem]
+        completos = ocupado - ocupado % self.tamanho_lote
+        for inicio in range(0, completos, self.tamanho_lote):
+            # Cópia: o buffer é reutilizado antes de o consumidor terminar com o lote
+            yield buffer_x[inicio:inicio + self.tamanho_lote].copy(), buffer_y[inicio:inicio + self.tamanho_lote].copy()
+        resto = ocupado - completos
+        if final and resto:
+            yield buffer_x[completos:ocupado].copy(), buffer_y[completos:ocupado].copy()
+        elif resto:
+            buffer_x[:resto] = buffer_x[completos:ocupado]
+            buffer_y[:resto] = buffer_y[completos:ocupado]
+
+    def como_tf_dataset(self, prefetch=2):
+        """tf.data.Dataset sobre este gerador (cada época reinicia a iteração e reembaralha)."""
+        import tensorflow as tf
+
+        assinatura = (tf.TensorSpec((None, self.look_back, self.n_entradas), tf.float32),
+                      tf.TensorSpec((None,), tf.float32))
+        dataset = tf.data.Dataset.from_generator(lambda: iter(self), output_signature=assinatura)
+        # Informa o nº de lotes para o Keras saber onde termina cada época
+        return dataset.apply(tf.data.experimental.assert_cardinality(len(self))).prefetch(prefetch)
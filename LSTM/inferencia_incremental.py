@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# PONTUAÇÃO INCREMENTAL DO LSTM (BACKEND NUMPY)
+# -----------------------------------------------------------------------------
+# O estado (h, c) do LSTM depois de t passos só depende dos t primeiros passos
+# da entrada. Guardando esse estado a cada 'intervalo' passos, uma nova
+# chamada da mesma série só precisa rodar a recorrência a partir do último
+# checkpoint antes do primeiro passo que mudou: uma previsão atualizada que
+# revisa apenas o fim da janela custa só esses passos, e o modelo
+# multi-horizonte aproveita os 8 passos de '1 dia' ao pedir '5 dias'.
+#
+# A comparação é feita na entrada inteira (já normalizada), então o resultado
+# é sempre o do predict completo (a menos do arredondamento do float32). Se o
+# primeiro passo mudou (a janela de 3h andou, ou o IIP do bairro mudou), não
+# há o que aproveitar e a série é recalculada do zero.
+
+
+class _Serie:
+    """Última entrada de uma série, com os checkpoints e (se houver) as saídas por passo."""
+
+    __slots__ = ('entrada', 'checkpoints', 'saidas')
+
+    def __init__(self, entrada, checkpoints, saidas):
+        self.entrada = entrada          # (n, passos, features), cópia
+        self.checkpoints = checkpoints  # {passo: (h, c)}
+        self.saidas = saidas            # (n, passos, u) se o LSTM devolve a sequência
+
+
+class PontuadorIncremental:
+    """
+    'predict' incremental de um ModeloNumpy LSTM -> Dense, por série. A chave
+    da série só diz qual entrada anterior comparar (ex.: bairro e cidade);
+    séries pouco usadas saem pela fila LRU ('max_series').
+    """
+
+    def __init__(self, modelo, intervalo=4, max_series=4096):
+        tipos = [camada.config['tipo'] for camada in modelo.camadas]
+        if tipos != ['LSTM', 'Dense']:
+            raise ValueError(f"A pontuação incremental só suporta modelos LSTM -> Dense (recebido: {tipos}).")
+        self.lstm, self.densa = modelo.camadas
+        self.intervalo = intervalo
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._trava = threading.Lock()
+        self.chamadas = 0
+        self.recalculos_completos = 0
+        self.passos_calculados = 0
+        self.passos_pulados = 0
+
+    def _retomada(self, anterior, x):
+        """(passo, h, c) do último checkpoint dentro do prefixo igual ao da entrada anterior."""
+        if anterior is None or anterior.entrada.shape[0] != x.shape[0] or anterior.entrada.shape[2] != x.shape[2]:
+            return 0, None, None
+        comum = min(x.shape[1], anterior.entrada.shape[1])
+        diferentes = np.flatnonzero((x[:, :comum] != anterior.entrada[:, :comum]).any(axis=(0, 2)))
+        iguais = int(diferentes[0]) if len(diferentes) else comum
+        passo = max((p for p in anterior.checkpoints if p <= iguais), default=0)
+        if passo == 0:
+            return 0, None, None
+        h, c = anterior.checkpoints[passo]
+        return passo, h, c
+
+    def pontuar(self, chave, x):
+        """Saída igual à de modelo.predict(x) e o número de passos recorrentes pulados."""
+        x = np.asarray(x, dtype=np.float32)
+        n, passos, _ = x.shape
+        with self._trava:
+            anterior = self._series.get(chave)
+        inicio, h, c = self._retomada(anterior, x)
+
+        saidas = None
+        if self.lstm.return_sequences:
+            saidas = np.empty((n, passos, self.lstm.unidades), dtype=np.float32)
+            saidas[:, :inicio] = anterior.saidas[:, :inicio] if inicio else 0
+        checkpoints = {p: estado for p, estado in (anterior.checkpoints.items() if inicio else ()) if p <= inicio}
+        if inicio < passos:
+            h, c, novos = self.lstm.avancar(x[:, inicio:], h, c, saidas=None if saidas is None else saidas[:, inicio:],
+                                            inicio=inicio, a_cada=self.intervalo)
+            checkpoints.update((p, (hp, cp)) for p, hp, cp in novos)
+            checkpoints[passos] = (h, c)  # o fim da janela também, se não cair num múltiplo
+
+        with self._trava:
+            self._series[chave] = _Serie(x.copy(), checkpoints, saidas)
+            self._series.move_to_end(chave)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+            self.chamadas += 1
+            self.recalculos_completos += inicio == 0
+            self.passos_calculados += passos - inicio
+            self.passos_pulados += inicio
+
+        return self.densa(saidas if saidas is not None else h), inicio
+
+    def estatisticas(self):
+        total = self.passos_calculados + self.passos_pulados
+        return {
+            'series': len(self._series),
+            'chamadas': self.chamadas,
+            'recalculos_completos': self.recalculos_completos,
+            'passos_calculados': self.passos_calculados,
+            'passos_pulados': self.passos_pulados,
+            'fracao_pulada': round(self.passos_pulados / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,238 @@
+import io
+import json
+import threading
+import zipfile
+
+import h5py
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# INFERÊNCIA DO LSTM EM NUMPY PURO (SEM TENSORFLOW)
+# -----------------------------------------------------------------------------
+# Os modelos servidos são pequenos (Sequential com LSTM -> Dropout -> Dense).
+# Para só calcular a previsão não precisamos do TensorFlow: lemos os pesos
+# direto do arquivo .keras (um zip com config.json + model.weights.h5) e
+# fazemos o forward pass com multiplicações de matrizes em lote.
+
+ATIVACOES = {
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'linear': lambda x: x,
+}
+
+
+class CamadaLSTM:
+    """
+    LSTM no formato do Keras: kernel (features, 4*u), recurrent_kernel (u, 4*u)
+    e bias (4*u), com os portões na ordem [entrada, esquecimento, célula, saída].
+    """
+
+    def __init__(self, kernel, kernel_recorrente, bias, return_sequences=False,
+                 activation='tanh', recurrent_activation='sigmoid'):
+        self.kernel = np.asarray(kernel, dtype=np.float32)
+        self.kernel_recorrente = np.asarray(kernel_recorrente, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.unidades = self.kernel_recorrente.shape[0]
+        self.return_sequences = return_sequences
+        self.config = {'tipo': 'LSTM', 'return_sequences': return_sequences,
+                       'activation': activation, 'recurrent_activation': recurrent_activation}
+        self.ativacao = ATIVACOES[activation]
+        self.ativacao_recorrente = ATIVACOES[recurrent_activation]
+
+    def pesos(self):
+        return [self.kernel, self.kernel_recorrente, self.bias]
+
+    def __call__(self, x):
+        n, passos, _ = x.shape
+        saidas = np.empty((n, passos, self.unidades), dtype=np.float32) if self.return_sequences else None
+        h, _, _ = self.avancar(x, saidas=saidas)
+        return saidas if self.return_sequences else h
+
+    def avancar(self, x, h=None, c=None, saidas=None, inicio=0, a_cada=0):
+        """
+        Roda a recorrência nos passos de 'x' a partir do estado (h, c) (zeros se
+        None) e devolve (h, c, checkpoints). 'inicio' é a posição do primeiro
+        passo de 'x' na sequência inteira; com 'a_cada', 'checkpoints' traz
+        (passo, h, c) sempre que a posição alcançada for múltipla dele. Se
+        'saidas' (n, passos, u) for dado, recebe o h de cada passo.
+        """
+        n, passos, _ = x.shape
+        u = self.unidades
+        # A parte da entrada não depende do estado: um único matmul para todos os passos
+        entrada_projetada = x @ self.kernel + self.bias
+        if h is None:
+            h = np.zeros((n, u), dtype=np.float32)
+            c = np.zeros((n, u), dtype=np.float32)
+        checkpoints = []
+
+        for t in range(passos):
+            z = entrada_projetada[:, t] + h @ self.kernel_recorrente
+            i = self.ativacao_recorrente(z[:, :u])
+            f = self.ativacao_recorrente(z[:, u:2 * u])
+            g = self.ativacao(z[:, 2 * u:3 * u])
+            o = self.ativacao_recorrente(z[:, 3 * u:])
+            c = f * c + i * g
+            h = o * self.ativacao(c)
+            if saidas is not None:
+                saidas[:, t] = h
+            if a_cada and (inicio + t + 1) % a_cada == 0:
+                checkpoints.append((inicio + t + 1, h, c))
+
+        return h, c, checkpoints
+
+
+class CamadaDense:
+    """Camada densa; aplicada ao último eixo (funciona em 2D ou 3D, como no Keras)."""
+
+    def __init__(self, kernel, bias, activation='linear'):
+        self.kernel = np.asarray(kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.config = {'tipo': 'Dense', 'activation': activation}
+        self.ativacao = ATIVACOES[activation]
+
+    def pesos(self):
+        return [self.kernel, self.bias]
+
+    def __call__(self, x):
+        return self.ativacao(x @ self.kernel + self.bias)
+
+
+class ModeloNumpy:
+    """
+    Substituto do modelo Keras só para inferência. Expõe 'predict' com a
+    mesma assinatura usada pelas APIs, então pode ser trocado pelo modelo
+    do Keras sem mudar o código das rotas.
+    """
+
+    def __init__(self, camadas, formato_entrada=None):
+        self.camadas = camadas
+        self.formato_entrada = formato_entrada
+
+    def predict(self, x, verbose=0, batch_size=None):
+        saida = np.asarray(x, dtype=np.float32)
+        for camada in self.camadas:
+            saida = camada(saida)
+        return saida
+
+    __call__ = predict
+
+
+class NormalizacaoAfim:
+    """
+    O MinMaxScaler reduzido ao que ele faz de fato, x * scale_ + min_, já em
+    float32 e só para as colunas que o modelo usa. 'aplicar' trabalha no
+    próprio array (in place): nenhuma chamada ao sklearn nem array
+    intermediário por requisição.
+    """
+
+    def __init__(self, escala, deslocamento):
+        self.escala = np.ascontiguousarray(escala, dtype=np.float32)
+        self.deslocamento = np.ascontiguousarray(deslocamento, dtype=np.float32)
+
+    @classmethod
+    def do_scaler(cls, scaler, colunas=None):
+        """A partir de um MinMaxScaler ajustado (ou de qualquer objeto com scale_ e min_)."""
+        colunas = slice(None) if colunas is None else list(colunas)
+        return cls(np.asarray(scaler.scale_)[colunas], np.asarray(scaler.min_)[colunas])
+
+    def aplicar(self, x, colunas=slice(None)):
+        """Normaliza 'x' (float32, features no último eixo) no lugar e o devolve."""
+        np.multiply(x, self.escala[colunas], out=x)
+        np.add(x, self.deslocamento[colunas], out=x)
+        return x
+
+
+class BufferPorThread(threading.local):
+    """
+    Buffer float32 de entrada do modelo, um por thread, reaproveitado entre
+    requisições e só realocado quando um lote maior aparece. Cada thread
+    espera o resultado do modelo antes de montar a próxima entrada, então
+    o buffer nunca é sobrescrito enquanto ainda está em uso.
+    """
+
+    def __init__(self, formato_linha):
+        self.formato_linha = tuple(formato_linha)
+        self.buffer = np.empty((0,) + self.formato_linha, dtype=np.float32)
+
+    def obter(self, n_linhas):
+        if len(self.buffer) < n_linhas:
+            self.buffer = np.empty((max(n_linhas, 2 * len(self.buffer)),) + self.formato_linha, dtype=np.float32)
+        return self.buffer[:n_linhas]
+
+
+def carregar_modelo_numpy(caminho_keras):
+    """
+    Lê um arquivo .keras (formato Keras 3) e monta o ModeloNumpy equivalente.
+    Suporta Sequential com InputLayer, LSTM, Dropout e Dense.
+    """
+    with zipfile.ZipFile(caminho_keras) as arquivo_zip:
+        config = json.loads(arquivo_zip.read('config.json'))
+        pesos_h5 = io.BytesIO(arquivo_zip.read('model.weights.h5'))
+
+    if config.get('class_name') != 'Sequential':
+        raise ValueError(f"Modelo '{caminho_keras}' não é Sequential ({config.get('class_name')}).")
+
+    camadas = []
+    formato_entrada = None
+    with h5py.File(pesos_h5, 'r') as pesos:
+        for camada in config['config']['layers']:
+            tipo = camada['class_name']
+            cfg = camada['config']
+            if tipo == 'InputLayer':
+                formato_entrada = tuple(cfg['batch_shape'][1:])
+            elif tipo == 'Dropout':
+                continue  # Dropout não tem efeito na inferência
+            elif tipo == 'LSTM':
+                if cfg.get('go_backwards') or not cfg.get('use_bias', True):
+                    raise ValueError(f"Configuração da camada '{cfg['name']}' não suportada pela inferência em NumPy.")
+                variaveis = pesos['layers'][cfg['name']]['cell']['vars']
+                camadas.append(CamadaLSTM(
+                    variaveis['0'][()], variaveis['1'][()], variaveis['2'][()],
+                    return_sequences=cfg['return_sequences'],
+                    activation=cfg['activation'],
+                    recurrent_activation=cfg['recurrent_activation'],
+                ))
+            elif tipo == 'Dense':
+                variaveis = pesos['layers'][cfg['name']]['vars']
+                camadas.append(CamadaDense(variaveis['0'][()], variaveis['1'][()], activation=cfg['activation']))
+            else:
+                raise ValueError(f"Camada '{tipo}' não suportada pela inferência em NumPy.")
+
+    return ModeloNumpy(camadas, formato_entrada)
+
+
+# -----------------------------------------------------------------------------
+# FORMATO COMPILADO (.npz): SÓ OS PESOS, SEM ZIP DO KERAS NEM HDF5
+# -----------------------------------------------------------------------------
+
+TIPOS_CAMADA = {'LSTM': CamadaLSTM, 'Dense': CamadaDense}
+
+
+def salvar_modelo_npz(modelo, caminho):
+    """Salva um ModeloNumpy como .npz sem compressão (carrega quase sem custo)."""
+    arrays = {}
+    for i, camada in enumerate(modelo.camadas):
+        for j, peso in enumerate(camada.pesos()):
+            arrays[f'camada{i}_peso{j}'] = peso
+    especificacao = {
+        'formato_entrada': list(modelo.formato_entrada) if modelo.formato_entrada else None,
+        'camadas': [camada.config for camada in modelo.camadas],
+    }
+    # A especificação vai como texto JSON: evita pickle ao carregar
+    np.savez(caminho, especificacao=np.array(json.dumps(especificacao)), **arrays)
+
+
+def carregar_modelo_npz(caminho):
+    """Carrega um ModeloNumpy salvo por 'salvar_modelo_npz'."""
+    with np.load(caminho) as arquivo:
+        especificacao = json.loads(str(arquivo['especificacao']))
+        camadas = []
+        for i, config in enumerate(especificacao['camadas']):
+            config = dict(config)
+            classe = TIPOS_CAMADA[config.pop('tipo')]
+            n_pesos = 3 if classe is CamadaLSTM else 2
+            pesos = [arquivo[f'camada{i}_peso{j}'] for j in range(n_pesos)]
+            camadas.append(classe(*pesos, **config))
+    formato = especificacao['formato_entrada']
+    return ModeloNumpy(camadas, tuple(formato) if formato else None)
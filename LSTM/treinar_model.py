@@ -1,67 +1,119 @@
+import argparse
+import os
+import sys
+import tempfile
+
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
+from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
 import joblib
 
+from dataset_janelas import DatasetJanelas, gravar_historico, gravar_de_csv, gravar_de_parquet
+
+# Uso (a partir da pasta LSTM):
+#   python treinar_model.py                                   # 200 dias simulados
+#   python treinar_model.py --csv historico.csv --coluna-serie bairro
+#   python treinar_model.py --historico pasta_ja_convertida/
+#   python treinar_model.py --armazem ../dados/previsoes.db       # clima real gravado pelas APIs
+# O histórico real (anos de passos de 3h de todos os bairros) é lido do disco
+# em janelas, por memória mapeada: ver 'dataset_janelas.py'.
+
+parser = argparse.ArgumentParser(description="Treina o LSTM da API de predição.")
+parser.add_argument('--historico', help="Diretório já convertido por 'dataset_janelas.gravar_historico'.")
+parser.add_argument('--csv', help="CSV com as colunas de COLUNAS_PADRAO, ordenado por série e tempo.")
+parser.add_argument('--parquet', help="Igual ao --csv, em Parquet (requer pyarrow).")
+parser.add_argument('--coluna-serie', help="Coluna que separa as séries (ex.: bairro).")
+parser.add_argument('--armazem', help="Armazém de previsões (SQLite) gravado pelas APIs: treina com o clima observado.")
+parser.add_argument('--local', help="Local do armazém (ex.: 'Montes Claros,MG,BR'); opcional se houver só um.")
+parser.add_argument('--destino', help="Onde gravar o histórico convertido do --csv/--parquet/--armazem.")
+parser.add_argument('--epocas', type=int, default=20)
+parser.add_argument('--buffer', type=int, default=10_000, help="Janelas no buffer de embaralhamento.")
+args = parser.parse_args()
 
 print("Iniciando a preparação dos dados para o modelo LSTM...")
 
-# --- 1. SIMULAÇÃO DE DADOS HISTÓRICOS DE SÉRIE TEMPORAL ---
-# Simulando 200 dias de dados. Em um projeto real, estes seriam dados reais.
-dias = 200
-temperatura = np.random.uniform(20, 35, size=dias)
-umidade = np.random.uniform(50, 95, size=dias)
-chuva_mm = np.random.choice([0, 5, 10, 15, 20], size=dias, p=[0.6, 0.1, 0.1, 0.1, 0.1])
-iip_bairro = np.random.uniform(4, 23, size=dias)
-
-# 2. Agora, criamos a lista 'risco_surto' usando as listas que já existem
-risco_surto = [
-    1 if temp > 28 and umid > 75 and chuva > 0 else 0
-    for temp, umid, chuva in zip(temperatura, umidade, chuva_mm)
-]
-
-# 3. Finalmente, montamos o dicionário com todas as listas prontas
-dados_ficticios = {
-    'temperatura': temperatura,
-    'umidade': umidade,
-    'chuva_mm': chuva_mm,
-    'iip_bairro': iip_bairro,
-    'risco_surto': risco_surto
-}
-df = pd.DataFrame(dados_ficticios)
-print(f"Total de {len(df)} dias de dados simulados.")
+def calcular_risco_surto(df):
+    """Rótulo de cada passo: calor, umidade alta e chuva ao mesmo tempo."""
+    return ((df['temperatura'] > 28) & (df['umidade'] > 75) & (df['chuva_mm'] > 0)).astype(int)
+
+# Sem --destino, o histórico convertido (uma cópia float32 de tudo) vai para
+# um diretório temporário, apagado ao fim do treino ou na saída do processo,
+# mesmo se o treino falhar
+temporario = None
+
+def diretorio_temporario():
+    global temporario
+    temporario = tempfile.TemporaryDirectory(prefix='historico_lstm_', ignore_cleanup_errors=True)
+    return temporario.name
+
+# --- 1. DADOS HISTÓRICOS DE SÉRIE TEMPORAL ---
+if args.historico:
+    diretorio_historico = args.historico
+elif args.csv or args.parquet:
+    diretorio_historico = args.destino or diretorio_temporario()
+    if args.csv:
+        gravar_de_csv(args.csv, diretorio_historico, coluna_serie=args.coluna_serie)
+    else:
+        gravar_de_parquet(args.parquet, diretorio_historico, coluna_serie=args.coluna_serie)
+elif args.armazem:
+    # Clima observado da cidade (armazem_previsoes.py, na raiz) cruzado com o IIP de cada bairro
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from armazem_previsoes import ArmazemPrevisoes, iips_dos_bairros, series_por_bairro
+
+    armazem = ArmazemPrevisoes(args.armazem)
+    local = args.local or next(iter(armazem.locais()), None)
+    observacoes = armazem.exportar_observacoes(local)
+    print(f"{len(observacoes)} passos de 3h observados em '{local}'.")
+    diretorio_historico = args.destino or diretorio_temporario()
+    gravar_historico(diretorio_historico,
+                     ((nome, df.assign(risco_surto=calcular_risco_surto(df)))
+                      for nome, df in series_por_bairro(observacoes, iips_dos_bairros())))
+else:
+    # Simulando 200 dias de dados. Em um projeto real, estes seriam dados reais.
+    dias = 200
+    temperatura = np.random.uniform(20, 35, size=dias)
+    umidade = np.random.uniform(50, 95, size=dias)
+    chuva_mm = np.random.choice([0, 5, 10, 15, 20], size=dias, p=[0.6, 0.1, 0.1, 0.1, 0.1])
+    iip_bairro = np.random.uniform(4, 23, size=dias)
+
+    df = pd.DataFrame({
+        'temperatura': temperatura,
+        'umidade': umidade,
+        'chuva_mm': chuva_mm,
+        'iip_bairro': iip_bairro,
+    })
+    # Risco de surto calculado direto sobre as colunas
+    df['risco_surto'] = calcular_risco_surto(df)
+    print(f"Total de {len(df)} dias de dados simulados.")
+    # Mesmo caminho do histórico real: grava no disco e lê em janelas
+    diretorio_historico = diretorio_temporario()
+    gravar_historico(diretorio_historico, [('simulado', df)])
 
 # --- 2. NORMALIZAÇÃO DOS DADOS ---
 # LSTMs são sensíveis à escala dos dados. Normalizamos tudo para o intervalo [0, 1].
-scaler = MinMaxScaler(feature_range=(0, 1))
-dados_normalizados = scaler.fit_transform(df)
+# O MinMaxScaler é ajustado por partes (partial_fit) enquanto o histórico é
+# gravado, e aplicado bloco a bloco pelo dataset.
 
 # --- 3. CRIAÇÃO DAS SEQUÊNCIAS (A MÁGICA DO LSTM) ---
-# Vamos usar os dados dos últimos 'look_back' dias para prever o próximo.
+# Vamos usar os dados dos últimos 'look_back' passos para prever o próximo.
+# As janelas são views do bloco lido do disco (nada é copiado 14 vezes) e o
+# embaralhamento usa um buffer de tamanho fixo.
 look_back = 14
-X, y = [], []
-
-for i in range(len(dados_normalizados) - look_back):
-    # Pega uma "janela" de 'look_back' dias de dados (features)
-    janela = dados_normalizados[i:(i + look_back), 0:4] # Colunas: temp, umid, chuva, iip
-    X.append(janela)
-    # Pega o "risco_surto" do dia seguinte como nosso alvo (target)
-    alvo = dados_normalizados[i + look_back, 4] # Coluna: risco_surto
-    y.append(alvo)
-
-X, y = np.array(X), np.array(y)
+dataset = DatasetJanelas(diretorio_historico, look_back=look_back, tamanho_lote=32, tamanho_buffer=args.buffer)
+scaler = dataset.scaler
 
 # O LSTM espera dados em um formato 3D: [amostras, passos_de_tempo, features]
-print(f"Formato dos dados de entrada (X) para o LSTM: {X.shape}") # Ex: (186, 14, 4)
+print(f"Janelas de entrada para o LSTM: {dataset.n_janelas} x ({look_back}, {dataset.n_entradas}) em {len(dataset)} lotes")
 
 # --- 4. CONSTRUÇÃO E TREINAMENTO DO MODELO LSTM ---
 print("\nConstruindo e treinando o modelo LSTM...")
 
 modelo = Sequential()
-# Camada LSTM com 50 neurônios. input_shape precisa dos passos_de_tempo e n° de features.
-modelo.add(LSTM(50, return_sequences=True, input_shape=(X.shape[1], X.shape[2])))
+# Entrada: passos_de_tempo e n° de features.
+modelo.add(Input(shape=(look_back, dataset.n_entradas)))
+# Camada LSTM com 50 neurônios.
+modelo.add(LSTM(50, return_sequences=True))
 modelo.add(Dropout(0.2)) # Dropout para evitar superajuste (overfitting)
 modelo.add(LSTM(50, return_sequences=False))
 modelo.add(Dropout(0.2))
@@ -72,7 +124,7 @@ modelo.add(Dense(1, activation='sigmoid'))
 modelo.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
 
 # Treina o modelo
-modelo.fit(X, y, epochs=20, batch_size=32, verbose=2)
+modelo.fit(dataset.como_tf_dataset(), epochs=args.epocas, verbose=2)
 
 
 # --- 5. SALVAR O MODELO E O NORMALIZADOR ---
@@ -80,4 +132,8 @@ print("\nSalvando o modelo e o normalizador...")
 modelo.save('modelo_dengue_lstm.keras')
 joblib.dump(scaler, 'scaler.joblib')
 
+if temporario is not None:
+    del dataset  # solta os arquivos mapeados antes de apagar
+    temporario.cleanup()
+
 print("Treinamento concluído e artefatos salvos com sucesso!")
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import numpy as np
+
+from inferencia_incremental import PontuadorIncremental
+from inferencia_numpy import carregar_modelo_numpy
+
+# -----------------------------------------------------------------------------
+# VERIFICAÇÃO DE PARIDADE: PONTUAÇÃO INCREMENTAL x PREDICT COMPLETO
+# -----------------------------------------------------------------------------
+# Para cada modelo, pontua uma série e depois versões dela com o fim da janela
+# alterado, a janela deslocada em um passo e (no multi-horizonte) o prefixo de
+# 1 dia seguido da janela inteira. Compara com o predict completo e confere
+# quantos passos foram pulados:  python LSTM/verificar_paridade_incremental.py
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELOS = [
+    'Treinar API models/modelo_lstm_24h.keras',
+    'Treinar API models/modelo_lstm_3d.keras',
+    'Treinar API models/modelo_lstm_5d.keras',
+    'Treinar API models/modelo_lstm_multi.keras',
+]
+TOLERANCIA = 1e-6
+INTERVALO = 4
+N_BAIRROS = 16
+
+
+def cenarios(x, rng):
+    """(série, nome, entrada, passos pulados esperados), na ordem em que são pontuados."""
+    passos = x.shape[1]
+    yield 'janela', 'primeira chamada', x, 0
+    yield 'janela', 'entrada igual', x, passos
+    for mudanca in sorted({passos // 2, passos - 1, 1}):
+        y = x.copy()
+        y[:, mudanca:, :3] = rng.uniform(0, 1, size=(N_BAIRROS, passos - mudanca, 3))
+        yield 'janela', f'fim alterado a partir do passo {mudanca}', y, mudanca // INTERVALO * INTERVALO
+        x = y
+    yield 'janela', 'janela deslocada em 1 passo', np.concatenate([x[:, 1:], x[:, -1:]], axis=1), 0
+
+
+def verificar_modelo(caminho, rng):
+    modelo = carregar_modelo_numpy(caminho)
+    pontuador = PontuadorIncremental(modelo, intervalo=INTERVALO)
+    passos, n_features = modelo.formato_entrada
+    x = rng.uniform(-0.2, 1.2, size=(N_BAIRROS, passos, n_features)).astype(np.float32)
+
+    lista = list(cenarios(x, rng))
+    if modelo.camadas[0].return_sequences:
+        # Multi-horizonte: 1 dia (8 passos) e depois a janela inteira, numa série nova
+        lista += [('prefixo', 'prefixo de 8 passos', x[:, :8], 0), ('prefixo', 'janela inteira após o prefixo', x, 8)]
+
+    tudo_ok = True
+    for serie, nome, entrada, esperado in lista:
+        saida, pulados = pontuador.pontuar(serie, entrada)
+        diferenca = float(np.max(np.abs(saida - modelo.predict(entrada))))
+        ok = diferenca <= TOLERANCIA and pulados == esperado
+        tudo_ok &= ok
+        print(f"      [{'OK' if ok else 'FALHA'}] {nome}: {pulados}/{entrada.shape[1]} passos pulados "
+              f"(esperado {esperado}), diferença {diferenca:.2e}")
+    return tudo_ok, pontuador.estatisticas()
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(42)
+    tudo_ok = True
+    for relativo in MODELOS:
+        caminho = os.path.join(RAIZ, relativo)
+        if not os.path.exists(caminho):
+            print(f"  [--] '{relativo}' não encontrado, ignorado.")
+            continue
+        print(f"  '{relativo}':")
+        ok, estatisticas = verificar_modelo(caminho, rng)
+        tudo_ok &= ok
+        print(f"      {estatisticas['passos_pulados']} de "
+              f"{estatisticas['passos_pulados'] + estatisticas['passos_calculados']} passos pulados no total.")
+
+    if not tudo_ok:
+        print(f"\nERRO: a pontuação incremental difere do predict completo (tolerância {TOLERANCIA}).")
+        sys.exit(1)
+    print("\nPontuação incremental equivalente ao predict completo em todos os modelos.")
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+from tensorflow.keras.models import load_model
+
+from inferencia_numpy import carregar_modelo_numpy
+
+# -----------------------------------------------------------------------------
+# VERIFICAÇÃO DE PARIDADE: KERAS x NUMPY
+# -----------------------------------------------------------------------------
+# Roda os mesmos lotes aleatórios nos dois backends e compara as saídas.
+# Execute sempre que um modelo for retreinado, antes de servir com o backend
+# NumPy:  python LSTM/verificar_paridade_numpy.py
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELOS = [
+    'LSTM/modelo_dengue_lstm.keras',
+    'Treinar API models/modelo_lstm_24h.keras',
+    'Treinar API models/modelo_lstm_3d.keras',
+    'Treinar API models/modelo_lstm_5d.keras',
+    'Treinar API models/modelo_lstm_multi.keras',
+]
+TOLERANCIA = 1e-5
+TAMANHO_LOTE = 64
+
+
+def verificar_modelo(caminho, rng):
+    # Só o predict interessa: sem compilar, a perda personalizada do modelo
+    # multi-horizonte (perda_mascarada) não precisa ser registrada
+    modelo_keras = load_model(caminho, compile=False)
+    modelo_numpy = carregar_modelo_numpy(caminho)
+
+    passos, n_features = modelo_numpy.formato_entrada
+    # Entradas normalizadas ficam em [0, 1]; incluímos um pouco de folga fora do intervalo
+    x = rng.uniform(-0.2, 1.2, size=(TAMANHO_LOTE, passos, n_features)).astype(np.float32)
+
+    saida_keras = modelo_keras.predict(x, verbose=0)
+    saida_numpy = modelo_numpy.predict(x)
+    diferenca = float(np.max(np.abs(saida_keras - saida_numpy)))
+    return saida_keras.shape == saida_numpy.shape and diferenca <= TOLERANCIA, diferenca
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(42)
+    tudo_ok = True
+    for relativo in MODELOS:
+        caminho = os.path.join(RAIZ, relativo)
+        if not os.path.exists(caminho):
+            print(f"  [--] '{relativo}' não encontrado, ignorado.")
+            continue
+        ok, diferenca = verificar_modelo(caminho, rng)
+        tudo_ok &= ok
+        print(f"  [{'OK' if ok else 'FALHA'}] '{relativo}': diferença máxima {diferenca:.2e}")
+
+    if not tudo_ok:
+        print(f"\nERRO: saídas do NumPy diferem do Keras acima da tolerância ({TOLERANCIA}).")
+        sys.exit(1)
+    print("\nBackend NumPy equivalente ao Keras em todos os modelos.")
@@ -1,19 +1,59 @@
+import codecs
+import json
+import os
+import sys
+
 import joblib
+import numpy as np
 import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+from floresta_compilada import ARQUIVO_COMPILADO, carregar_floresta_npz
+
+# 'metricas.py' fica na raiz do projeto (a API roda de dentro da pasta RF)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metricas import RegistroMetricas, instrumentar_flask
+from perfilamento import instrumentar_perfil_flask
 
 print("Iniciando a API de predição com Random Forest...")
 
 # --- 1. CARREGAR O MODELO TREINADO ---
+# Backend: 'sklearn' (RandomForestClassifier do .joblib) ou 'compilado' (árvores
+# achatadas em arrays, gerado por 'floresta_compilada.py'; muito mais rápido
+# para poucas linhas). Paridade: 'verificar_paridade_floresta.py'.
+BACKEND_RF = os.environ.get('BACKEND_RF', 'sklearn')
 try:
-    modelo_rf = joblib.load('modelo_dengue_rf.joblib')
-    print("Modelo Random Forest carregado com sucesso.")
+    if BACKEND_RF == 'compilado':
+        modelo_rf = carregar_floresta_npz(ARQUIVO_COMPILADO)
+        print(f"Floresta compilada '{ARQUIVO_COMPILADO}' carregada com sucesso.")
+    else:
+        modelo_rf = joblib.load('modelo_dengue_rf.joblib')
+        print("Modelo Random Forest carregado com sucesso.")
 except FileNotFoundError:
-    print("ERRO: Arquivo 'modelo_dengue_rf.joblib' não encontrado. Execute o script 'treinar_modelo_rf.py' primeiro.")
+    if BACKEND_RF == 'compilado':
+        print(f"ERRO: Arquivo '{ARQUIVO_COMPILADO}' não encontrado. Execute o script 'floresta_compilada.py' primeiro.")
+    else:
+        print("ERRO: Arquivo 'modelo_dengue_rf.joblib' não encontrado. Execute o script 'treinar_modelo_rf.py' primeiro.")
     modelo_rf = None
     
 app = Flask(__name__)
 
+# Métricas por etapa em '/metrics' (formato Prometheus) e prontidão em '/health'
+metricas = RegistroMetricas('rf_')
+etapas = metricas.histograma('etapa_segundos', "Duração de cada etapa da requisição.", ('etapa',))
+linhas_pontuadas = metricas.contador('linhas_pontuadas_total', "Linhas pontuadas pela rota em lote.", ('resultado',))
+instrumentar_flask(app, metricas, lambda: modelo_rf is not None)
+# Perfil de uma requisição sob demanda (cabeçalho X-Perfil; ver perfilamento.py)
+instrumentar_perfil_flask(app)
+
+# A ordem das colunas DEVE ser a mesma do treinamento
+features_necessarias = ['temperatura_media_semana', 'umidade_media_semana', 'total_chuva_semana_mm', 'iip_bairro']
+
+# Rota em lote: linhas por chamada de predict_proba (e por pedaço lido/enviado)
+TAMANHO_LOTE_RF = int(os.environ.get('TAMANHO_LOTE_RF', '10000'))
+TAMANHO_LEITURA = 64 * 1024  # bytes lidos do corpo da requisição por vez
+TIPO_ARROW = 'application/vnd.apache.arrow.stream'
+
 # --- 2. ROTA DE PREDIÇÃO ---
 @app.route('/prever_surto_rf', methods=['POST'])
 def prever_surto_rf():
@@ -27,21 +67,26 @@ def prever_surto_rf():
     dados_entrada = request.get_json()
     
     # Valida se todas as features necessárias foram enviadas
-    features_necessarias = ['temperatura_media_semana', 'umidade_media_semana', 'total_chuva_semana_mm', 'iip_bairro']
     if not all(feature in dados_entrada for feature in features_necessarias):
         return jsonify({"erro": "Dados de entrada incompletos.", "features_necessarias": features_necessarias}), 400
 
     # --- 4. PREPARAR OS DADOS PARA PREDIÇÃO ---
     try:
-        # Cria um DataFrame de uma única linha com os dados recebidos
-        # A ordem das colunas DEVE ser a mesma do treinamento
-        dados_para_previsao = pd.DataFrame([dados_entrada], columns=features_necessarias)
+        with etapas.cronometrar(etapa='preparacao'):
+            # A ordem das colunas DEVE ser a mesma do treinamento
+            if BACKEND_RF == 'compilado':
+                # A floresta compilada lê arrays: evita montar um DataFrame por requisição
+                dados_para_previsao = np.array([[dados_entrada[f] for f in features_necessarias]], dtype=float)
+            else:
+                # Cria um DataFrame de uma única linha com os dados recebidos
+                dados_para_previsao = pd.DataFrame([dados_entrada], columns=features_necessarias)
     except Exception as e:
         return jsonify({"erro": f"Erro no processamento dos dados de entrada: {e}"}), 400
 
     # --- 5. FAZER A PREDIÇÃO ---
     # .predict_proba() retorna a probabilidade para cada classe: [prob_classe_0, prob_classe_1]
-    probabilidade_surto = modelo_rf.predict_proba(dados_para_previsao)[0][1]
+    with etapas.cronometrar(etapa='predict'):
+        probabilidade_surto = modelo_rf.predict_proba(dados_para_previsao)[0][1]
 
     resultado = {
         "modelo": "Random Forest",
@@ -49,7 +94,201 @@ def prever_surto_rf():
         "nivel_risco": "ALTO" if probabilidade_surto > 0.5 else "BAIXO"
     }
     
-    return jsonify(resultado)
+    with etapas.cronometrar(etapa='serializacao_json'):
+        return jsonify(resultado)
+
+# --- 6. ROTA EM LOTE (JSON, CSV OU ARROW -> NDJSON) ---
+class ErroEntrada(Exception):
+    """Corpo da requisição em lote que não pode ser lido."""
+
+
+def _objeto_cortado(erro, texto):
+    """
+    Se o erro de decodificação é só o fim do buffer cortando o objeto (o resto
+    vem no próximo pedaço): erro nos últimos caracteres, ou string sem fim.
+    """
+    return erro.pos >= len(texto) - 6 or erro.msg.startswith('Unterminated string')
+
+
+def _ler_json_array(fluxo, tamanho_lote):
+    """
+    Lê um array JSON de objetos aos pedaços, sem carregar o corpo inteiro:
+    cada objeto é decodificado assim que chega e os objetos saem em
+    DataFrames de até 'tamanho_lote' linhas. O array é validado por inteiro
+    (vírgulas entre os itens, nada além de espaços depois do ']'); um objeto
+    inválido é rejeitado na hora, sem esperar o resto do corpo.
+    """
+    decodificador = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    texto, registros = '', []
+    deslocamento = 0  # posição de texto[0] no corpo inteiro, para as mensagens de erro
+    # abertura -> primeiro -> (separador -> item -> separador ...) -> fim
+    estado = 'abertura'
+
+    while True:
+        pedaco = fluxo.read(TAMANHO_LEITURA)
+        texto += utf8.decode(pedaco, final=not pedaco)
+        pos = 0
+        while True:
+            while pos < len(texto) and texto[pos] in ' \t\r\n':
+                pos += 1
+            if pos == len(texto):
+                break
+            caractere = texto[pos]
+            if estado == 'fim':
+                raise ErroEntrada(f"Conteúdo depois do fim do array JSON, no caractere {deslocamento + pos}.")
+            if estado == 'abertura':
+                if caractere != '[':
+                    raise ErroEntrada("O corpo JSON deve ser um array de objetos.")
+                estado = 'primeiro'
+                pos += 1
+                continue
+            if caractere == ']' and estado in ('primeiro', 'separador'):
+                estado = 'fim'
+                pos += 1
+                continue
+            if estado == 'separador':
+                if caractere != ',':
+                    raise ErroEntrada(f"Esperava ',' ou ']' no caractere {deslocamento + pos}.")
+                estado = 'item'
+                pos += 1
+                continue
+            if caractere in ',]':
+                raise ErroEntrada(f"Vírgula fora do lugar perto do caractere {deslocamento + pos}.")
+            try:
+                registro, pos_final = decodificador.raw_decode(texto, pos)
+            except json.JSONDecodeError as e:
+                if pedaco and _objeto_cortado(e, texto):
+                    break  # objeto incompleto: espera o próximo pedaço
+                raise ErroEntrada(f"JSON inválido perto do caractere {deslocamento + e.pos}.")
+            if not isinstance(registro, dict):
+                raise ErroEntrada("Cada item do array deve ser um objeto com as features.")
+            registros.append(registro)
+            pos, estado = pos_final, 'separador'
+            if len(registros) == tamanho_lote:
+                yield pd.DataFrame(registros)
+                registros = []
+        texto = texto[pos:]
+        deslocamento += pos
+        if not pedaco:
+            break
+
+    if estado != 'fim':
+        raise ErroEntrada("Corpo da requisição vazio." if estado == 'abertura' else "Array JSON incompleto.")
+    if registros:
+        yield pd.DataFrame(registros)
+
+
+def _ler_arrow(fluxo, tamanho_lote):
+    """Lê um stream Arrow IPC lote a lote (requer pyarrow)."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ErroEntrada("Entrada Arrow requer o pacote 'pyarrow' no servidor.")
+
+    try:
+        leitor = pa.ipc.open_stream(fluxo)
+    except pa.ArrowInvalid as e:
+        raise ErroEntrada(f"Stream Arrow inválido: {e}")
+    for lote in leitor:
+        for inicio in range(0, lote.num_rows, tamanho_lote):
+            yield lote.slice(inicio, tamanho_lote).to_pandas()
+
+
+def _ler_csv(fluxo, tamanho_lote):
+    """Lê um CSV com cabeçalho aos pedaços; o pandas só abre o fluxo na primeira leitura."""
+    try:
+        leitor = pd.read_csv(fluxo, chunksize=tamanho_lote)
+    except pd.errors.EmptyDataError:
+        raise ErroEntrada("Corpo da requisição vazio.")
+    with leitor:
+        yield from leitor
+
+
+def ler_blocos_entrada(tipo, fluxo, tamanho_lote):
+    """Escolhe o leitor pelo Content-Type. Devolve um iterador de DataFrames."""
+    if tipo == 'application/json':
+        return _ler_json_array(fluxo, tamanho_lote)
+    if tipo == 'text/csv':
+        return _ler_csv(fluxo, tamanho_lote)
+    if tipo == TIPO_ARROW:
+        return _ler_arrow(fluxo, tamanho_lote)
+    return None
+
+
+def pontuar_bloco(bloco, primeira_linha):
+    """
+    Valida o bloco inteiro de uma vez (valores ausentes ou não numéricos
+    invalidam a linha) e faz UM predict_proba para as linhas válidas.
+    Devolve o texto NDJSON do bloco, uma linha de saída por linha de entrada.
+    """
+    valores = bloco.reindex(columns=features_necessarias).apply(pd.to_numeric, errors='coerce')
+    validas = np.isfinite(valores.to_numpy(dtype=float)).all(axis=1)
+
+    probabilidades = np.full(len(bloco), np.nan)
+    if validas.any():
+        with etapas.cronometrar(etapa='predict_lote'):
+            probabilidades[validas] = modelo_rf.predict_proba(valores[validas])[:, 1]
+    n_validas = int(validas.sum())
+    linhas_pontuadas.incrementar(n_validas, resultado='ok')
+    linhas_pontuadas.incrementar(len(bloco) - n_validas, resultado='invalida')
+
+    saida = []
+    for i, (valida, probabilidade) in enumerate(zip(validas, probabilidades)):
+        linha = primeira_linha + i
+        if valida:
+            registro = {"linha": linha,
+                        "probabilidade_surto": f"{probabilidade * 100:.2f}%",
+                        "nivel_risco": "ALTO" if probabilidade > 0.5 else "BAIXO"}
+        else:
+            registro = {"linha": linha, "erro": "Features ausentes ou não numéricas.",
+                        "features_necessarias": features_necessarias}
+        saida.append(json.dumps(registro, ensure_ascii=False))
+    return '\n'.join(saida) + '\n'
+
+
+@app.route('/prever_surto_rf_lote', methods=['POST'])
+def prever_surto_rf_lote():
+    """
+    Pontua muitas linhas numa requisição. Corpo: array JSON de objetos,
+    CSV com cabeçalho ou stream Arrow IPC, com as colunas de
+    'features_necessarias'. A resposta é NDJSON, enviada bloco a bloco
+    conforme o corpo é lido: nem a entrada nem a saída ficam inteiras na
+    memória. Um erro de leitura no meio do corpo vira uma última linha
+    {"erro": ...}, pois o status 200 já foi enviado.
+    """
+    if modelo_rf is None:
+        return jsonify({"erro": "Modelo não carregado. Verifique os logs do servidor."}), 500
+
+    blocos = ler_blocos_entrada(request.mimetype, request.stream, TAMANHO_LOTE_RF)
+    if blocos is None:
+        return jsonify({"erro": f"Content-Type deve ser 'application/json', 'text/csv' ou '{TIPO_ARROW}'."}), 415
+
+    # O primeiro bloco é lido antes de responder: erro de formato ou coluna faltando ainda vira 400
+    try:
+        primeiro = next(blocos, None)
+    except (ErroEntrada, ValueError) as e:
+        return jsonify({"erro": f"Erro no processamento dos dados de entrada: {e}"}), 400
+    if primeiro is None:
+        return Response('', mimetype='application/x-ndjson')
+    if request.mimetype != 'application/json':
+        faltando = [feature for feature in features_necessarias if feature not in primeiro.columns]
+        if faltando:
+            return jsonify({"erro": "Dados de entrada incompletos.", "features_necessarias": features_necessarias}), 400
+
+    def gerar():
+        bloco, linha = primeiro, 0
+        while bloco is not None:
+            yield pontuar_bloco(bloco, linha)
+            linha += len(bloco)
+            try:
+                bloco = next(blocos, None)
+            except (ErroEntrada, ValueError) as e:
+                yield json.dumps({"erro": f"Erro no processamento dos dados de entrada: {e}", "linha": linha},
+                                 ensure_ascii=False) + '\n'
+                return
+
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
     # Usando a porta 5002 para não conflitar com a API LSTM
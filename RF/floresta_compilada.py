@@ -0,0 +1,160 @@
+import json
+import os
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# RANDOM FOREST COMPILADA EM ARRAYS PLANOS
+# -----------------------------------------------------------------------------
+# O predict_proba do sklearn para UMA linha gasta quase todo o tempo em
+# validação da entrada, tratamento do DataFrame e despacho árvore por árvore
+# (com n_jobs=-1, ainda acorda as threads do joblib). Aqui as 100 árvores
+# viram arrays contíguos (feature, limiar, filhos, valor da folha) e o lote
+# inteiro desce por todas as árvores ao mesmo tempo, um nível por iteração.
+#
+# Exportar:  python floresta_compilada.py   (a partir da pasta RF)
+# Conferir:  python verificar_paridade_floresta.py
+
+ARQUIVO_MODELO = 'modelo_dengue_rf.joblib'
+ARQUIVO_COMPILADO = 'modelo_dengue_rf_compilado.npz'
+# Lotes grandes descem em pedaços: os arrays (linhas x árvores) de cada nível cabem no cache
+LINHAS_POR_PASSADA = 1024
+
+
+class FlorestaCompilada:
+    """
+    Floresta com os nós de todas as árvores num único conjunto de arrays.
+    Os nós são renumerados para que o filho direito seja sempre o esquerdo + 1:
+    descer um nível é 'esquerda[no] + (x > limiar[no])', sem np.where. As
+    folhas apontam para si mesmas com limiar +inf, então todas as amostras
+    podem descer 'profundidade' níveis sem testar quem já chegou numa folha.
+    Expõe 'predict_proba' como o RandomForestClassifier.
+    """
+
+    def __init__(self, feature, limiar, esquerda, valores, raizes, profundidade,
+                 classes, nomes_features=None):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.limiar = np.asarray(limiar, dtype=np.float64)
+        self.esquerda = np.asarray(esquerda, dtype=np.intp)  # direita = esquerda + 1
+        self.valores = np.asarray(valores, dtype=np.float64)  # (n_nos, n_classes), já normalizado
+        self.raizes = np.asarray(raizes, dtype=np.intp)
+        self.profundidade = int(profundidade)
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = None if nomes_features is None else np.asarray(nomes_features, dtype=object)
+
+    @property
+    def n_arvores(self):
+        return len(self.raizes)
+
+    def predict_proba(self, X):
+        # Mesmo tipo que o sklearn usa na comparação: entrada em float32, limiar em float64
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= LINHAS_POR_PASSADA:
+            return self._descer(X)
+        return np.concatenate([self._descer(X[i:i + LINHAS_POR_PASSADA])
+                               for i in range(0, len(X), LINHAS_POR_PASSADA)])
+
+    def _descer(self, X):
+        n_features = X.shape[1]
+        # Índice no X achatado = linha * n_features + feature do nó
+        base = (np.arange(len(X)) * n_features)[:, None]
+        X = np.ascontiguousarray(X).ravel()
+        nos = np.broadcast_to(self.raizes, (len(X) // n_features, self.n_arvores))
+        for _ in range(self.profundidade):
+            # O sklearn vai para a esquerda se x <= limiar
+            nos = self.esquerda[nos] + (X[base + self.feature[nos]] > self.limiar[nos])
+        return self.valores[nos].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _renumerar(arvore):
+    """
+    Nova ordem dos nós da árvore (em largura) em que os dois filhos de cada nó
+    ficam lado a lado. Devolve 'nova_posicao[no_original]'.
+    """
+    nova_posicao = np.empty(arvore.node_count, dtype=np.intp)
+    nova_posicao[0] = 0
+    fila, proximo = [0], 1
+    for no in fila:
+        esquerdo = arvore.children_left[no]
+        if esquerdo == -1:
+            continue
+        nova_posicao[esquerdo], nova_posicao[arvore.children_right[no]] = proximo, proximo + 1
+        fila += [esquerdo, arvore.children_right[no]]
+        proximo += 2
+    return nova_posicao
+
+
+def compilar_floresta(modelo_rf):
+    """Achata as árvores de um RandomForestClassifier treinado numa FlorestaCompilada."""
+    feature, limiar, esquerda, valores, raizes = [], [], [], [], []
+    deslocamento = 0
+    profundidade = 0
+
+    for estimador in modelo_rf.estimators_:
+        arvore = estimador.tree_
+        n = arvore.node_count
+        folha = arvore.children_left == -1
+        posicao = _renumerar(arvore)
+        ordem = np.argsort(posicao)  # ordem[nova] = original
+
+        folha_nova = folha[ordem]
+        indices = np.arange(deslocamento, deslocamento + n)
+        filho_esquerdo = posicao[np.where(folha, 0, arvore.children_left)][ordem] + deslocamento
+
+        feature.append(np.where(folha_nova, 0, arvore.feature[ordem]))
+        limiar.append(np.where(folha_nova, np.inf, arvore.threshold[ordem]))
+        esquerda.append(np.where(folha_nova, indices, filho_esquerdo))
+        # Proporção de cada classe na folha, como no predict_proba da árvore
+        valor = arvore.value[ordem, 0, :]
+        valores.append(valor / valor.sum(axis=1, keepdims=True))
+        raizes.append(deslocamento)
+        profundidade = max(profundidade, arvore.max_depth)
+        deslocamento += n
+
+    return FlorestaCompilada(
+        np.concatenate(feature), np.concatenate(limiar), np.concatenate(esquerda),
+        np.concatenate(valores), raizes, profundidade,
+        modelo_rf.classes_, getattr(modelo_rf, 'feature_names_in_', None),
+    )
+
+
+def salvar_floresta_npz(floresta, caminho):
+    """Salva como .npz sem compressão; a especificação vai como texto JSON (sem pickle)."""
+    especificacao = {
+        'profundidade': floresta.profundidade,
+        'classes': floresta.classes_.tolist(),
+        'nomes_features': None if floresta.feature_names_in_ is None else list(floresta.feature_names_in_),
+    }
+    np.savez(caminho, especificacao=np.array(json.dumps(especificacao)), feature=floresta.feature,
+             limiar=floresta.limiar, esquerda=floresta.esquerda, valores=floresta.valores, raizes=floresta.raizes)
+
+
+def carregar_floresta_npz(caminho):
+    """Carrega uma FlorestaCompilada salva por 'salvar_floresta_npz'."""
+    with np.load(caminho) as arquivo:
+        especificacao = json.loads(str(arquivo['especificacao']))
+        return FlorestaCompilada(
+            arquivo['feature'], arquivo['limiar'], arquivo['esquerda'], arquivo['valores'],
+            arquivo['raizes'], especificacao['profundidade'], especificacao['classes'], especificacao['nomes_features'],
+        )
+
+
+def exportar(caminho_modelo=ARQUIVO_MODELO, caminho_compilado=ARQUIVO_COMPILADO):
+    """Lê o .joblib treinado e grava a versão compilada ao lado."""
+    import joblib
+
+    floresta = compilar_floresta(joblib.load(caminho_modelo))
+    salvar_floresta_npz(floresta, caminho_compilado)
+    print(f"Floresta compilada salva em '{caminho_compilado}': {floresta.n_arvores} árvores, "
+          f"{len(floresta.feature)} nós, profundidade {floresta.profundidade}.")
+    return floresta
+
+
+if __name__ == '__main__':
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    exportar(os.path.join(diretorio, ARQUIVO_MODELO), os.path.join(diretorio, ARQUIVO_COMPILADO))
@@ -3,6 +3,8 @@ from sklearn.ensemble import RandomForestClassifier
 import joblib
 import numpy as np
 
+from floresta_compilada import exportar
+
 print("Iniciando o treinamento do modelo Random Forest...")
 
 # --- 1. SIMULAÇÃO DE DADOS HISTÓRICOS ---
@@ -44,4 +46,7 @@ print("Modelo treinado com sucesso!")
 nome_arquivo_modelo = 'modelo_dengue_rf.joblib'
 joblib.dump(modelo_rf, nome_arquivo_modelo)
 
-print(f"Modelo salvo no arquivo: '{nome_arquivo_modelo}'")
\ No newline at end of file
+print(f"Modelo salvo no arquivo: '{nome_arquivo_modelo}'")
+
+# --- 5. EXPORTAR A VERSÃO COMPILADA (backend 'compilado' da API) ---
+exportar(nome_arquivo_modelo)
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+
+# A API carrega o modelo relativo à pasta atual (a pasta RF)
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+import api_predicao_rf as api
+
+# -----------------------------------------------------------------------------
+# VERIFICAÇÃO DA ROTA EM LOTE: CORPOS VÁLIDOS E INVÁLIDOS
+# -----------------------------------------------------------------------------
+# Envia corpos JSON e CSV para '/prever_surto_rf_lote' pelo cliente de teste
+# do Flask. Os válidos são lidos em pedaços de poucos bytes (cortando objetos,
+# strings e números no meio) e precisam dar as mesmas linhas que a leitura
+# normal; os malformados precisam virar 400 antes de qualquer pontuação.
+# Execute depois de mexer nos leitores de entrada:
+#   python RF/verificar_entrada_lote.py
+
+ROTA = '/prever_surto_rf_lote'
+
+
+def registro(i):
+    return {feature: 20 + i + 0.5 * j for j, feature in enumerate(api.features_necessarias)}
+
+
+def corpo_json(n):
+    return json.dumps([registro(i) for i in range(n)], indent=1)
+
+
+def enviar(cliente, corpo, tipo='application/json'):
+    resposta = cliente.post(ROTA, data=corpo.encode('utf-8'), content_type=tipo)
+    return resposta.status_code, resposta.get_data(as_text=True)
+
+
+def casos_400():
+    um = json.dumps(registro(0))
+    outro = json.dumps(registro(1))
+    return {
+        'sem vírgula entre os itens': f'[{um} {outro}]',
+        'vírgulas sobrando': f'[,,{um},,]',
+        'lixo depois do array': f'[{um}] {{"lixo": ',
+        'colchetes sobrando': f'[{um}]]]]',
+        'vírgula antes do ]': f'[{um},]',
+        'item que não é objeto': '[1, 2]',
+        'não é array': um,
+        'array incompleto': f'[{um},',
+        'corpo vazio (JSON)': '',
+        'objeto inválido no começo de um corpo grande': '[{"a": 1 x}, ' + corpo_json(5000)[1:],
+    }
+
+
+if __name__ == '__main__':
+    if api.modelo_rf is None:
+        print("ERRO: modelo RF não carregado.")
+        sys.exit(1)
+    cliente = api.app.test_client()
+    tudo_ok = True
+
+    def conferir(ok, descricao):
+        global tudo_ok
+        tudo_ok &= ok
+        print(f"  [{'OK' if ok else 'FALHA'}] {descricao}")
+
+    # Válidos: pedaços de 7 bytes têm de dar exatamente as mesmas linhas
+    corpo = corpo_json(50)
+    status, esperado = enviar(cliente, corpo)
+    leitura_original = api.TAMANHO_LEITURA
+    api.TAMANHO_LEITURA = 7
+    try:
+        status_pedacos, obtido = enviar(cliente, corpo)
+    finally:
+        api.TAMANHO_LEITURA = leitura_original
+    linhas = esperado.splitlines()
+    conferir(status == status_pedacos == 200 and obtido == esperado and len(linhas) == 50
+             and all('probabilidade_surto' in linha for linha in linhas),
+             f"JSON válido, lido inteiro e em pedaços de 7 bytes ({len(linhas)} linhas)")
+    conferir(enviar(cliente, '[]') == (200, ''), "array vazio: 200 sem linhas")
+
+    cabecalho = ','.join(api.features_necessarias)
+    csv = cabecalho + '\n' + '\n'.join(','.join(str(v) for v in registro(i).values()) for i in range(10)) + '\n'
+    status, texto = enviar(cliente, csv, 'text/csv')
+    conferir(status == 200 and len(texto.splitlines()) == 10, "CSV válido: 200 com 10 linhas")
+
+    for descricao, corpo in casos_400().items():
+        status, texto = enviar(cliente, corpo)
+        conferir(status == 400 and 'erro' in json.loads(texto), f"{descricao}: {status} {texto[:90]}")
+    for descricao, corpo in {'corpo vazio (CSV)': '', 'só espaços (CSV)': '  \n '}.items():
+        status, texto = enviar(cliente, corpo, 'text/csv')
+        conferir(status == 400, f"{descricao}: {status} {texto[:90]}")
+
+    # Depois do primeiro bloco o 200 já saiu: o erro vira a última linha do NDJSON
+    lote_original = api.TAMANHO_LOTE_RF
+    api.TAMANHO_LOTE_RF = 2
+    try:
+        um = json.dumps(registro(0))
+        status, texto = enviar(cliente, f'[{um}, {um}, {um} {um}]')
+    finally:
+        api.TAMANHO_LOTE_RF = lote_original
+    linhas = texto.splitlines()
+    conferir(status == 200 and len(linhas) == 3 and 'erro' in json.loads(linhas[-1]),
+             "erro depois do primeiro bloco: linha final {\"erro\"}")
+
+    if not tudo_ok:
+        print("\nERRO: a rota em lote aceitou ou rejeitou um corpo indevidamente.")
+        sys.exit(1)
+    print("\nRota em lote: corpos válidos pontuados e malformados rejeitados.")
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from floresta_compilada import ARQUIVO_COMPILADO, ARQUIVO_MODELO, carregar_floresta_npz, compilar_floresta
+
+# -----------------------------------------------------------------------------
+# VERIFICAÇÃO DE PARIDADE: SKLEARN x FLORESTA COMPILADA
+# -----------------------------------------------------------------------------
+# Compara o predict_proba do RandomForestClassifier com o da floresta
+# compilada, em linhas aleatórias (com folga fora da faixa de treino) e em
+# linhas exatamente sobre os limiares das árvores, onde um erro de tipo ou
+# de comparação (< x <=) apareceria. Execute sempre que o modelo for
+# retreinado:  python RF/verificar_paridade_floresta.py
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+TOLERANCIA = 1e-12
+N_LINHAS = 5000
+
+
+def gerar_entradas(modelo_rf, rng):
+    nomes = list(modelo_rf.feature_names_in_)
+    # Faixas da simulação de 'treinar_modelo_rf.py', com folga
+    aleatorias = rng.uniform([15, 40, -5, 0], [40, 100, 60, 30], size=(N_LINHAS, len(nomes)))
+
+    # Cada feature recebe, numa linha, um limiar real usado por alguma árvore
+    sobre_limiares = aleatorias[:1000].copy()
+    for arvore in modelo_rf.estimators_:
+        no = arvore.tree_
+        internos = np.flatnonzero(no.children_left != -1)
+        escolhidos = rng.choice(internos, size=min(10, len(internos)), replace=False)
+        linhas = rng.integers(0, len(sobre_limiares), size=len(escolhidos))
+        sobre_limiares[linhas, no.feature[escolhidos]] = no.threshold[escolhidos]
+
+    return pd.DataFrame(np.vstack([aleatorias, sobre_limiares]), columns=nomes)
+
+
+if __name__ == '__main__':
+    modelo_rf = joblib.load(os.path.join(DIRETORIO, ARQUIVO_MODELO))
+    caminho_compilado = os.path.join(DIRETORIO, ARQUIVO_COMPILADO)
+    if os.path.exists(caminho_compilado):
+        floresta = carregar_floresta_npz(caminho_compilado)
+        origem = f"'{ARQUIVO_COMPILADO}'"
+    else:
+        floresta = compilar_floresta(modelo_rf)
+        origem = "compilada agora (arquivo .npz não encontrado)"
+
+    entradas = gerar_entradas(modelo_rf, np.random.default_rng(42))
+    esperado = modelo_rf.predict_proba(entradas)
+    obtido = floresta.predict_proba(entradas.to_numpy())
+    diferenca = float(np.max(np.abs(esperado - obtido)))
+    classes_ok = np.array_equal(modelo_rf.predict(entradas), floresta.predict(entradas.to_numpy()))
+
+    ok = esperado.shape == obtido.shape and diferenca <= TOLERANCIA and classes_ok
+    print(f"  [{'OK' if ok else 'FALHA'}] Floresta {origem}: {len(entradas)} linhas, diferença máxima {diferenca:.2e}")
+    if not ok:
+        print(f"\nERRO: a floresta compilada difere do sklearn acima da tolerância ({TOLERANCIA}).")
+        sys.exit(1)
+    print("\nFloresta compilada equivalente ao sklearn.")
@@ -0,0 +1,321 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.preprocessing import MinMaxScaler
+
+# -----------------------------------------------------------------------------
+# TREINAMENTO DOS MODELOS LSTM DA API MESTRA (1, 3 E 5 DIAS)
+# -----------------------------------------------------------------------------
+# Substitui os scripts lstm_24hr.py, lstm_3d.py e lstm_5d.py: mesma simulação,
+# mesmas regras de risco e mesmos nomes de arquivo esperados por
+# 'config_modelos' na api_mestra.py, mas com rótulos e sequências montados
+# de forma vetorizada e a opção de treinar vários horizontes em paralelo.
+#
+# Uso:
+#   python "Treinar API models/treinar_lstm.py"                  # todos os horizontes
+#   python "Treinar API models/treinar_lstm.py" --horizontes 3 5
+#   python "Treinar API models/treinar_lstm.py" --paralelo       # um processo por horizonte
+#   python "Treinar API models/treinar_lstm.py" --horizontes multi  # modelo único 1/3/5 dias
+#   python "Treinar API models/treinar_lstm.py" --armazem dados/previsoes.db --ajustar-scaler
+#
+# Com --armazem, os dados simulados dão lugar ao clima observado gravado
+# pelas APIs (armazem_previsoes.py), cruzado com o IIP de cada bairro; as
+# regras de risco continuam as mesmas.
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(DIRETORIO)
+ARQUIVO_SCALER = 'scaler_features_dengue.joblib'
+ARQUIVO_MANIFESTO = 'manifesto_modelos.json'
+COLUNAS = ['temperatura', 'umidade', 'chuva_mm', 'iip_bairro']
+
+# Cada horizonte: passos de 3h, nº de períodos simulados, regra de risco
+# (temp. média >, umid. média >, chuva total >) e arquivo do modelo.
+HORIZONTES = {
+    '1': {'passos': 8, 'periodos': 5000, 'regra': (27, 70, 5), 'arquivo': 'modelo_lstm_24h.keras'},
+    '3': {'passos': 24, 'periodos': 3000, 'regra': (26, 75, 15), 'arquivo': 'modelo_lstm_3d.keras'},
+    '5': {'passos': 40, 'periodos': 2000, 'regra': (25, 78, 20), 'arquivo': 'modelo_lstm_5d.keras'},
+}
+
+# Modelo multi-horizonte: um LSTM com return_sequences sobre os 40 passos e
+# uma "cabeça" (saída) por horizonte; a cabeça de cada horizonte é lida no
+# último passo dele (8, 24 ou 40). As saídas seguem a ordem de HORIZONTES.
+MULTI = 'multi'
+CONFIG_MULTI = {'passos': 40, 'periodos': 3000, 'arquivo': 'modelo_lstm_multi.keras'}
+
+
+# --- 1. SIMULAÇÃO DE DADOS ---
+
+def simular_dados(total_intervalos, rng):
+    """Simula 'total_intervalos' passos de 3h com as colunas de COLUNAS."""
+    return pd.DataFrame({
+        'temperatura': rng.uniform(20, 35, size=total_intervalos),
+        'umidade': rng.uniform(50, 95, size=total_intervalos),
+        'chuva_mm': rng.choice([0, 1, 3, 5], size=total_intervalos, p=[0.7, 0.1, 0.1, 0.1]),
+        'iip_bairro': rng.uniform(4, 23, size=total_intervalos),
+    })
+
+
+def obter_dados(periodos, seq_len, rng, armazem=None, local=None):
+    """
+    Os dados de treino de um horizonte: 'periodos' períodos simulados ou,
+    com 'armazem', todo o histórico real, com cada série cortada num número
+    inteiro de períodos de 'seq_len' passos (nenhum período mistura bairros).
+    """
+    if armazem is None:
+        return simular_dados(periodos * seq_len, rng)
+    sys.path.insert(0, RAIZ)
+    from armazem_previsoes import historico_de_treino
+
+    dados = historico_de_treino(armazem, local, passos_multiplo=seq_len)[COLUNAS]
+    if len(dados) == 0:
+        raise SystemExit(f"ERRO: o armazém '{armazem}' não tem {seq_len} passos seguidos de clima observado.")
+    return dados
+
+
+# --- 2. CRIAÇÃO DO ALVO (TARGET) ---
+
+def gerar_rotulos(dados, seq_len, regra):
+    """
+    Rótulo de cada período de 'seq_len' passos, sem laço em Python: os dados
+    são vistos como (periodos, seq_len, features) e reduzidos no eixo do tempo.
+    """
+    temp_limite, umid_limite, chuva_limite = regra
+    periodos = len(dados) // seq_len
+    blocos = np.asarray(dados)[:periodos * seq_len].reshape(periodos, seq_len, -1)
+    temp_media = blocos[:, :, 0].mean(axis=1)
+    umid_media = blocos[:, :, 1].mean(axis=1)
+    chuva_total = blocos[:, :, 2].sum(axis=1)
+    return ((temp_media > temp_limite) & (umid_media > umid_limite) & (chuva_total > chuva_limite)).astype(np.int64)
+
+
+def gerar_rotulos_multi(dados, seq_len):
+    """
+    Rótulos do modelo multi-horizonte, formato (periodos, seq_len, n_horizontes):
+    a cabeça de cada horizonte recebe o rótulo da regra dele no seu último
+    passo; as demais posições ficam com -1 (ignoradas pela perda).
+    """
+    periodos = len(dados) // seq_len
+    blocos = np.asarray(dados)[:periodos * seq_len].reshape(periodos, seq_len, -1)
+    y = np.full((periodos, seq_len, len(HORIZONTES)), -1.0, dtype=np.float32)
+    for cabeca, config in enumerate(HORIZONTES.values()):
+        passos = config['passos']
+        prefixo = blocos[:, :passos].reshape(-1, blocos.shape[2])
+        y[:, passos - 1, cabeca] = gerar_rotulos(prefixo, passos, config['regra'])
+    return y
+
+
+def perda_mascarada(y_true, y_pred):
+    """Entropia cruzada binária só nas posições com rótulo (y_true >= 0)."""
+    from tensorflow.keras import ops
+
+    mascara = ops.cast(y_true >= 0, 'float32')
+    y_pred = ops.clip(y_pred, 1e-7, 1 - 1e-7)
+    entropia = -(y_true * ops.log(y_pred) + (1 - y_true) * ops.log(1 - y_pred))
+    return ops.sum(entropia * mascara) / ops.maximum(ops.sum(mascara), 1.0)
+
+
+# --- 3. SEQUÊNCIAS ---
+
+def montar_sequencias(dados_normalizados, seq_len):
+    """Janelas sem sobreposição como view (periodos, seq_len, features) — nenhuma cópia."""
+    periodos = len(dados_normalizados) // seq_len
+    return dados_normalizados[:periodos * seq_len].reshape(periodos, seq_len, dados_normalizados.shape[1])
+
+
+def versao_scaler(caminho):
+    """Identificador do scaler (hash do arquivo), gravado no manifesto de cada modelo."""
+    with open(caminho, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def obter_scaler(ajustar, rng, armazem=None, local=None):
+    """
+    Carrega o scaler compartilhado, ou ajusta (fit) um novo com os dados do
+    horizonte de 24h, como fazia o lstm_24hr.py.
+    """
+    caminho = os.path.join(DIRETORIO, ARQUIVO_SCALER)
+    if not ajustar and os.path.exists(caminho):
+        print(f"Normalizador '{ARQUIVO_SCALER}' carregado.")
+        return joblib.load(caminho)
+
+    config = HORIZONTES['1']
+    dados = obter_dados(config['periodos'], config['passos'], rng, armazem, local)
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(dados)
+    joblib.dump(scaler, caminho)
+    print(f"Normalizador '{ARQUIVO_SCALER}' ajustado e salvo.")
+    return scaler
+
+
+# --- 4. TREINAMENTO ---
+
+def treinar_horizonte(dias, epocas=10, semente=None, threads=None, armazem=None, local=None):
+    """Treina e salva o modelo de um horizonte. Roda no processo atual ou num worker."""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
+
+    if threads:
+        # Evita que N workers disputem todos os núcleos cada um
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    config = HORIZONTES[dias]
+    seq_len = config['passos']
+    rng = np.random.default_rng(None if semente is None else semente + int(dias))
+    if semente is not None:
+        tf.random.set_seed(semente + int(dias))
+
+    inicio = time.perf_counter()
+    dados = obter_dados(config['periodos'], seq_len, rng, armazem, local)
+    periodos = len(dados) // seq_len
+    print(f"--- Treinando modelo de {dias} dia(s) ({seq_len} passos, {periodos} períodos) ---")
+    y = gerar_rotulos(dados.to_numpy(), seq_len, config['regra'])
+
+    caminho_scaler = os.path.join(DIRETORIO, ARQUIVO_SCALER)
+    scaler = joblib.load(caminho_scaler)
+    X = montar_sequencias(scaler.transform(dados), seq_len)
+    print(f"  [{dias}d] X: {X.shape} | y: {y.shape} | positivos: {int(y.sum())}")
+
+    modelo = Sequential([
+        Input(shape=(seq_len, len(COLUNAS))),
+        LSTM(50),
+        Dropout(0.2),
+        Dense(1, activation='sigmoid'),
+    ])
+    modelo.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+    modelo.fit(X, y, epochs=epocas, batch_size=32, verbose=2)
+
+    modelo.save(os.path.join(DIRETORIO, config['arquivo']))
+    segundos = time.perf_counter() - inicio
+    print(f"  [{dias}d] Modelo '{config['arquivo']}' salvo em {segundos:.1f} s.")
+
+    return dias, {
+        'arquivo': config['arquivo'],
+        'passos': seq_len,
+        'periodos': periodos,
+        'epocas': epocas,
+        'dados': armazem or 'simulados',
+        'versao_scaler': versao_scaler(caminho_scaler),
+        'treinado_em': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def treinar_multi_horizonte(epocas=10, semente=None, threads=None, armazem=None, local=None):
+    """Treina o modelo único que devolve o risco de 1, 3 e 5 dias numa só passada."""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    seq_len = CONFIG_MULTI['passos']
+    rng = np.random.default_rng(None if semente is None else semente + 100)
+    if semente is not None:
+        tf.random.set_seed(semente + 100)
+
+    inicio = time.perf_counter()
+    dados = obter_dados(CONFIG_MULTI['periodos'], seq_len, rng, armazem, local)
+    periodos = len(dados) // seq_len
+    print(f"--- Treinando modelo multi-horizonte ({seq_len} passos, {periodos} períodos) ---")
+    y = gerar_rotulos_multi(dados.to_numpy(), seq_len)
+
+    caminho_scaler = os.path.join(DIRETORIO, ARQUIVO_SCALER)
+    scaler = joblib.load(caminho_scaler)
+    X = montar_sequencias(scaler.transform(dados), seq_len)
+    print(f"  [multi] X: {X.shape} | y: {y.shape}")
+
+    modelo = Sequential([
+        Input(shape=(seq_len, len(COLUNAS))),
+        LSTM(50, return_sequences=True),
+        Dropout(0.2),
+        Dense(len(HORIZONTES), activation='sigmoid'),  # uma cabeça por horizonte, em cada passo
+    ])
+    modelo.compile(optimizer='adam', loss=perda_mascarada)
+    modelo.fit(X, y, epochs=epocas, batch_size=32, verbose=2)
+
+    modelo.save(os.path.join(DIRETORIO, CONFIG_MULTI['arquivo']))
+    segundos = time.perf_counter() - inicio
+    print(f"  [multi] Modelo '{CONFIG_MULTI['arquivo']}' salvo em {segundos:.1f} s.")
+
+    return MULTI, {
+        'arquivo': CONFIG_MULTI['arquivo'],
+        'passos': seq_len,
+        'periodos': periodos,
+        'epocas': epocas,
+        'dados': armazem or 'simulados',
+        # Cabeça (índice da saída) e passo em que cada horizonte é lido
+        'cabecas': {dias: {'indice': i, 'passo': config['passos'] - 1} for i, (dias, config) in enumerate(HORIZONTES.items())},
+        'versao_scaler': versao_scaler(caminho_scaler),
+        'treinado_em': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def _treinar(nome, epocas, semente, threads=None, armazem=None, local=None):
+    if nome == MULTI:
+        return treinar_multi_horizonte(epocas, semente, threads, armazem, local)
+    return treinar_horizonte(nome, epocas, semente, threads, armazem, local)
+
+
+def atualizar_manifesto(resultados):
+    """Grava/atualiza o manifesto com os horizontes treinados nesta execução."""
+    caminho = os.path.join(DIRETORIO, ARQUIVO_MANIFESTO)
+    manifesto = {'scaler': ARQUIVO_SCALER, 'modelos': {}}
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as f:
+            manifesto = json.load(f)
+    manifesto['modelos'].update(resultados)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    print(f"Manifesto '{ARQUIVO_MANIFESTO}' atualizado.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina os modelos LSTM de 1, 3 e 5 dias da API Mestra.")
+    parser.add_argument('--horizontes', nargs='+', choices=[*HORIZONTES, MULTI], default=list(HORIZONTES),
+                        help="Horizontes (em dias) a treinar; 'multi' treina o modelo multi-horizonte. Padrão: 1 3 5.")
+    parser.add_argument('--paralelo', action='store_true', help="Treina cada horizonte num processo separado.")
+    parser.add_argument('--epocas', type=int, default=10)
+    parser.add_argument('--semente', type=int, default=None, help="Semente para resultados reproduzíveis.")
+    parser.add_argument('--ajustar-scaler', action='store_true',
+                        help="Ajusta um novo scaler mesmo que já exista (os modelos antigos ficam incompatíveis).")
+    parser.add_argument('--armazem', help="Treina com o histórico real deste armazém de previsões (SQLite).")
+    parser.add_argument('--local', help="Local do armazém (ex.: 'Montes Claros,MG,BR'); opcional se houver só um.")
+    args = parser.parse_args()
+    armazem = os.path.abspath(args.armazem) if args.armazem else None
+
+    rng = np.random.default_rng(args.semente)
+    obter_scaler(args.ajustar_scaler, rng, armazem, args.local)
+
+    if args.paralelo and len(args.horizontes) > 1:
+        n_workers = len(args.horizontes)
+        threads = max(1, (os.cpu_count() or 1) // n_workers)
+        # 'spawn': cada worker inicializa o TensorFlow do zero (fork + TF não é seguro)
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=contexto) as executor:
+            futuros = [executor.submit(_treinar, dias, args.epocas, args.semente, threads, armazem, args.local)
+                       for dias in args.horizontes]
+            resultados = dict(futuro.result() for futuro in futuros)
+    else:
+        resultados = dict(_treinar(dias, args.epocas, args.semente, None, armazem, args.local)
+                          for dias in args.horizontes)
+
+    atualizar_manifesto(resultados)
+    print("Treinamento concluído!")
+
+
+if __name__ == '__main__':
+    main()
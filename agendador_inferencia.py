@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Faixas do histograma de tamanho de lote (em linhas por chamada ao modelo)
+FAIXAS_TAMANHO_LOTE = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _FilaHorizonte:
+    """Fila de um modelo: pedidos pendentes + thread que os executa em lote."""
+
+    def __init__(self, nome, modelo, tamanho_max_lote, espera_max_segundos):
+        self.nome = nome
+        self.modelo = modelo
+        self.tamanho_max_lote = tamanho_max_lote
+        self.espera_max_segundos = espera_max_segundos
+        self.pendentes = deque()  # (entrada, futuro, instante de chegada)
+        self.linhas_pendentes = 0
+        self.condicao = threading.Condition()
+        self.total_lotes = 0
+        self.total_linhas = 0
+        self.histograma_lotes = [0] * (len(FAIXAS_TAMANHO_LOTE) + 1)
+        threading.Thread(target=self._executar, name=f'micro-lote-{nome}', daemon=True).start()
+
+    def submeter(self, entrada):
+        futuro = Future()
+        with self.condicao:
+            self.pendentes.append((entrada, futuro, time.monotonic()))
+            self.linhas_pendentes += len(entrada)
+            self.condicao.notify()
+        return futuro
+
+    def _proximo_lote(self):
+        """Espera até ter 'tamanho_max_lote' linhas ou até vencer o prazo do pedido mais antigo."""
+        with self.condicao:
+            while not self.pendentes:
+                self.condicao.wait()
+            prazo = self.pendentes[0][2] + self.espera_max_segundos
+            while self.linhas_pendentes < self.tamanho_max_lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                self.condicao.wait(restante)
+
+            # Pedidos nunca são divididos; um pedido maior que o limite vai sozinho
+            lote, linhas = [], 0
+            while self.pendentes and (not lote or linhas + len(self.pendentes[0][0]) <= self.tamanho_max_lote):
+                entrada, futuro, _ = self.pendentes.popleft()
+                lote.append((entrada, futuro))
+                linhas += len(entrada)
+            self.linhas_pendentes -= linhas
+            return lote, linhas
+
+    def _executar(self):
+        while True:
+            lote, linhas = self._proximo_lote()
+            try:
+                entradas = [entrada for entrada, _ in lote]
+                saida = self.modelo.predict(np.concatenate(entradas) if len(entradas) > 1 else entradas[0], verbose=0)
+            except Exception as e:
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+                continue
+
+            inicio = 0
+            for entrada, futuro in lote:
+                futuro.set_result(saida[inicio:inicio + len(entrada)])
+                inicio += len(entrada)
+
+            self.total_lotes += 1
+            self.total_linhas += linhas
+            self.histograma_lotes[np.searchsorted(FAIXAS_TAMANHO_LOTE, linhas)] += 1
+
+
+class AgendadorInferencia:
+    """
+    Agrupa as chamadas concorrentes ao modelo (micro-lotes). Cada requisição
+    entrega sua sequência e recebe um Future; uma thread por horizonte junta
+    os pedidos que chegarem em até 'espera_max_ms' (ou até 'tamanho_max_lote'
+    linhas) e faz UM predict para todos, devolvendo a linha de cada um.
+    """
+
+    def __init__(self, modelos, tamanho_max_lote=64, espera_max_ms=2.0):
+        self._filas = {
+            nome: _FilaHorizonte(nome, modelo, tamanho_max_lote, espera_max_ms / 1000.0)
+            for nome, modelo in modelos.items()
+        }
+
+    def submeter(self, nome_modelo, entrada):
+        """Enfileira 'entrada' (n, passos, features) e devolve um Future com a saída (n, 1)."""
+        return self._filas[nome_modelo].submeter(entrada)
+
+    def prever(self, nome_modelo, entrada):
+        return self.submeter(nome_modelo, entrada).result()
+
+    def estatisticas(self):
+        """Profundidade atual das filas e distribuição dos tamanhos de lote por horizonte."""
+        resultado = {}
+        for nome, fila in self._filas.items():
+            faixas = [f'<={limite}' for limite in FAIXAS_TAMANHO_LOTE] + [f'>{FAIXAS_TAMANHO_LOTE[-1]}']
+            resultado[nome] = {
+                'profundidade_fila': len(fila.pendentes),
+                'linhas_na_fila': fila.linhas_pendentes,
+                'total_lotes': fila.total_lotes,
+                'total_linhas': fila.total_linhas,
+                'media_linhas_por_lote': round(fila.total_linhas / fila.total_lotes, 2) if fila.total_lotes else 0.0,
+                'distribuicao_tamanho_lote': dict(zip(faixas, fila.histograma_lotes)),
+            }
+        return resultado
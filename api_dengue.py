@@ -1,6 +1,16 @@
-from flask import Flask, jsonify, abort
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, jsonify, abort, request
 import pandas as pd
 import requests
+from indice_bairros import IndiceBairros
+from armazem_previsoes import abrir_armazem, hidratar_cache, registrar
+from cache_previsao import PASSO_PREVISAO_SEGUNDOS
+from cache_compartilhado import abrir_area, criar_cache_previsao
+from cidades import CIDADE_PADRAO, carregar_cidades, resolver_cidade
+from cliente_meteorologia import ClienteMeteorologia
+from metricas import RegistroMetricas, instrumentar_flask
+from perfilamento import instrumentar_perfil_flask
 
 # -----------------------------------------------------------------------------
 # CONFIGURAÇÃO INICIAL
@@ -9,31 +19,97 @@ import requests
 app = Flask(__name__)
 
 # Configurações da API de Meteorologia (OpenWeatherMap)
-API_KEY_WEATHER = " " 
-# COLOQUE O NOME DA SUA CIDADE E ESTADO PARA PRECISÃO NA BUSCA
-CIDADE = "Montes Claros"
-ESTADO = "MG"
-PAIS = "BR"
+API_KEY_WEATHER = os.environ.get('API_KEY_WEATHER', " ")
+# As cidades atendidas ficam em 'cidades.json' (ver cidades.py); sem '?cidade='
+# na URL vale a CIDADE_PADRAO
+cidades = carregar_cidades()
+cidade_padrao = cidades[CIDADE_PADRAO]
+
+# Cliente HTTP único do processo (keep-alive, timeouts e retentativas)
+cliente_meteorologia = ClienteMeteorologia(API_KEY_WEATHER)
+
+# O tempo atual do OpenWeatherMap muda a cada ~10 min; a previsão, a cada 3h
+TTL_TEMPO_ATUAL = 10 * 60
 
 # -----------------------------------------------------------------------------
 # CARREGAMENTO DOS DADOS DOS BAIRROS
 # -----------------------------------------------------------------------------
 
-def carregar_dados_bairros():
+ARQUIVO_BAIRROS = cidade_padrao.bairros_dengue
+
+def ler_tabela_bairros(caminho):
+    return pd.read_excel(caminho, index_col='bairro')
+
+def carregar_dados_bairros(arquivo_bairros=ARQUIVO_BAIRROS):
     """
-    Esta função lê o arquivo excel com os dados dos bairros e o carrega
-    em um DataFrame do Pandas. Ela trata o erro caso o arquivo não seja encontrado.
+    Esta função lê o arquivo excel com os dados dos bairros e monta um índice
+    (nome normalizado -> dados do bairro) usado nas consultas. O índice se
+    recarrega sozinho se a planilha for alterada. Ela trata o erro caso o
+    arquivo não seja encontrado.
     """
     try:
-        df = pd.read_excel('tabela_codigo.xlsx', index_col='bairro')
-        return df
+        indice = IndiceBairros(arquivo_bairros, ler_tabela_bairros, 'iip_percentual')
+        indice.iniciar_monitoramento()
+        return indice
     except FileNotFoundError:
         # Se o arquivo não for encontrado, o programa não pode funcionar.
-        print("ERRO: Arquivo 'dados_dengue.csv' não encontrado!")
-        print("Verifique se o arquivo está na mesma pasta que o script Python e se o nome está correto.")
+        print(f"ERRO: Arquivo '{arquivo_bairros}' não encontrado!")
+        print("Verifique se o script está sendo executado a partir da raiz do projeto e se o nome está correto.")
         return None
 
-dados_bairros_df = carregar_dados_bairros()
+# Um índice por cidade que tenha a planilha desta API (as outras respondem 404)
+indices_bairros = {cidade.id: carregar_dados_bairros(cidade.bairros_dengue)
+                   for cidade in cidades.values() if cidade.bairros_dengue}
+indice_bairros = indices_bairros.get(cidade_padrao.id)
+
+# Métricas por etapa em '/metrics' (formato Prometheus) e prontidão em '/health'
+metricas = RegistroMetricas('dengue_')
+etapas = metricas.histograma('etapa_segundos', "Duração de cada etapa da requisição.", ('etapa',))
+erros_externos = metricas.contador('erros_externos_total', "Falhas nas chamadas ao OpenWeatherMap.", ('tipo',))
+instrumentar_flask(app, metricas, lambda: indice_bairros is not None)
+consultas_cache = metricas.contador('cache_meteorologia_total', "Consultas aos caches de tempo atual e previsão.", ('endpoint', 'resultado'))
+# Perfil de uma requisição sob demanda (cabeçalho X-Perfil; ver perfilamento.py)
+instrumentar_perfil_flask(app)
+
+
+# -----------------------------------------------------------------------------
+# CACHES DO TEMPO ATUAL E DA PREVISÃO (COM O ARMAZÉM LOCAL)
+# -----------------------------------------------------------------------------
+# Toda resposta buscada é gravada no armazém (armazem_previsoes.py); ao subir,
+# os caches partem da última resposta gravada que ainda for utilizável. Com
+# CACHE_COMPARTILHADO, os workers do servidor pré-fork usam os mesmos caches
+# (cache_compartilhado.py).
+
+armazem_previsoes = abrir_armazem()
+area_compartilhada = abrir_area()
+
+def _criar_busca(endpoint):
+    def buscar(local):
+        try:
+            dados = cliente_meteorologia.buscar(endpoint, local)
+        except requests.exceptions.HTTPError:
+            erros_externos.incrementar(tipo='http')
+            raise
+        except requests.exceptions.RequestException:
+            erros_externos.incrementar(tipo='conexao')
+            raise
+        registrar(armazem_previsoes, endpoint, local, dados)
+        return dados
+    return buscar
+
+def _criar_cache(endpoint, ttl):
+    cache = criar_cache_previsao(
+        area_compartilhada, f'dengue:{endpoint}', _criar_busca(endpoint), ttl=ttl,
+        ao_consultar=lambda resultado: consultas_cache.incrementar(endpoint=endpoint, resultado=resultado))
+    if armazem_previsoes is not None:
+        for id_cidade in indices_bairros:
+            hidratar_cache(cache, armazem_previsoes, endpoint, cidades[id_cidade].local)
+    return cache
+
+cache_tempo_atual = _criar_cache('weather', TTL_TEMPO_ATUAL)
+cache_previsao = _criar_cache('forecast', PASSO_PREVISAO_SEGUNDOS)
+# Consulta o cache do tempo atual em paralelo com o da previsão
+executor_caches = ThreadPoolExecutor(max_workers=4, thread_name_prefix='caches-meteorologia')
 
 
 # -----------------------------------------------------------------------------
@@ -76,54 +152,96 @@ def gerar_alerta_dengue(dados_weather_atual, dados_forecast):
     }
 
 
+def montar_resposta_previsao(nome_bairro, info_bairro, dados_weather, dados_forecast):
+    """Monta a resposta da rota a partir dos dados já buscados (usada também pelo servidor assíncrono)."""
+    # Extrai os dados do tempo atual
+    info_meteorologica = {
+        "temperatura_atual_celsius": dados_weather['main']['temp'],
+        "sensacao_termica_celsius": dados_weather['main']['feels_like'],
+        "umidade_percentual": dados_weather['main']['humidity'],
+        "descricao_tempo": dados_weather['weather'][0]['description']
+    }
+    
+    alerta_dengue = gerar_alerta_dengue(dados_weather, dados_forecast)
+
+    return {
+        "bairro_pesquisado": nome_bairro.upper(),
+        "alerta_de_risco": alerta_dengue, 
+        "dados_locais": info_bairro,
+        "dados_meteorologicos_atuais": info_meteorologica
+    }
+
+
+def resolver_cidade_bairros(parametros):
+    """Cidade pedida na URL, desde que tenha tabela de bairros nesta API: (Cidade, None) ou (None, (mensagem, status))."""
+    cidade, erro = resolver_cidade(cidades, parametros)
+    if erro is None and cidade.id not in indices_bairros:
+        return None, (f"A cidade '{cidade.id}' não tem tabela de bairros nesta API.", 404)
+    return cidade, erro
+
+
 # -----------------------------------------------------------------------------
 # ROTA PRINCIPAL DA API - ATUALIZADA
 # -----------------------------------------------------------------------------
 
 @app.route('/previsao/<string:nome_bairro>', methods=['GET'])
 def obter_previsao_por_bairro(nome_bairro):
-    if dados_bairros_df is None:
+    cidade, erro = resolver_cidade_bairros(request.args)
+    if erro is not None:
+        return jsonify({"erro": erro[0]}), erro[1]
+    indice = indices_bairros[cidade.id]
+    if indice is None:
         abort(500, description="Erro interno: não foi possível carregar os dados dos bairros.")
 
-    try:
-        info_bairro = dados_bairros_df.loc[nome_bairro.upper()].to_dict()
-    except KeyError:
+    with etapas.cronometrar(etapa='busca_bairro'):
+        info_bairro = indice.obter(nome_bairro)
+    if info_bairro is None:
         return jsonify({"erro": f"Bairro '{nome_bairro}' não encontrado na base de dados."}), 404
 
     try:
-        url_weather_api = f"http://api.openweathermap.org/data/2.5/weather?q={CIDADE},{ESTADO},{PAIS}&appid={API_KEY_WEATHER}&units=metric&lang=pt_br"
-        resposta_weather = requests.get(url_weather_api)
-        resposta_weather.raise_for_status() 
-        dados_weather = resposta_weather.json()
-
-        url_forecast_api = f"http://api.openweathermap.org/data/2.5/forecast?q={CIDADE},{ESTADO},{PAIS}&appid={API_KEY_WEATHER}&units=metric&lang=pt_br"
-        resposta_forecast = requests.get(url_forecast_api)
-        resposta_forecast.raise_for_status()
-        dados_forecast = resposta_forecast.json()
-
+        # Tempo atual e previsão são independentes: na falta dos dois, buscamos ao mesmo tempo
+        with etapas.cronometrar(etapa='meteorologia'):
+            futuro_weather = executor_caches.submit(cache_tempo_atual.obter, cidade.local)
+            dados_forecast = cache_previsao.obter(cidade.local)
+            dados_weather = futuro_weather.result()
     except requests.exceptions.HTTPError as err:
         return jsonify({"erro": f"Erro ao buscar dados de meteorologia: {err}"}), 502
-    except requests.exceptions.RequestException as err:
+    except (requests.exceptions.RequestException, RuntimeError) as err:
         return jsonify({"erro": f"Erro de conexão com a API de meteorologia: {err}"}), 503
 
-    # Extrai os dados do tempo atual
-    info_meteorologica = {
-        "temperatura_atual_celsius": dados_weather['main']['temp'],
-        "sensacao_termica_celsius": dados_weather['main']['feels_like'],
-        "umidade_percentual": dados_weather['main']['humidity'],
-        "descricao_tempo": dados_weather['weather'][0]['description']
-    }
-    
-    alerta_dengue = gerar_alerta_dengue(dados_weather, dados_forecast)
+    with etapas.cronometrar(etapa='montagem_resposta'):
+        resposta_final = montar_resposta_previsao(nome_bairro, info_bairro, dados_weather, dados_forecast)
+    with etapas.cronometrar(etapa='serializacao_json'):
+        return jsonify(resposta_final)
 
-    resposta_final = {
-        "bairro_pesquisado": nome_bairro.upper(),
-        "alerta_de_risco": alerta_dengue, 
-        "dados_locais": info_bairro,
-        "dados_meteorologicos_atuais": info_meteorologica
-    }
 
-    return jsonify(resposta_final)
+# -----------------------------------------------------------------------------
+# PRÉ-FORK (servidor_producao.py)
+# -----------------------------------------------------------------------------
+# Os índices de bairros são herdados pelos workers; threads, sockets e a
+# conexão SQLite são recriados em cada um.
+
+def preparar_fork():
+    """No mestre, antes do primeiro fork."""
+    global armazem_previsoes
+    for indice in indices_bairros.values():
+        if indice is not None:
+            indice.parar_monitoramento()
+    if armazem_previsoes is not None:
+        armazem_previsoes.fechar()
+        armazem_previsoes = None
+    if area_compartilhada is not None:
+        area_compartilhada.fechar()  # cada worker abre a sua conexão ao usar
+
+def reiniciar_apos_fork():
+    """Em cada worker, logo depois do fork."""
+    global cliente_meteorologia, armazem_previsoes, executor_caches
+    cliente_meteorologia = ClienteMeteorologia(API_KEY_WEATHER)
+    armazem_previsoes = abrir_armazem()
+    executor_caches = ThreadPoolExecutor(max_workers=4, thread_name_prefix='caches-meteorologia')
+    for indice in indices_bairros.values():
+        if indice is not None:
+            indice.iniciar_monitoramento()
 
 
 # -----------------------------------------------------------------------------
@@ -131,4 +249,5 @@ def obter_previsao_por_bairro(nome_bairro):
 # -----------------------------------------------------------------------------
 
 if __name__ == '__main__':
+    # Desenvolvimento; em produção use 'python servidor_producao.py dengue'
     app.run(debug=True)
@@ -1,11 +1,27 @@
-import pandas as pd
-import requests
+import hashlib
 import joblib
 import numpy as np
 import os
-from flask import Flask, jsonify, abort, request
-from tensorflow.keras.models import load_model
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, abort, request
 from flask_cors import CORS
+from cache_previsao import segundos_ate_proximo_passo
+from cache_resultados import etag_corresponde, etag_da_chave
+from cache_compartilhado import abrir_area, criar_cache_previsao, criar_cache_resultados
+from cidades import CIDADE_PADRAO, carregar_cidades, resolver_cidade
+from cliente_meteorologia import ClienteMeteorologia
+from previsao_colunar import converter_previsao, previsao_de_bytes, previsao_para_bytes
+from superficie_risco import SuperficiesRisco
+from indice_bairros import IndiceBairros
+from agendador_inferencia import AgendadorInferencia
+from armazem_previsoes import abrir_armazem, hidratar_cache, registrar
+from metricas import RegistroMetricas, instrumentar_flask
+from perfilamento import instrumentar_perfil_flask
+from LSTM.inferencia_numpy import BufferPorThread, NormalizacaoAfim, carregar_modelo_numpy
+from LSTM.inferencia_incremental import PontuadorIncremental
+from pacote_artefatos import (DIRETORIO_PACOTE, ler_manifesto, ler_tabela_bairros, carregar_scaler_pacote,
+                              carregar_bairros_pacote, carregar_modelo_pacote)
 
 print("Iniciando a API Mestra de Predição de Dengue...")
 
@@ -15,174 +31,657 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 app = Flask(__name__)
 CORS(app)
 
-CIDADE = "Montes Claros"
-ESTADO = "MG"
-PAIS = "BR"
+# Configurações da API de Meteorologia (OpenWeatherMap)
+API_KEY_WEATHER = os.environ.get('API_KEY_WEATHER', " ")
+
+# Cidades atendidas (cidades.json): cada uma com a sua tabela de bairros e a
+# sua previsão em cache; os modelos carregados são os mesmos para todas
+cidades = carregar_cidades()
+cidade_padrao = cidades[CIDADE_PADRAO]
+CIDADE, ESTADO, PAIS = cidade_padrao.local
+LOCAL_PADRAO = cidade_padrao.local
 
 modelos_carregados = {}
+agendador = None
+pontuadores = {}  # dias -> PontuadorIncremental (com INFERENCIA_INCREMENTAL=1)
+superficies = None  # SuperficiesRisco (com SUPERFICIE_RISCO=1)
 scaler = None
-dados_bairros_df = None
+normalizacao = None
+indice_bairros = None  # índice da cidade padrão
+indices_bairros = {}   # id da cidade -> IndiceBairros
+versao_artefatos = None
 api_pronta = False 
 
+ARQUIVO_BAIRROS = cidade_padrao.bairros
+
 config_modelos = {
     '1': {'passos': 8, 'arquivo': 'Treinar API models/modelo_lstm_24h.keras'},
     '3': {'passos': 24, 'arquivo': 'Treinar API models/modelo_lstm_3d.keras'},
     '5': {'passos': 40, 'arquivo': 'Treinar API models/modelo_lstm_5d.keras'}
 }
+# Backend de inferência: 'keras' (TensorFlow) ou 'numpy' (forward pass em NumPy,
+# sem importar o TensorFlow no processo). Verifique a paridade com
+# 'LSTM/verificar_paridade_numpy.py' sempre que retreinar os modelos.
+BACKEND_INFERENCIA = os.environ.get('BACKEND_INFERENCIA', 'keras')
+
+# Modelo multi-horizonte (opcional): um único LSTM treinado com
+# 'treinar_lstm.py --horizontes multi' devolve o risco de 1, 3 e 5 dias numa
+# só passada de 40 passos. A saída do horizonte 'dias' é a coluna
+# CABECAS_MULTI[dias] no passo (passos - 1). Como o LSTM é causal, pedir só
+# 1 dia roda apenas os 8 primeiros passos.
+MODELO_MULTI_HORIZONTE = os.environ.get('MODELO_MULTI_HORIZONTE', '0') == '1'
+ARQUIVO_MODELO_MULTI = 'Treinar API models/modelo_lstm_multi.keras'
+CABECAS_MULTI = {dias: indice for indice, dias in enumerate(config_modelos)}
+
+# Micro-lotes: requisições concorrentes do mesmo horizonte são juntadas num único
+# predict (até MICRO_LOTE_TAMANHO_MAX linhas ou MICRO_LOTE_ESPERA_MS de espera).
+MICRO_LOTES = os.environ.get('MICRO_LOTES', '1') == '1'
+MICRO_LOTE_TAMANHO_MAX = int(os.environ.get('MICRO_LOTE_TAMANHO_MAX', '64'))
+MICRO_LOTE_ESPERA_MS = float(os.environ.get('MICRO_LOTE_ESPERA_MS', '2'))
+
+# Pontuação incremental (só no backend NumPy): o estado do LSTM de cada bairro
+# (e do lote de cada cidade) fica guardado a cada INCREMENTAL_INTERVALO passos;
+# quando a previsão muda só do meio da janela em diante, a recorrência retoma
+# do último checkpoint antes da mudança (ver LSTM/inferencia_incremental.py).
+# Como o estado é de cada série, ela substitui os micro-lotes.
+INFERENCIA_INCREMENTAL = os.environ.get('INFERENCIA_INCREMENTAL', '0') == '1'
+INCREMENTAL_INTERVALO = int(os.environ.get('INCREMENTAL_INTERVALO', '4'))
+INCREMENTAL_MAX_SERIES = int(os.environ.get('INCREMENTAL_MAX_SERIES', '4096'))
+
+# Superfície de risco: a cada previsão nova o modelo roda uma vez, em lote,
+# numa grade de IIPs por horizonte, e as rotas interpolam no IIP do bairro
+# (ver superficie_risco.py). O erro da interpolação é conferido contra a
+# inferência exata e não passa de SUPERFICIE_ERRO_MAXIMO (em probabilidade).
+SUPERFICIE_RISCO = os.environ.get('SUPERFICIE_RISCO', '0') == '1'
+SUPERFICIE_PONTOS = int(os.environ.get('SUPERFICIE_PONTOS', '65'))
+SUPERFICIE_ERRO_MAXIMO = float(os.environ.get('SUPERFICIE_ERRO_MAXIMO', '0.001'))
+LIMIAR_RISCO_ALTO = 0.5
+
+# Valor de 'dias' que pede os três horizontes com uma única busca de previsão
+DIAS_TODOS_HORIZONTES = 'all'
+
+# Cache LRU das respostas por (bairro, dias, versão da previsão, versão dos
+# artefatos, versão do índice). 0 desliga; o GET condicional (ETag) continua.
+RESULTADOS_CACHE_MAX = int(os.environ.get('RESULTADOS_CACHE_MAX', '4096'))
+ARQUIVO_SCALER = 'Treinar API models/scaler_features_dengue.joblib'
+
+# Métricas por etapa em '/metrics' (formato Prometheus) e prontidão em '/health'
+metricas = RegistroMetricas('mestra_')
+etapas = metricas.histograma('etapa_segundos', "Duração de cada etapa da requisição.", ('etapa',))
+tempo_predict = metricas.histograma('predict_segundos', "Inferência por horizonte (inclui a espera no micro-lote).", ('horizonte',))
+chamadas_externas = metricas.histograma('chamada_externa_segundos', "Chamadas ao OpenWeatherMap (com retentativas).", ('endpoint',))
+erros_externos = metricas.contador('erros_externos_total', "Falhas nas chamadas ao OpenWeatherMap.", ('endpoint', 'tipo'))
+consultas_cache = metricas.contador('cache_previsao_total', "Consultas ao cache de previsão por resultado.", ('resultado',))
+consultas_resultados = metricas.contador('cache_resultados_total', "Respostas servidas do cache, calculadas ou 304.", ('resultado',))
+pedidos_horizonte = metricas.contador('pedidos_horizonte_total', "Pedidos por horizonte (em dias).", ('horizonte',))
+linhas_superficie = metricas.contador('superficie_risco_linhas_total', "Riscos servidos pela superfície (interpolados) ou pela inferência exata.", ('resultado',))
+passos_recorrentes = metricas.contador('passos_recorrentes_total', "Passos do LSTM na pontuação incremental (calculados ou pulados).", ('resultado',))
+instrumentar_flask(app, metricas, lambda: api_pronta)
+# Perfil de uma requisição sob demanda (cabeçalho X-Perfil; ver perfilamento.py)
+instrumentar_perfil_flask(app)
+
+def carregar_modelo(arquivo):
+    """Carrega um modelo .keras no backend de inferência configurado."""
+    if BACKEND_INFERENCIA == 'numpy':
+        return carregar_modelo_numpy(arquivo)
+    from tensorflow.keras.models import load_model
+    # Só inferência: não precisa recompilar (nem conhecer a perda usada no treino)
+    return load_model(arquivo, compile=False)
+
+def calcular_versao_artefatos(manifesto):
+    """
+    Identifica o que foi carregado (backend, pacote e arquivo, tamanho e data
+    de cada modelo e do scaler): retreinar e reiniciar invalida os resultados
+    em cache e as ETags já entregues.
+    """
+    arquivos = [ARQUIVO_MODELO_MULTI] if MODELO_MULTI_HORIZONTE else [config['arquivo'] for config in config_modelos.values()]
+    partes = [BACKEND_INFERENCIA, manifesto['criado_em'] if manifesto is not None else '']
+    for arquivo in arquivos + [ARQUIVO_SCALER]:
+        try:
+            info = os.stat(arquivo)
+            partes.append(f'{arquivo}:{info.st_size}:{info.st_mtime_ns}')
+        except OSError:
+            partes.append(arquivo)
+    return hashlib.blake2b('|'.join(partes).encode('utf-8'), digest_size=8).hexdigest()
+
+def _cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
 
 def carregar_todos_artefatos():
-    global scaler, dados_bairros_df, modelos_carregados, api_pronta
+    """
+    Carrega scaler, bairros e modelos EM PARALELO. Se existir um pacote
+    compilado e atualizado ('python pacote_artefatos.py'), ele é usado no
+    lugar do joblib/Excel/.keras. Antes de marcar a API como pronta, roda uma
+    inferência de aquecimento por horizonte, para que a primeira requisição
+    real não pague a preparação do modelo.
+    """
+    global scaler, normalizacao, indice_bairros, indices_bairros, modelos_carregados, agendador, pontuadores, superficies, versao_artefatos, api_pronta
     
     print("Carregando artefatos...")
+    inicio_total = time.perf_counter()
     try:
-        scaler = joblib.load('Treinar API models/scaler_features_dengue.joblib')
-        print("  [OK] Normalizador 'scaler_features_dengue.joblib' carregado.")
-        
-        temp_df = pd.read_excel('DIC/dengue_classificados_clima.xlsx', 
-                                sheet_name='Dados Dengue', 
-                                index_col='BAIRRO')
-        temp_df.index = temp_df.index.astype(str).str.strip().str.upper()
-        dados_bairros_df = temp_df
-        print("  [OK] Dados dos bairros 'dengue_classificados_clima.xlsx' carregados.")
-        
+        manifesto = ler_manifesto()
+        tarefas = {}
+        if manifesto is not None:
+            print(f"  Usando pacote compilado '{DIRETORIO_PACOTE}/' (criado em {manifesto['criado_em']}).")
+            tarefas['scaler'] = (carregar_scaler_pacote, manifesto)
+            tarefas['bairros'] = (carregar_bairros_pacote, manifesto)
+        else:
+            tarefas['scaler'] = (joblib.load, ARQUIVO_SCALER)
+            tarefas['bairros'] = (ler_tabela_bairros, ARQUIVO_BAIRROS)
+        # O pacote compilado só traz os bairros da cidade padrão; as outras leem a planilha
+        for cidade in cidades.values():
+            if cidade is not cidade_padrao:
+                tarefas[f'bairros_{cidade.id}'] = (ler_tabela_bairros, cidade.bairros)
+
+        if MODELO_MULTI_HORIZONTE:
+            tarefas['modelo_multi'] = (carregar_modelo, ARQUIVO_MODELO_MULTI)
+        else:
+            for dias, config in config_modelos.items():
+                # Os pesos compilados só servem ao backend NumPy; o Keras lê o .keras
+                if manifesto is not None and BACKEND_INFERENCIA == 'numpy':
+                    tarefas[f'modelo_{dias}'] = (carregar_modelo_pacote, manifesto, dias)
+                else:
+                    tarefas[f'modelo_{dias}'] = (carregar_modelo, config['arquivo'])
+
+        with ThreadPoolExecutor(max_workers=len(tarefas)) as executor:
+            futuros = {nome: executor.submit(_cronometrar, *tarefa) for nome, tarefa in tarefas.items()}
+            resultados = {nome: futuro.result() for nome, futuro in futuros.items()}
+
+        for nome, (_, segundos) in resultados.items():
+            print(f"  [OK] '{nome}' carregado em {segundos * 1000:.1f} ms.")
+
+        # Só scale_ e min_ do scaler, em float32: a normalização não passa pelo sklearn
+        if manifesto is not None:
+            scaler, normalizacao = None, resultados['scaler'][0]  # o pacote já traz a NormalizacaoAfim
+        else:
+            scaler = resultados['scaler'][0]
+            normalizacao = NormalizacaoAfim.do_scaler(scaler)
+        # Índice dos bairros de cada cidade (nome normalizado -> IIP e atributos),
+        # recarregado automaticamente se a planilha for alterada no disco
+        for cidade in cidades.values():
+            tarefa = 'bairros' if cidade is cidade_padrao else f'bairros_{cidade.id}'
+            indice = IndiceBairros(cidade.bairros, ler_tabela_bairros, 'IIP%', df_inicial=resultados[tarefa][0])
+            indice.iniciar_monitoramento()
+            indices_bairros[cidade.id] = indice
+        indice_bairros = indices_bairros[cidade_padrao.id]
+        for dias in config_modelos:
+            # No modo multi-horizonte todos os horizontes apontam para o MESMO modelo
+            chave = 'modelo_multi' if MODELO_MULTI_HORIZONTE else f'modelo_{dias}'
+            modelos_carregados[dias] = resultados[chave][0]
+
+        # Aquecimento: uma inferência por horizonte antes de aceitar tráfego
         for dias, config in config_modelos.items():
-            arquivo = config['arquivo']
-            modelos_carregados[dias] = load_model(arquivo)
-            print(f"  [OK] Modelo '{arquivo}' (para {dias} dia(s)) carregado.")
-            
-        print("\n--- API Pronta e Operacional ---")
+            entrada_vazia = np.zeros((1, config['passos'], 4), dtype=np.float32)
+            _, segundos = _cronometrar(lambda: modelos_carregados[dias].predict(entrada_vazia, verbose=0))
+            print(f"  [OK] Modelo de {dias} dia(s) aquecido em {segundos * 1000:.1f} ms (backend '{BACKEND_INFERENCIA}').")
+
+        if INFERENCIA_INCREMENTAL and BACKEND_INFERENCIA != 'numpy':
+            print("  [AVISO] INFERENCIA_INCREMENTAL exige BACKEND_INFERENCIA=numpy; ignorada.")
+        elif INFERENCIA_INCREMENTAL:
+            # No modo multi-horizonte os três horizontes dividem o mesmo modelo e o mesmo pontuador
+            por_modelo = {}
+            for dias, modelo in modelos_carregados.items():
+                if id(modelo) not in por_modelo:
+                    por_modelo[id(modelo)] = PontuadorIncremental(modelo, INCREMENTAL_INTERVALO, INCREMENTAL_MAX_SERIES)
+                pontuadores[dias] = por_modelo[id(modelo)]
+            print(f"  [OK] Pontuação incremental ativa (checkpoint a cada {INCREMENTAL_INTERVALO} passos).")
+
+        if MICRO_LOTES and not pontuadores:
+            agendador = AgendadorInferencia(modelos_carregados, MICRO_LOTE_TAMANHO_MAX, MICRO_LOTE_ESPERA_MS)
+            print(f"  [OK] Micro-lotes ativos (até {MICRO_LOTE_TAMANHO_MAX} linhas ou {MICRO_LOTE_ESPERA_MS} ms).")
+
+        if SUPERFICIE_RISCO:
+            superficies = SuperficiesRisco(prever_horizontes, limites_iip(), SUPERFICIE_PONTOS, SUPERFICIE_ERRO_MAXIMO,
+                                           limiar=LIMIAR_RISCO_ALTO, max_curvas=8 * len(config_modelos) * len(cidades))
+            print(f"  [OK] Superfície de risco ativa (IIP de {superficies.iip_min:.2f} a {superficies.iip_max:.2f}, "
+                  f"erro máximo {SUPERFICIE_ERRO_MAXIMO}).")
+
+        versao_artefatos = calcular_versao_artefatos(manifesto)
+        print(f"\n--- API Pronta e Operacional ({time.perf_counter() - inicio_total:.2f} s) ---")
         api_pronta = True
         return True
     except Exception as e:
         print(f"\nERRO CRÍTICO AO CARREGAR: {e}")
         return False
 
+# Cliente HTTP único do processo (keep-alive, timeouts e retentativas)
+cliente_meteorologia = ClienteMeteorologia(API_KEY_WEATHER)
+
+# Armazém local (SQLite) de toda previsão buscada: reinício a quente e
+# histórico real para o treino (ver armazem_previsoes.py)
+armazem_previsoes = abrir_armazem()
+
+def buscar_previsao_api(local):
+    """
+    Busca a previsão de 5 dias (passos de 3h) no OpenWeatherMap para
+    a localização (cidade, estado, país). Chamada apenas pelo cache, que
+    guarda a previsão já convertida em colunas (PrevisaoColunar).
+    """
+    with chamadas_externas.cronometrar(endpoint='forecast'):
+        try:
+            dados_forecast = cliente_meteorologia.buscar('forecast', local)
+        except Exception as e:
+            erros_externos.incrementar(endpoint='forecast', tipo=type(e).__name__)
+            raise
+    registrar(armazem_previsoes, 'forecast', local, dados_forecast)
+    previsao = converter_previsao(dados_forecast)
+    if superficies is not None:
+        # Na renovação em segundo plano do cache, a requisição não espera a montagem
+        montar_superficies(previsao, local)
+    return previsao
+
+# Com CACHE_COMPARTILHADO, previsões e resultados ficam num cache comum aos
+# workers do servidor pré-fork (ver cache_compartilhado.py); sem ele, em memória
+area_compartilhada = abrir_area()
+
+# A previsão é da cidade inteira: todos os bairros compartilham a mesma busca.
+cache_previsao = criar_cache_previsao(area_compartilhada, 'mestra:previsao', buscar_previsao_api,
+                                      codificar=previsao_para_bytes, decodificar=previsao_de_bytes,
+                                      ao_consultar=lambda resultado: consultas_cache.incrementar(resultado=resultado))
+# Ao reiniciar, parte da última previsão gravada (se ainda utilizável) em vez de buscar na API
+if armazem_previsoes is not None:
+    for cidade in cidades.values():
+        hidratar_cache(cache_previsao, armazem_previsoes, 'forecast', cidade.local, converter_previsao)
+
 def processar_previsao_diaria(lista_previsoes_api, dias_analise):
     """
     Pega a lista de 3h do OpenWeatherMap e a transforma em um
     resumo diário com min, max e probabilidade de chuva.
+    (As rotas usam direto 'PrevisaoColunar.resumo_diario', já guardado no cache.)
     """
-    previsao_diaria = {}
-
-    for previsao in lista_previsoes_api:
-        # Pega a data (ex: "2025-11-06") do texto "2025-11-06 00:00:00"
-        data_dia = previsao['dt_txt'].split(' ')[0]
-        
-        if data_dia not in previsao_diaria:
-            # Se é a primeira vez que vemos esse dia, preparamos as listas
-            previsao_diaria[data_dia] = {
-                'min_temps': [],
-                'max_temps': [],
-                'pops': [], # Lista de probabilidades de chuva
-                'descricoes': {} # Contador para descrições de tempo
-            }
-        
-        # Adiciona os dados do intervalo de 3h nas listas do dia
-        previsao_diaria[data_dia]['min_temps'].append(previsao['main']['temp_min'])
-        previsao_diaria[data_dia]['max_temps'].append(previsao['main']['temp_max'])
-        previsao_diaria[data_dia]['pops'].append(previsao['pop'])
-        
-        # Conta a descrição de tempo (ex: "céu limpo", "chuva leve")
-        desc = previsao['weather'][0]['description']
-        previsao_diaria[data_dia]['descricoes'][desc] = previsao_diaria[data_dia]['descricoes'].get(desc, 0) + 1
-
-    # Agora, processa os dados agrupados para criar o resumo final
-    resumo_formatado = []
-    for data, dados in previsao_diaria.items():
-        # A maior probabilidade de chuva do dia é a mais importante
-        prob_chuva_dia = max(dados['pops']) * 100 # Converte de 0.8 para 80
-        # O tempo mais frequente no dia
-        resumo_tempo_dia = max(dados['descricoes'], key=dados['descricoes'].get)
-        
-        resumo_formatado.append({
-            "data": data,
-            "minima_c": min(dados['min_temps']),
-            "maxima_c": max(dados['max_temps']),
-            "probabilidade_chuva_pct": round(prob_chuva_dia, 2), # Arredonda para 2 casas
-            "resumo_tempo": resumo_tempo_dia
-        })
-    
-    # Retorna apenas o número de dias que o usuário pediu (1, 3 ou 5)
-    return resumo_formatado[:dias_analise]
+    return converter_previsao({'list': lista_previsoes_api}).resumo_diario(dias_analise)
 
-# --- 4. ROTA DA API DE PREVISÃO ---
-@app.route('/prever_risco/<string:nome_bairro>', methods=['GET'])
-def prever_risco_mestre(nome_bairro):
-    if not api_pronta:
-        abort(500, description="Erro interno: A API não está pronta. Verifique os logs do servidor.")
+# Entrada (n_bairros, passos, 4) de cada thread, reaproveitada entre requisições
+buffer_entrada = BufferPorThread((max(config['passos'] for config in config_modelos.values()), 4))
 
-    # 1. PEGAR O PERÍODO DE DIAS
-    periodo_dias = request.args.get('dias', default='1', type=str)
-    
-    if periodo_dias not in config_modelos:
-        return jsonify({"erro": f"Período de dias inválido. Use '1', '3' ou '5'."}), 400
+def montar_lote_normalizado(sequencia_clima, iips):
+    """
+    Monta o tensor (n_bairros, seq_len, 4) para o LSTM: a sequência de clima
+    é repetida para cada bairro e só a coluna de IIP muda. Tudo é escrito e
+    normalizado direto no buffer float32 da thread: o clima é normalizado
+    uma vez (na primeira linha) e copiado para as demais.
+    """
+    seq_len = sequencia_clima.shape[0]
+    lote = buffer_entrada.obter(len(iips))[:, :seq_len]
+    clima = lote[0, :, :3]
+    clima[...] = sequencia_clima
+    normalizacao.aplicar(clima, slice(0, 3))
+    lote[1:, :, :3] = clima
+    iip = lote[:, :, 3]
+    iip[...] = np.asarray(iips, dtype=np.float32)[:, None]
+    normalizacao.aplicar(iip, 3)
+    return lote
 
-    config = config_modelos[periodo_dias]
-    modelo_selecionado = modelos_carregados[periodo_dias]
-    seq_len = config['passos']
+def resolver_horizontes(periodo_dias):
+    """
+    Traduz o parâmetro 'dias' na lista de horizontes a calcular.
+    'all' calcula os três (1, 3 e 5 dias); um valor inválido devolve None.
+    """
+    if periodo_dias == DIAS_TODOS_HORIZONTES:
+        return list(config_modelos)
+    if periodo_dias in config_modelos:
+        return [periodo_dias]
+    return None
 
-    # 2. BUSCAR DADOS DO BAIRRO
-    try:
-        info_bairro = dados_bairros_df.loc[nome_bairro.upper()].to_dict()
-        iip_do_bairro = info_bairro['IIP%']
-    except KeyError as e:
-        if str(e) == f"'{nome_bairro.upper()}'":
-             return jsonify({"erro": f"Bairro '{nome_bairro.upper()}' não encontrado na base de dados."}), 404
+def prever_horizontes(sequencia_clima, iips, horizontes, serie=None):
+    """
+    Normaliza a sequência mais longa UMA vez e alimenta cada modelo com o
+    prefixo de tamanho 'passos' (8, 24 ou 40 passos de 3h da mesma previsão).
+    'serie' identifica as linhas para a pontuação incremental (ex.: o bairro).
+    Devolve {dias: array de probabilidades, uma por bairro}.
+    """
+    with etapas.cronometrar(etapa='normalizacao'):
+        dados_lstm = montar_lote_normalizado(sequencia_clima, iips)
+    if MODELO_MULTI_HORIZONTE:
+        return _prever_multi_horizonte(dados_lstm, horizontes, serie)
+    if pontuadores and serie is not None:
+        probabilidades = {}
+        for dias in horizontes:
+            with tempo_predict.cronometrar(horizonte=dias):
+                probabilidades[dias] = _pontuar(dias, serie, dados_lstm[:, :config_modelos[dias]['passos']])[:, 0]
+        return probabilidades
+    if agendador is not None:
+        # Enfileira todos os horizontes antes de esperar: as filas rodam em paralelo
+        inicio = time.perf_counter()
+        futuros = {dias: agendador.submeter(dias, dados_lstm[:, :config_modelos[dias]['passos']]) for dias in horizontes}
+        probabilidades = {}
+        for dias, futuro in futuros.items():
+            probabilidades[dias] = futuro.result()[:, 0]
+            tempo_predict.observar(time.perf_counter() - inicio, horizonte=dias)
+        return probabilidades
+
+    probabilidades = {}
+    for dias in horizontes:
+        seq_len = config_modelos[dias]['passos']
+        with tempo_predict.cronometrar(horizonte=dias):
+            probabilidades[dias] = modelos_carregados[dias].predict(dados_lstm[:, :seq_len], verbose=0)[:, 0]
+    return probabilidades
+
+def _pontuar(dias, serie, entrada):
+    saida, pulados = pontuadores[dias].pontuar(serie, entrada)
+    passos_recorrentes.incrementar(pulados, resultado='pulado')
+    passos_recorrentes.incrementar(entrada.shape[1] - pulados, resultado='calculado')
+    return saida
+
+def _prever_multi_horizonte(dados_lstm, horizontes, serie=None):
+    """
+    Uma única inferência no prefixo do maior horizonte pedido; cada horizonte
+    é lido na sua cabeça, no seu último passo. Com micro-lotes, o pedido entra
+    na fila desse maior horizonte (todas as filas usam o mesmo modelo, e cada
+    fila só junta entradas do mesmo comprimento).
+    """
+    maior = max(horizontes, key=lambda dias: config_modelos[dias]['passos'])
+    entrada = dados_lstm[:, :config_modelos[maior]['passos']]
+    with tempo_predict.cronometrar(horizonte='multi'):
+        if pontuadores and serie is not None:
+            # Pedir 5 dias depois de 1 dia retoma dos 8 passos já calculados
+            saida = _pontuar(maior, serie, entrada)
+        elif agendador is not None:
+            saida = agendador.submeter(maior, entrada).result()
         else:
-             print(f"ERRO NA ROTA: A coluna 'IIP%' não foi encontrada no DataFrame. Colunas disponíveis: {list(info_bairro.keys())}")
-             return jsonify({"erro": "Erro interno: A coluna de IIP ('IIP%') não foi encontrada nos dados do Excel."}), 500
+            saida = modelos_carregados[maior].predict(entrada, verbose=0)
+    return {dias: saida[:, config_modelos[dias]['passos'] - 1, CABECAS_MULTI[dias]] for dias in horizontes}
 
-    # 3. BUSCAR PREVISÃO DE TEMPO
-    url_forecast_api = f"http://api.openweathermap.org/data/2.5/forecast?q={CIDADE},{ESTADO},{PAIS}&appid={API_KEY_WEATHER}&units=metric&lang=pt_br"
+def limites_iip():
+    """
+    Faixa da grade da superfície: a faixa de IIP do treino (a que o scaler leva
+    a [0, 1]) ampliada para cobrir os bairros de todas as cidades.
+    """
+    escala, deslocamento = float(normalizacao.escala[3]), float(normalizacao.deslocamento[3])
+    minimo, maximo = -deslocamento / escala, (1.0 - deslocamento) / escala
+    for indice in indices_bairros.values():
+        _, iips = indice.listar()
+        if len(iips):
+            minimo, maximo = min(minimo, float(iips.min())), max(maximo, float(iips.max()))
+    return minimo, maximo
+
+def montar_superficies(previsao, local):
+    """Monta as curvas de todos os horizontes que a previsão cobre, logo que ela chega."""
+    cidade = next((c for c in cidades.values() if c.local == local), cidade_padrao)
+    horizontes = [dias for dias, config in config_modelos.items() if len(previsao) >= config['passos']]
+    if not horizontes:
+        return
+    sequencia_clima = previsao.sequencia_clima(max(config_modelos[dias]['passos'] for dias in horizontes))
+    _, iips_cidade = indices_bairros[cidade.id].listar()
     try:
-        resposta_forecast = requests.get(url_forecast_api)
-        resposta_forecast.raise_for_status()
-        dados_forecast = resposta_forecast.json()
+        for dias in horizontes:
+            superficies.curva(previsao.versao, sequencia_clima, dias, iips_cidade)
     except Exception as e:
-        return jsonify({"erro": f"Erro ao buscar dados de meteorologia: {e}"}), 502
+        # As rotas tentam de novo na consulta; a previsão em si está boa
+        print(f"  [ERRO] Falha ao montar a superfície de risco de {local}: {e}")
+
+def prever_riscos(previsao, sequencia_clima, iips, horizontes, serie, cidade=None):
+    """Probabilidades por horizonte: pela superfície de risco, se ativa, ou pela inferência."""
+    if superficies is None:
+        return prever_horizontes(sequencia_clima, iips, horizontes, serie)
+    with etapas.cronometrar(etapa='superficie_risco'):
+        # Na montagem, a curva é conferida também nos IIPs dos bairros da cidade
+        _, iips_cidade = indices_bairros[(cidade or cidade_padrao).id].listar()
+        probabilidades, exatas = superficies.prever_iips(previsao.versao, sequencia_clima, iips, horizontes, iips_cidade)
+    linhas_superficie.incrementar(len(iips) * len(horizontes) - exatas, resultado='interpolada')
+    linhas_superficie.incrementar(exatas, resultado='exata')
+    return probabilidades
+
+def formatar_risco(probabilidade_surto):
+    return {
+        "probabilidade_risco_dengue": f"{probabilidade_surto * 100:.2f}%",
+        "nivel_risco_calculado": "ALTO" if probabilidade_surto > LIMIAR_RISCO_ALTO else "BAIXO"
+    }
 
-    # 4. PROCESSAR DADOS PARA O MODELO (LÓGICA INTERNA)
-    lista_previsoes_api = dados_forecast.get('list', [])
-    if len(lista_previsoes_api) < seq_len:
-        return jsonify({"erro": f"A API de tempo não retornou dados suficientes ({len(lista_previsoes_api)} passos) para a análise de {periodo_dias} dia(s)."}), 500
+# --- 4. LÓGICA DAS ROTAS (compartilhada pelo Flask e pelo servidor assíncrono) ---
+class ErroPedido(Exception):
+    """Erro do pedido com a mensagem e o status HTTP a devolver ao cliente."""
 
-    previsoes_para_modelo = lista_previsoes_api[:seq_len]
-    sequencia_para_previsao = []
+    def __init__(self, mensagem, status):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
 
-    for previsao in previsoes_para_modelo:
-        temp = previsao['main']['temp']
-        umid = previsao['main']['humidity']
-        chuva_mm = previsao.get('rain', {}).get('3h', 0)
-        
-        sequencia_para_previsao.append([temp, umid, chuva_mm, iip_do_bairro])
+def validar_periodo(periodo_dias):
+    horizontes = resolver_horizontes(periodo_dias)
+    if horizontes is None:
+        raise ErroPedido(f"Período de dias inválido. Use '1', '3', '5' ou '{DIAS_TODOS_HORIZONTES}'.", 400)
+    for dias in horizontes:
+        pedidos_horizonte.incrementar(horizonte=dias)
+    return horizontes
 
-    # 5. NORMALIZAR, REMODELAR E PREVER
-    dados_np = np.array(sequencia_para_previsao)
-    dados_normalizados = scaler.transform(dados_np)
-    dados_lstm = np.reshape(dados_normalizados, (1, seq_len, 4)) 
+def validar_cidade(parametros):
+    """Cidade pedida ('cidade' ou 'lat'/'lon' nos parâmetros da URL); a padrão se nenhum vier."""
+    cidade, erro = resolver_cidade(cidades, parametros)
+    if erro is not None:
+        raise ErroPedido(*erro)
+    return cidade
 
-    probabilidade_surto = modelo_selecionado.predict(dados_lstm, verbose=0)[0][0]
+def validar_bairro(nome_bairro, cidade=None):
+    with etapas.cronometrar(etapa='busca_bairro'):
+        iip_do_bairro = indices_bairros[(cidade or cidade_padrao).id].iip(nome_bairro)
+    if iip_do_bairro is None:
+        raise ErroPedido(f"Bairro '{nome_bairro.upper()}' não encontrado na base de dados.", 404)
+    return iip_do_bairro
 
-    # --- 6. MONTAR RESPOSTA FINAL (A MUDANÇA ESTÁ AQUI) ---
-    
-    # Chama a nova função para criar o resumo diário para o usuário
-    resumo_diario_formatado = processar_previsao_diaria(lista_previsoes_api, int(periodo_dias))
-    
-    resposta_final = {
+def _preparar_sequencia(previsao, horizontes):
+    """Sequência de clima do maior horizonte pedido + número de dias do resumo."""
+    seq_len = max(config_modelos[dias]['passos'] for dias in horizontes)
+    dias_analise = max(int(dias) for dias in horizontes)
+    if len(previsao) < seq_len:
+        raise ErroPedido(f"A API de tempo não retornou dados suficientes ({len(previsao)} passos) para a análise de {dias_analise} dia(s).", 500)
+    return previsao.sequencia_clima(seq_len), dias_analise
+
+def calcular_risco_bairro(nome_bairro, periodo_dias, horizontes, iip_do_bairro, previsao, cidade=None):
+    # PROCESSAR DADOS PARA O MODELO, NORMALIZAR E PREVER (um modelo por horizonte pedido)
+    sequencia_clima, dias_analise = _preparar_sequencia(previsao, horizontes)
+    serie = ('bairro', (cidade or cidade_padrao).id, nome_bairro.upper())
+    probabilidades = prever_riscos(previsao, sequencia_clima, [iip_do_bairro], horizontes, serie, cidade)
+
+    # Resumo diário para o usuário (calculado uma vez por previsão e reaproveitado)
+    with etapas.cronometrar(etapa='resumo_diario'):
+        resumo_diario_formatado = previsao.resumo_diario(dias_analise)
+
+    if periodo_dias == DIAS_TODOS_HORIZONTES:
+        return {
+            "bairro_pesquisado": nome_bairro.upper(),
+            "periodo_analise": "todos",
+            "riscos_por_periodo": {
+                dias: {"periodo_analise": f"{dias} dia(s)", **formatar_risco(probs[0])}
+                for dias, probs in probabilidades.items()
+            },
+            "previsao_meteorologica_diaria": resumo_diario_formatado
+        }
+
+    return {
         "bairro_pesquisado": nome_bairro.upper(),
         "periodo_analise": f"{periodo_dias} dia(s)",
-        "probabilidade_risco_dengue": f"{probabilidade_surto * 100:.2f}%",
-        "nivel_risco_calculado": "ALTO" if probabilidade_surto > 0.5 else "BAIXO",
+        **formatar_risco(probabilidades[periodo_dias][0]),
         # Substitui a lista de 3h pelo novo resumo diário
         "previsao_meteorologica_diaria": resumo_diario_formatado
     }
 
-    return jsonify(resposta_final)
+def calcular_risco_lote(periodo_dias, horizontes, previsao, cidade=None):
+    # Uma linha por bairro da cidade no lote; a parte de clima é compartilhada
+    sequencia_clima, dias_analise = _preparar_sequencia(previsao, horizontes)
+    with etapas.cronometrar(etapa='busca_bairro'):
+        nomes_bairros, iips = indices_bairros[(cidade or cidade_padrao).id].listar()
+    probabilidades = prever_riscos(previsao, sequencia_clima, iips, horizontes, ('lote', (cidade or cidade_padrao).id), cidade)
+    with etapas.cronometrar(etapa='resumo_diario'):
+        resumo_diario_formatado = previsao.resumo_diario(dias_analise)
+
+    if periodo_dias == DIAS_TODOS_HORIZONTES:
+        bairros = [
+            {
+                "bairro": bairro,
+                "riscos_por_periodo": {
+                    dias: {"periodo_analise": f"{dias} dia(s)", **formatar_risco(probs[i])}
+                    for dias, probs in probabilidades.items()
+                }
+            }
+            for i, bairro in enumerate(nomes_bairros)
+        ]
+    else:
+        bairros = [
+            {"bairro": bairro, **formatar_risco(prob)}
+            for bairro, prob in zip(nomes_bairros, probabilidades[periodo_dias])
+        ]
+
+    return {
+        "periodo_analise": "todos" if periodo_dias == DIAS_TODOS_HORIZONTES else f"{periodo_dias} dia(s)",
+        "total_bairros": len(bairros),
+        "bairros": bairros,
+        "previsao_meteorologica_diaria": resumo_diario_formatado
+    }
+
+# --- CACHE DE RESULTADOS E GET CONDICIONAL ---
+# A resposta de uma rota só depende da chave abaixo, então a ETag sai da
+# própria chave: um If-None-Match igual vira 304 sem consultar o cache nem
+# rodar o modelo. O max-age termina no próximo passo de 3h da previsão.
+cache_resultados = criar_cache_resultados(area_compartilhada, 'mestra:resultados', RESULTADOS_CACHE_MAX)
+
+def chave_resultado(rota, nome_bairro, periodo_dias, previsao, cidade=None):
+    # O nome entra como o cliente mandou (em maiúsculas): ele aparece no corpo da resposta
+    cidade = cidade or cidade_padrao
+    return (rota, cidade.id, nome_bairro.upper(), periodo_dias, previsao.versao, versao_artefatos,
+            indices_bairros[cidade.id].versao)
+
+def cabecalhos_cache(etag):
+    return {'ETag': f'"{etag}"', 'Cache-Control': f'public, max-age={segundos_ate_proximo_passo()}'}
+
+def obter_resultado(chave, calcular, *args):
+    """Resultado da chave no cache ou, na falta, 'calcular(*args)' (e guarda)."""
+    resultado = cache_resultados.obter(chave)
+    if resultado is not None:
+        consultas_resultados.incrementar(resultado='acerto')
+        return resultado
+    consultas_resultados.incrementar(resultado='falta')
+    resultado = calcular(*args)
+    cache_resultados.guardar(chave, resultado)
+    return resultado
+
+def responder_com_cache(chave, calcular, *args):
+    etag = etag_da_chave(chave)
+    cabecalhos = cabecalhos_cache(etag)
+    if etag_corresponde(request.headers.get('If-None-Match'), etag):
+        consultas_resultados.incrementar(resultado='nao_modificado')
+        return Response(status=304, headers=cabecalhos)
+    resultado = obter_resultado(chave, calcular, *args)
+    with etapas.cronometrar(etapa='serializacao_json'):
+        resposta = jsonify(resultado)
+    resposta.headers.update(cabecalhos)
+    return resposta
+
+# --- 5. ROTA DA API DE PREVISÃO ---
+@app.route('/prever_risco/<string:nome_bairro>', methods=['GET'])
+def prever_risco_mestre(nome_bairro):
+    if not api_pronta:
+        abort(500, description="Erro interno: A API não está pronta. Verifique os logs do servidor.")
+
+    # PEGAR O PERÍODO DE DIAS ('all' = os três horizontes numa só resposta)
+    periodo_dias = request.args.get('dias', default='1', type=str)
+    try:
+        horizontes = validar_periodo(periodo_dias)
+        cidade = validar_cidade(request.args)
+        iip_do_bairro = validar_bairro(nome_bairro, cidade)
+
+        # BUSCAR PREVISÃO DE TEMPO (via cache compartilhado da cidade)
+        try:
+            with etapas.cronometrar(etapa='previsao_meteorologia'):
+                previsao = cache_previsao.obter(cidade.local)
+        except Exception as e:
+            return jsonify({"erro": f"Erro ao buscar dados de meteorologia: {e}"}), 502
+
+        chave = chave_resultado('bairro', nome_bairro, periodo_dias, previsao, cidade)
+        return responder_com_cache(chave, calcular_risco_bairro, nome_bairro, periodo_dias, horizontes,
+                                   iip_do_bairro, previsao, cidade)
+    except ErroPedido as e:
+        return jsonify({"erro": e.mensagem}), e.status
+
+# --- 6. ROTA EM LOTE: TODOS OS BAIRROS DE UMA VEZ ---
+@app.route('/prever_risco_lote', methods=['GET'])
+def prever_risco_lote():
+    """
+    Calcula o risco de todos os bairros da cidade com uma única
+    busca de previsão e uma única chamada ao modelo por horizonte (painel da cidade).
+    """
+    if not api_pronta:
+        abort(500, description="Erro interno: A API não está pronta. Verifique os logs do servidor.")
+
+    periodo_dias = request.args.get('dias', default='1', type=str)
+    try:
+        horizontes = validar_periodo(periodo_dias)
+        cidade = validar_cidade(request.args)
+        try:
+            with etapas.cronometrar(etapa='previsao_meteorologia'):
+                previsao = cache_previsao.obter(cidade.local)
+        except Exception as e:
+            return jsonify({"erro": f"Erro ao buscar dados de meteorologia: {e}"}), 502
+
+        chave = chave_resultado('lote', '', periodo_dias, previsao, cidade)
+        return responder_com_cache(chave, calcular_risco_lote, periodo_dias, horizontes, previsao, cidade)
+    except ErroPedido as e:
+        return jsonify({"erro": e.mensagem}), e.status
+
+@app.route('/estatisticas_inferencia', methods=['GET'])
+def estatisticas_inferencia():
+    """Filas e tamanhos de lote do agendador, passos pulados (incremental) e curvas da superfície de risco."""
+    resposta = {"micro_lotes": agendador is not None}
+    if agendador is not None:
+        resposta["horizontes"] = agendador.estatisticas()
+    if pontuadores:
+        # No modo multi-horizonte há um pontuador só, compartilhado pelos três horizontes
+        resposta["incremental"] = {('multi' if MODELO_MULTI_HORIZONTE else dias): p.estatisticas()
+                                   for dias, p in pontuadores.items()}
+    if superficies is not None:
+        resposta["superficie_risco"] = superficies.estatisticas()
+    return jsonify(resposta)
+
+def descrever_cidades():
+    """Cidades atendidas (parâmetro '?cidade=' das rotas) e quantos bairros cada uma tem."""
+    return {
+        "cidade_padrao": cidade_padrao.id,
+        "cidades": [
+            {"id": cidade.id, "nome": cidade.nome, "estado": cidade.estado, "pais": cidade.pais,
+             "total_bairros": len(indices_bairros[cidade.id]) if cidade.id in indices_bairros else 0}
+            for cidade in cidades.values()
+        ]
+    }
+
+@app.route('/cidades', methods=['GET'])
+def listar_cidades():
+    return jsonify(descrever_cidades())
+
+# --- 7. PRÉ-FORK (servidor_producao.py) ---
+# O mestre carrega os artefatos uma vez e os workers herdam modelos e índices
+# por cópia na escrita. Threads, sockets e a conexão SQLite não atravessam o
+# fork: o mestre fecha o que não usa mais e cada worker recria o que precisa.
+
+def preparar_fork():
+    """No mestre, antes do primeiro fork (a hidratação do cache já foi feita)."""
+    global armazem_previsoes
+    for indice in indices_bairros.values():
+        indice.parar_monitoramento()
+    if armazem_previsoes is not None:
+        armazem_previsoes.fechar()
+        armazem_previsoes = None
+    if area_compartilhada is not None:
+        area_compartilhada.fechar()  # cada worker abre a sua conexão ao usar
+
+def reiniciar_apos_fork():
+    """Em cada worker, logo depois do fork."""
+    global agendador, cliente_meteorologia, armazem_previsoes
+    cliente_meteorologia = ClienteMeteorologia(API_KEY_WEATHER)
+    armazem_previsoes = abrir_armazem()
+    if agendador is not None:
+        # As threads dos micro-lotes ficaram no mestre
+        agendador = AgendadorInferencia(modelos_carregados, MICRO_LOTE_TAMANHO_MAX, MICRO_LOTE_ESPERA_MS)
+    for indice in indices_bairros.values():
+        indice.iniciar_monitoramento()
 
-# --- 5. INICIAR A APLICAÇÃO ---
+# --- 8. INICIAR A APLICAÇÃO ---
 carregar_todos_artefatos()
 
 if __name__ == '__main__':
+    # Desenvolvimento; em produção use 'python servidor_producao.py mestra'
     if api_pronta:
         app.run(port=5010, debug=True)
     else:
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from cache_previsao import PASSO_PREVISAO_SEGUNDOS
+
+# -----------------------------------------------------------------------------
+# ARMAZÉM LOCAL DAS PREVISÕES E LEITURAS DO OPENWEATHERMAP (SQLITE)
+# -----------------------------------------------------------------------------
+# Cada resposta de '/forecast' e '/weather' buscada pelas APIs é gravada com
+# o instante da busca (JSON comprimido; respostas repetidas não são gravadas
+# de novo). Serve a duas coisas:
+#
+#   - reinício a quente: ao subir, a API preenche os caches com a última
+#     resposta ainda utilizável em vez de ir todo mundo ao OpenWeatherMap;
+#   - histórico real para o treino: 'exportar_observacoes' monta a série de
+#     3h do clima observado, usada pelos scripts de treino no lugar dos dados
+#     simulados (opção --armazem).
+#
+# O arquivo pode ser compartilhado pelas APIs da mesma máquina (modo WAL).
+#
+#   python armazem_previsoes.py dados/previsoes.db            # resumo do conteúdo
+#   python armazem_previsoes.py dados/previsoes.db --csv obs.csv
+
+ARQUIVO_ARMAZEM = os.environ.get('ARMAZEM_PREVISOES', 'dados/previsoes.db')
+ARQUIVO_BAIRROS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DIC', 'dengue_classificados_clima.xlsx')
+COLUNAS_OBSERVACAO = ['temperatura', 'umidade', 'chuva_mm']
+LOTE_LEITURA = 256  # respostas lidas do SQLite por vez ao percorrer o histórico
+
+
+def chave_local(local):
+    """('Montes Claros', 'MG', 'BR') -> 'Montes Claros,MG,BR'."""
+    return ','.join(local) if isinstance(local, (tuple, list)) else str(local)
+
+
+class ArmazemPrevisoes:
+    """Respostas do OpenWeatherMap por (endpoint, local), em ordem de busca."""
+
+    def __init__(self, caminho=ARQUIVO_ARMAZEM):
+        self.caminho = caminho
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self._conexao = sqlite3.connect(caminho, timeout=10, check_same_thread=False)
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute('PRAGMA synchronous=NORMAL')
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                id INTEGER PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                local TEXT NOT NULL,
+                buscado_em REAL NOT NULL,
+                resumo TEXT NOT NULL,
+                dados BLOB NOT NULL
+            )""")
+        self._conexao.execute(
+            'CREATE INDEX IF NOT EXISTS respostas_por_local ON respostas (endpoint, local, buscado_em)')
+        self._conexao.commit()
+        self._trava = threading.Lock()
+
+    def gravar(self, endpoint, local, dados, buscado_em=None):
+        """
+        Grava a resposta, a menos que seja igual à última gravada para o
+        mesmo endpoint e local (por qualquer processo). Devolve True se gravou.
+        """
+        texto = json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        resumo = hashlib.blake2b(texto, digest_size=16).hexdigest()
+        local = chave_local(local)
+        with self._trava, self._conexao:
+            ultima = self._conexao.execute(
+                'SELECT resumo FROM respostas WHERE endpoint = ? AND local = ? ORDER BY buscado_em DESC LIMIT 1',
+                (endpoint, local)).fetchone()
+            if ultima is not None and ultima[0] == resumo:
+                return False
+            self._conexao.execute(
+                'INSERT INTO respostas (endpoint, local, buscado_em, resumo, dados) VALUES (?, ?, ?, ?, ?)',
+                (endpoint, local, time.time() if buscado_em is None else buscado_em, resumo, zlib.compress(texto)))
+        return True
+
+    def ultima(self, endpoint, local, idade_maxima=None):
+        """(dados, buscado_em) da resposta mais recente, ou None (também se for mais velha que 'idade_maxima' s)."""
+        with self._trava:
+            linha = self._conexao.execute(
+                'SELECT dados, buscado_em FROM respostas WHERE endpoint = ? AND local = ? '
+                'ORDER BY buscado_em DESC LIMIT 1', (endpoint, chave_local(local))).fetchone()
+        if linha is None or (idade_maxima is not None and time.time() - linha[1] >= idade_maxima):
+            return None
+        return json.loads(zlib.decompress(linha[0])), linha[1]
+
+    def respostas(self, endpoint, local):
+        """
+        Itera (buscado_em, dados) em ordem de busca, uma resposta por vez.
+        Usa uma conexão só dela (WAL: a leitura vê um retrato fixo do arquivo),
+        lida aos blocos de LOTE_LEITURA linhas: o histórico de anos não vai
+        inteiro para a memória, e as gravações das APIs não esperam o consumidor.
+        """
+        conexao = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            cursor = conexao.execute(
+                'SELECT buscado_em, dados FROM respostas WHERE endpoint = ? AND local = ? ORDER BY buscado_em',
+                (endpoint, chave_local(local)))
+            while True:
+                linhas = cursor.fetchmany(LOTE_LEITURA)
+                if not linhas:
+                    break
+                for buscado_em, dados in linhas:
+                    yield buscado_em, json.loads(zlib.decompress(dados))
+        finally:
+            conexao.close()
+
+    def locais(self):
+        """{local: {endpoint: (quantidade, primeira_busca, ultima_busca)}}."""
+        with self._trava:
+            linhas = self._conexao.execute(
+                'SELECT local, endpoint, COUNT(*), MIN(buscado_em), MAX(buscado_em) FROM respostas '
+                'GROUP BY local, endpoint').fetchall()
+        resultado = {}
+        for local, endpoint, quantidade, primeira, ultima in linhas:
+            resultado.setdefault(local, {})[endpoint] = (quantidade, primeira, ultima)
+        return resultado
+
+    def fechar(self):
+        with self._trava:
+            self._conexao.close()
+
+    # --- HISTÓRICO PARA O TREINO ---
+
+    def exportar_observacoes(self, local):
+        """
+        Série de 3h do clima observado em 'local' (DataFrame com 'timestamp',
+        COLUNAS_OBSERVACAO e 'segmento'). Para cada passo da previsão vale o
+        valor da busca feita menos de 3h antes dele (o mais próximo de uma
+        observação); passos só previstos com mais antecedência ficam de fora.
+        Leituras de '/weather' dentro do passo substituem temperatura e
+        umidade pela média delas. Buracos na série (serviço parado) abrem um
+        novo 'segmento': janelas de treino não devem atravessar segmentos.
+        """
+        melhores = {}  # timestamp do passo -> (antecedência, temperatura, umidade, chuva)
+        for buscado_em, dados in self.respostas('forecast', local):
+            for passo in dados.get('list', []):
+                antecedencia = passo['dt'] - buscado_em
+                if not 0 <= antecedencia < PASSO_PREVISAO_SEGUNDOS:
+                    continue
+                atual = melhores.get(passo['dt'])
+                if atual is None or antecedencia < atual[0]:
+                    melhores[passo['dt']] = (antecedencia, passo['main']['temp'], passo['main']['humidity'],
+                                             passo.get('rain', {}).get('3h', 0))
+        if not melhores:
+            return pd.DataFrame(columns=['timestamp', *COLUNAS_OBSERVACAO, 'segmento'])
+
+        df = pd.DataFrame([(dt, *valores[1:]) for dt, valores in melhores.items()],
+                          columns=['timestamp', *COLUNAS_OBSERVACAO]).sort_values('timestamp', ignore_index=True)
+
+        # Leituras do tempo atual: cada uma conta para o passo que termina logo depois dela
+        leituras = [(-(-dados['dt'] // PASSO_PREVISAO_SEGUNDOS) * PASSO_PREVISAO_SEGUNDOS,
+                     dados['main']['temp'], dados['main']['humidity'])
+                    for _, dados in self.respostas('weather', local) if 'dt' in dados]
+        if leituras:
+            medias = (pd.DataFrame(leituras, columns=['timestamp', 'temperatura', 'umidade'])
+                      .groupby('timestamp').mean())
+            df = df.set_index('timestamp')
+            comuns = df.index.intersection(medias.index)
+            df.loc[comuns, ['temperatura', 'umidade']] = medias.loc[comuns].to_numpy()
+            df = df.reset_index()
+
+        df['segmento'] = np.cumsum(np.r_[0, np.diff(df['timestamp'].to_numpy()) != PASSO_PREVISAO_SEGUNDOS])
+        return df
+
+
+def series_por_bairro(observacoes, iips, passos_multiplo=1):
+    """
+    Cruza a série da cidade com o IIP de cada bairro: itera
+    (nome, DataFrame com COLUNAS_OBSERVACAO + 'iip_bairro'), uma série por
+    bairro e segmento. Cada série é cortada num múltiplo de 'passos_multiplo'
+    (para janelas sem sobreposição que não atravessam séries).
+    """
+    for segmento, trecho in observacoes.groupby('segmento'):
+        n = len(trecho) // passos_multiplo * passos_multiplo
+        if n == 0:
+            continue
+        base = trecho[COLUNAS_OBSERVACAO].iloc[:n].reset_index(drop=True)
+        for nome, iip in iips.items():
+            yield f'{nome}#{segmento}', base.assign(iip_bairro=float(iip))
+
+
+def iips_dos_bairros(caminho=None, coluna='IIP%'):
+    """{bairro: IIP} da planilha usada pela api_mestra."""
+    from pacote_artefatos import ler_tabela_bairros
+
+    return ler_tabela_bairros(caminho or ARQUIVO_BAIRROS)[coluna].dropna().to_dict()
+
+
+def historico_de_treino(caminho, local=None, passos_multiplo=1, arquivo_bairros=None):
+    """
+    Todas as séries de 'series_por_bairro' numa tabela só, com as colunas
+    temperatura, umidade, chuva_mm e iip_bairro (a ordem dos scripts de
+    treino). 'local' pode ficar None se o armazém tiver um único local.
+    """
+    armazem = ArmazemPrevisoes(caminho)
+    try:
+        if local is None:
+            locais = list(armazem.locais())
+            if len(locais) != 1:
+                raise ValueError(f"O armazém tem {len(locais)} locais; informe qual usar: {locais}")
+            local = locais[0]
+        observacoes = armazem.exportar_observacoes(local)
+    finally:
+        armazem.fechar()
+    series = [df for _, df in series_por_bairro(observacoes, iips_dos_bairros(arquivo_bairros), passos_multiplo)]
+    if not series:
+        return pd.DataFrame(columns=[*COLUNAS_OBSERVACAO, 'iip_bairro'])
+    return pd.concat(series, ignore_index=True)
+
+
+def hidratar_cache(cache, armazem, endpoint, local, converter=None):
+    """
+    Preenche 'cache' (CachePrevisao) com a última resposta ainda utilizável
+    do armazém, com o instante original da busca (a idade continua contando).
+    Devolve True se preencheu.
+    """
+    registro = armazem.ultima(endpoint, local, cache.max_obsoleto)
+    if registro is None:
+        return False
+    dados, buscado_em = registro
+    cache.guardar(local, converter(dados) if converter else dados, instante=buscado_em)
+    idade_min = (time.time() - buscado_em) / 60
+    print(f"  [OK] Cache de '{endpoint}' preenchido pelo armazém (busca de {idade_min:.0f} min atrás).")
+    return True
+
+
+def registrar(armazem, endpoint, local, dados):
+    """Grava a resposta sem deixar uma falha de disco virar erro da requisição (armazem None = desligado)."""
+    if armazem is None:
+        return
+    try:
+        armazem.gravar(endpoint, local, dados)
+    except sqlite3.Error as e:
+        print(f"  [ARMAZÉM] Falha ao gravar '{endpoint}' de {local}: {e}")
+
+
+def abrir_armazem(caminho=ARQUIVO_ARMAZEM):
+    """Abre o armazém configurado; None se desligado (ARMAZEM_PREVISOES='') ou se falhar."""
+    if not caminho:
+        return None
+    try:
+        return ArmazemPrevisoes(caminho)
+    except sqlite3.Error as e:
+        print(f"ERRO ao abrir o armazém de previsões '{caminho}': {e}. Seguindo sem ele.")
+        return None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumo e exportação do armazém de previsões.")
+    parser.add_argument('caminho', nargs='?', default=ARQUIVO_ARMAZEM)
+    parser.add_argument('--local', help="Local a exportar (ex.: 'Montes Claros,MG,BR'). Padrão: o único gravado.")
+    parser.add_argument('--csv', help="Grava a série de observações de 3h neste CSV.")
+    args = parser.parse_args()
+
+    armazem = ArmazemPrevisoes(args.caminho)
+    locais = armazem.locais()
+    for local, endpoints in locais.items():
+        for endpoint, (quantidade, primeira, ultima) in endpoints.items():
+            print(f"  {local:<28} {endpoint:<9} {quantidade:>6} respostas  "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(primeira))} -> "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(ultima))}")
+    if args.csv:
+        if args.local is None and len(locais) != 1:
+            raise SystemExit("ERRO: informe --local (há mais de um local gravado).")
+        observacoes = armazem.exportar_observacoes(args.local or next(iter(locais)))
+        observacoes.to_csv(args.csv, index=False)
+        print(f"{len(observacoes)} passos de 3h ({observacoes['segmento'].nunique()} segmento(s)) em '{args.csv}'.")
@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from comum import RAIZ, resumir_latencias, salvar_resultado
+
+sys.path.insert(0, RAIZ)
+from pacote_artefatos import FONTE_BAIRROS, ler_tabela_bairros
+
+# -----------------------------------------------------------------------------
+# TESTE DE CARGA DAS APIS
+# -----------------------------------------------------------------------------
+# Mantém 'concorrencia' requisições em andamento (cada cliente virtual manda
+# a próxima assim que recebe a resposta) durante 'duracao' segundos por
+# cenário, e relata p50/p95/p99 de latência e vazão. Os bairros e as
+# entradas dos modelos são sorteados a cada requisição.
+#
+# Com as APIs apontando para o OpenWeatherMap falso (servidor_owm_falso.py):
+#   python benchmark/carga.py --concorrencia 16 --duracao 20
+#   python benchmark/carga.py --cenarios mestra_1 mestra_5 --url-mestra http://127.0.0.1:5010
+
+CENARIOS = ['mestra_1', 'mestra_3', 'mestra_5', 'dengue', 'rf', 'lstm']
+ARQUIVO_BAIRROS_DENGUE = 'DIC/tabela_codigo.xlsx'
+
+
+def carregar_bairros():
+    """Nomes de bairro aceitos por cada API (cada uma usa a sua planilha)."""
+    mestra = list(ler_tabela_bairros(os.path.join(RAIZ, FONTE_BAIRROS)).index)
+    dengue = [str(nome) for nome in pd.read_excel(os.path.join(RAIZ, ARQUIVO_BAIRROS_DENGUE), index_col='bairro').index]
+    return mestra, dengue
+
+
+def montar_gerador(cenario, urls, bairros_mestra, bairros_dengue, rng):
+    """Devolve uma função que sorteia (método, url, corpo_json) de uma requisição do cenário."""
+    if cenario.startswith('mestra_'):
+        dias = cenario.split('_')[1]
+        return lambda: ('GET', f"{urls['mestra']}/prever_risco/{rng.choice(bairros_mestra)}?dias={dias}", None)
+    if cenario == 'dengue':
+        return lambda: ('GET', f"{urls['dengue']}/previsao/{rng.choice(bairros_dengue)}", None)
+    if cenario == 'rf':
+        def corpo_rf():
+            t, u, c, i = rng.uniform([20, 50, 0, 4], [35, 95, 50, 23])
+            return {'temperatura_media_semana': t, 'umidade_media_semana': u,
+                    'total_chuva_semana_mm': c, 'iip_bairro': i}
+        return lambda: ('POST', f"{urls['rf']}/prever_surto_rf", corpo_rf())
+    if cenario == 'lstm':
+        return lambda: ('POST', f"{urls['lstm']}/prever_surto_dengue",
+                        {'sequencia': rng.uniform([20, 50, 0, 4], [35, 95, 20, 23], size=(14, 4)).tolist()})
+    raise ValueError(f"Cenário desconhecido: {cenario}")
+
+
+async def _cliente_virtual(sessao, gerar, fim, latencias, status, aquecimento):
+    while time.perf_counter() < fim:
+        metodo, url, corpo = gerar()
+        inicio = time.perf_counter()
+        try:
+            async with sessao.request(metodo, url, json=corpo) as resposta:
+                await resposta.read()
+                codigo = resposta.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            codigo = type(e).__name__
+        if aquecimento:
+            continue
+        status[codigo] = status.get(codigo, 0) + 1
+        if codigo == 200:
+            latencias.append(time.perf_counter() - inicio)
+
+
+async def rodar_cenario(cenario, gerar, concorrencia, duracao, aquecimento, timeout):
+    conector = aiohttp.TCPConnector(limit=concorrencia)
+    async with aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=timeout)) as sessao:
+        if aquecimento > 0:
+            await asyncio.gather(*(_cliente_virtual(sessao, gerar, time.perf_counter() + aquecimento, [], {}, True)
+                                   for _ in range(concorrencia)))
+        latencias, status = [], {}
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_cliente_virtual(sessao, gerar, inicio + duracao, latencias, status, False)
+                               for _ in range(concorrencia)))
+        decorrido = time.perf_counter() - inicio
+
+    total = sum(status.values())
+    resultado = resumir_latencias(latencias)
+    resultado.update({
+        'requisicoes': total,
+        'erros': total - status.get(200, 0),
+        'status': {str(codigo): n for codigo, n in status.items()},
+        'vazao_rps': round(status.get(200, 0) / decorrido, 2),
+        'duracao_s': round(decorrido, 3),
+    })
+    return resultado
+
+
+def imprimir(cenario, r):
+    if r['n'] == 0:
+        print(f"  {cenario:<10} sem respostas 200 ({r['requisicoes']} requisições, status {r['status']})")
+        return
+    print(f"  {cenario:<10} {r['vazao_rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  "
+          f"p99 {r['p99_ms']:>8.2f} ms  erros {r['erros']}")
+
+
+async def main(args):
+    urls = {'mestra': args.url_mestra, 'dengue': args.url_dengue, 'rf': args.url_rf, 'lstm': args.url_lstm}
+    bairros_mestra, bairros_dengue = carregar_bairros()
+    rng = np.random.default_rng(args.semente)
+
+    print(f"Carga: {args.concorrencia} clientes, {args.duracao} s por cenário (+{args.aquecimento} s de aquecimento)")
+    resultados = {}
+    for cenario in args.cenarios:
+        gerar = montar_gerador(cenario, urls, bairros_mestra, bairros_dengue, rng)
+        resultados[cenario] = await rodar_cenario(cenario, gerar, args.concorrencia, args.duracao,
+                                                  args.aquecimento, args.timeout)
+        imprimir(cenario, resultados[cenario])
+
+    config = {'concorrencia': args.concorrencia, 'duracao_s': args.duracao, 'aquecimento_s': args.aquecimento,
+              'urls': urls}
+    salvar_resultado('carga', {'config': config, 'cenarios': resultados}, args.saida)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga das APIs de predição de dengue.")
+    parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=CENARIOS)
+    parser.add_argument('--concorrencia', type=int, default=8, help="Requisições simultâneas.")
+    parser.add_argument('--duracao', type=float, default=10.0, help="Segundos medidos por cenário.")
+    parser.add_argument('--aquecimento', type=float, default=2.0, help="Segundos não medidos antes de cada cenário.")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--url-mestra', default='http://127.0.0.1:5010')
+    parser.add_argument('--url-dengue', default='http://127.0.0.1:5000')
+    parser.add_argument('--url-rf', default='http://127.0.0.1:5002')
+    parser.add_argument('--url-lstm', default='http://127.0.0.1:5001')
+    parser.add_argument('--saida', help="Arquivo JSON de saída (padrão: benchmark/resultados/carga_<data>.json).")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,49 @@
+import argparse
+import json
+
+# -----------------------------------------------------------------------------
+# COMPARAÇÃO DE DUAS EXECUÇÕES (carga.py ou micro.py)
+# -----------------------------------------------------------------------------
+#   python benchmark/comparar.py resultados/micro_antes.json resultados/micro_depois.json
+
+METRICAS = {
+    'carga': ('cenarios', ['p50_ms', 'p95_ms', 'p99_ms', 'vazao_rps']),
+    'micro': ('casos', ['p50_ms', 'p95_ms']),
+}
+
+
+def carregar(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def variacao(antes, depois):
+    if not antes:
+        return '      -'
+    return f"{(depois - antes) / antes * 100:+6.1f}%"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark.")
+    parser.add_argument('antes')
+    parser.add_argument('depois')
+    args = parser.parse_args()
+
+    antes, depois = carregar(args.antes), carregar(args.depois)
+    if antes['tipo'] != depois['tipo']:
+        raise SystemExit(f"ERRO: tipos diferentes ({antes['tipo']} x {depois['tipo']}).")
+    chave, metricas = METRICAS[antes['tipo']]
+
+    print(f"Antes:  {args.antes} (commit {antes['metadados'].get('commit')}, {antes['metadados']['data']})")
+    print(f"Depois: {args.depois} (commit {depois['metadados'].get('commit')}, {depois['metadados']['data']})\n")
+    for nome in antes[chave]:
+        if nome not in depois[chave]:
+            print(f"  {nome:<36} (só no primeiro)")
+            continue
+        a, d = antes[chave][nome], depois[chave][nome]
+        colunas = [f"{m} {a.get(m, 0):.3f} -> {d.get(m, 0):.3f} ({variacao(a.get(m), d.get(m, 0))})"
+                   for m in metricas if m in a or m in d]
+        print(f"  {nome:<36} " + '  '.join(colunas))
+    for nome in depois[chave]:
+        if nome not in antes[chave]:
+            print(f"  {nome:<36} (só no segundo)")
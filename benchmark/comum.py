@@ -0,0 +1,61 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Funções compartilhadas pelos scripts de benchmark: estatísticas de latência
+# e gravação dos resultados em JSON (um arquivo por execução, para comparar
+# execuções com 'comparar.py').
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(DIRETORIO)
+DIRETORIO_RESULTADOS = os.path.join(DIRETORIO, 'resultados')
+
+# Variáveis de ambiente que mudam o comportamento das APIs (gravadas junto com o resultado)
+VARIAVEIS_CONFIGURACAO = ['BACKEND_INFERENCIA', 'BACKEND_RF', 'MICRO_LOTES', 'MICRO_LOTE_TAMANHO_MAX',
+                          'MICRO_LOTE_ESPERA_MS', 'MODELO_MULTI_HORIZONTE', 'OPENWEATHER_URL_BASE']
+
+
+def resumir_latencias(latencias_s):
+    """p50/p95/p99, média e máximo em milissegundos."""
+    if len(latencias_s) == 0:
+        return {'n': 0}
+    ms = np.asarray(latencias_s) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'n': int(len(ms)), 'p50_ms': round(float(p50), 4), 'p95_ms': round(float(p95), 4),
+            'p99_ms': round(float(p99), 4), 'media_ms': round(float(ms.mean()), 4), 'max_ms': round(float(ms.max()), 4)}
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadados_execucao():
+    return {
+        'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': _commit_atual(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'ambiente': {nome: os.environ[nome] for nome in VARIAVEIS_CONFIGURACAO if nome in os.environ},
+    }
+
+
+def salvar_resultado(tipo, dados, caminho=None):
+    """Grava {'tipo', 'metadados', **dados} em JSON e devolve o caminho."""
+    if caminho is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        caminho = os.path.join(DIRETORIO_RESULTADOS, f"{tipo}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'tipo': tipo, 'metadados': metadados_execucao(), **dados}, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em '{caminho}'.")
+    return caminho
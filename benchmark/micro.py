@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+from comum import DIRETORIO, RAIZ, resumir_latencias, salvar_resultado
+
+# -----------------------------------------------------------------------------
+# MICRO-BENCHMARKS DO CAMINHO DE INFERÊNCIA DA API MESTRA
+# -----------------------------------------------------------------------------
+# Mede, fora do servidor, cada etapa de uma requisição: conversão e resumo
+# da previsão, normalização e predict de cada horizonte (por backend e
+# tamanho de lote). Usa a previsão gravada em 'payloads/forecast.json'.
+#
+#   python benchmark/micro.py
+#   python benchmark/micro.py --backends numpy --iteracoes 1000
+
+# A api_mestra carrega os artefatos ao ser importada; o backend dela não
+# importa aqui (os modelos de cada backend são carregados abaixo) e os
+# micro-lotes ficariam só com threads ociosas
+os.environ.setdefault('BACKEND_INFERENCIA', 'numpy')
+os.environ.setdefault('MICRO_LOTES', '0')
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+import api_mestra
+from LSTM.inferencia_numpy import carregar_modelo_numpy
+from previsao_colunar import _resumir_por_dia, converter_previsao
+
+
+def medir(funcao, iteracoes, tempo_max):
+    """Cronometra cada chamada individualmente (após 10 de aquecimento)."""
+    for _ in range(min(10, iteracoes)):
+        funcao()
+    tempos = []
+    limite = time.perf_counter() + tempo_max
+    for _ in range(iteracoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+        if inicio > limite:
+            break
+    return resumir_latencias(tempos)
+
+
+def carregar_modelos(backend):
+    if backend == 'numpy':
+        return {dias: carregar_modelo_numpy(config['arquivo']) for dias, config in api_mestra.config_modelos.items()}
+    from tensorflow.keras.models import load_model
+    return {dias: load_model(config['arquivo'], compile=False) for dias, config in api_mestra.config_modelos.items()}
+
+
+def main(args):
+    with open(os.path.join(DIRETORIO, 'payloads', 'forecast.json'), encoding='utf-8') as f:
+        dados_forecast = json.load(f)
+    previsao = converter_previsao(dados_forecast)
+    sequencia = previsao.sequencia_clima(40)
+    _, iips_todos = api_mestra.indice_bairros.listar()
+    scaler_sklearn = joblib.load('Treinar API models/scaler_features_dengue.joblib')
+    # O transform com array (sem nomes de colunas) é o que a API fazia; o aviso só polui a saída
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    lotes = sorted({1, len(iips_todos)})
+
+    casos = {
+        'converter_previsao': lambda: converter_previsao(dados_forecast),
+        'processar_previsao_diaria_5d': lambda: api_mestra.processar_previsao_diaria(dados_forecast['list'], 5),
+        'resumo_diario': lambda: _resumir_por_dia(previsao),
+    }
+    for n in lotes:
+        iips = np.asarray(iips_todos[:n], dtype=float)
+        lote = np.empty((n, 40, 4))
+        lote[:, :, :3] = sequencia
+        lote[:, :, 3] = iips[:, None]
+        casos[f'scaler_sklearn_lote{n}'] = lambda lote=lote: scaler_sklearn.transform(lote.reshape(-1, 4))
+        casos[f'montar_lote_normalizado_lote{n}'] = lambda iips=iips: api_mestra.montar_lote_normalizado(sequencia, iips)
+
+    for backend in args.backends:
+        modelos = carregar_modelos(backend)
+        for n in lotes:
+            entrada = api_mestra.montar_lote_normalizado(sequencia, iips_todos[:n]).copy()
+            for dias, modelo in modelos.items():
+                prefixo = entrada[:, :api_mestra.config_modelos[dias]['passos']]
+                casos[f'predict_{dias}d_{backend}_lote{n}'] = \
+                    lambda modelo=modelo, prefixo=prefixo: modelo.predict(prefixo, verbose=0)
+
+    print(f"Micro-benchmarks ({args.iteracoes} iterações, no máximo {args.tempo_max} s cada):")
+    resultados = {}
+    for nome, funcao in casos.items():
+        resultados[nome] = medir(funcao, args.iteracoes, args.tempo_max)
+        r = resultados[nome]
+        print(f"  {nome:<36} p50 {r['p50_ms']:>9.4f} ms  p95 {r['p95_ms']:>9.4f} ms  (n={r['n']})")
+
+    config = {'iteracoes': args.iteracoes, 'tempo_max_s': args.tempo_max, 'backends': args.backends,
+              'n_bairros': len(iips_todos)}
+    salvar_resultado('micro', {'config': config, 'casos': resultados}, args.saida)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do caminho de inferência.")
+    parser.add_argument('--backends', nargs='+', choices=['keras', 'numpy'], default=['keras', 'numpy'])
+    parser.add_argument('--iteracoes', type=int, default=300)
+    parser.add_argument('--tempo-max', type=float, default=5.0, help="Tempo máximo por caso, em segundos.")
+    parser.add_argument('--saida', help="Arquivo JSON de saída (padrão: benchmark/resultados/micro_<data>.json).")
+    main(parser.parse_args())
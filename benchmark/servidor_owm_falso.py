@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+
+from aiohttp import web
+
+# -----------------------------------------------------------------------------
+# OPENWEATHERMAP FALSO PARA BENCHMARKS
+# -----------------------------------------------------------------------------
+# Serve respostas gravadas de '/weather' e '/forecast' com latência
+# configurável, para medir as APIs sem depender (nem gastar a cota) do
+# serviço real. As APIs apontam para ele pela variável OPENWEATHER_URL_BASE:
+#
+#   python benchmark/servidor_owm_falso.py --latencia-ms 80 --jitter-ms 40
+#   OPENWEATHER_URL_BASE=http://127.0.0.1:8999/data/2.5 python api_mestra.py
+#
+# Regravar as respostas a partir da API real (precisa de API_KEY_WEATHER):
+#   python benchmark/servidor_owm_falso.py --gravar
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(DIRETORIO)
+DIRETORIO_PAYLOADS = os.path.join(DIRETORIO, 'payloads')
+ENDPOINTS = ('weather', 'forecast')
+
+
+def carregar_payloads(diretorio=DIRETORIO_PAYLOADS):
+    payloads = {}
+    for endpoint in ENDPOINTS:
+        with open(os.path.join(diretorio, f'{endpoint}.json'), encoding='utf-8') as f:
+            # Serializado uma vez: cada requisição só devolve os bytes prontos
+            payloads[endpoint] = json.dumps(json.load(f), ensure_ascii=False).encode('utf-8')
+    return payloads
+
+
+def gravar_payloads(diretorio=DIRETORIO_PAYLOADS):
+    """Busca '/weather' e '/forecast' reais de Montes Claros e grava em 'payloads/'."""
+    sys.path.insert(0, RAIZ)
+    from cliente_meteorologia import ClienteMeteorologia
+
+    api_key = os.environ.get('API_KEY_WEATHER', '').strip()
+    if not api_key:
+        sys.exit("ERRO: defina API_KEY_WEATHER para gravar respostas reais.")
+    cliente = ClienteMeteorologia(api_key)
+    os.makedirs(diretorio, exist_ok=True)
+    for endpoint in ENDPOINTS:
+        dados = cliente.buscar(endpoint, ('Montes Claros', 'MG', 'BR'))
+        with open(os.path.join(diretorio, f'{endpoint}.json'), 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=1)
+        print(f"  [OK] '{endpoint}' gravado.")
+
+
+def criar_app(payloads, latencia_ms=0.0, jitter_ms=0.0, taxa_erro=0.0):
+    """
+    Latência de cada resposta: latencia_ms + uniforme(0, jitter_ms).
+    'taxa_erro' é a fração de respostas 503, para exercitar as retentativas.
+    """
+    contagem = {endpoint: 0 for endpoint in ENDPOINTS}
+    contagem['erros'] = 0
+
+    def rota(endpoint):
+        async def responder(request):
+            contagem[endpoint] += 1
+            espera = latencia_ms + random.uniform(0, jitter_ms)
+            if espera > 0:
+                await asyncio.sleep(espera / 1000)
+            if taxa_erro and random.random() < taxa_erro:
+                contagem['erros'] += 1
+                return web.json_response({'cod': 503, 'message': 'erro simulado'}, status=503)
+            return web.Response(body=payloads[endpoint], content_type='application/json')
+        return responder
+
+    async def estatisticas(request):
+        return web.json_response(contagem)
+
+    async def zerar(request):
+        for chave in contagem:
+            contagem[chave] = 0
+        return web.json_response(contagem)
+
+    app = web.Application()
+    for endpoint in ENDPOINTS:
+        app.router.add_get(f'/data/2.5/{endpoint}', rota(endpoint))
+    app.router.add_get('/estatisticas', estatisticas)
+    app.router.add_post('/estatisticas/zerar', zerar)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="OpenWeatherMap falso para benchmarks.")
+    parser.add_argument('--porta', type=int, default=8999)
+    parser.add_argument('--latencia-ms', type=float, default=50.0, help="Latência fixa de cada resposta.")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Latência extra aleatória (uniforme).")
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help="Fração de respostas 503.")
+    parser.add_argument('--payloads', default=DIRETORIO_PAYLOADS, help="Diretório com weather.json e forecast.json.")
+    parser.add_argument('--gravar', action='store_true', help="Regrava os payloads a partir da API real e sai.")
+    args = parser.parse_args()
+
+    if args.gravar:
+        gravar_payloads(args.payloads)
+        sys.exit(0)
+
+    print(f"OpenWeatherMap falso em http://127.0.0.1:{args.porta}/data/2.5 "
+          f"(latência {args.latencia_ms} ms + até {args.jitter_ms} ms, erros {args.taxa_erro:.0%})")
+    web.run_app(criar_app(carregar_payloads(args.payloads), args.latencia_ms, args.jitter_ms, args.taxa_erro),
+                port=args.porta, print=None)
@@ -0,0 +1,349 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from armazem_previsoes import chave_local
+from cache_previsao import CachePrevisao, _Entrada
+from cache_resultados import CacheResultados, etag_da_chave
+
+# -----------------------------------------------------------------------------
+# CACHE COMPARTILHADO ENTRE OS WORKERS DE UMA MÁQUINA
+# -----------------------------------------------------------------------------
+# Com o servidor pré-fork (servidor_producao.py) cada worker teria os seus
+# caches: N workers, N buscas da mesma previsão no OpenWeatherMap e N cálculos
+# do mesmo bairro. Com CACHE_COMPARTILHADO apontando para um arquivo (de
+# preferência em /dev/shm, que fica na memória), os caches ganham uma camada
+# comum num SQLite em modo WAL, com a mesma interface dos caches em memória:
+#
+#   - previsões: cada chave tem uma versão que sobe a cada busca gravada.
+#     Antes de responder, o worker confere a versão (uma leitura de poucos
+#     bytes) e só lê e decodifica o valor quando ela mudou: a renovação feita
+#     por um worker vale para todos, e cada um decodifica cada versão uma vez;
+#   - a busca na API tem uma reserva entre processos: com o valor ausente ou
+#     vencido, só um worker vai ao OpenWeatherMap e os outros esperam a versão
+#     nova aparecer (o single-flight do CachePrevisao, agora entre processos);
+#   - resultados por (bairro, dias): a chave já inclui as versões da previsão,
+#     dos modelos e do índice de bairros, então o valor nunca muda; cada worker
+#     mantém o seu LRU na frente e só lê a camada comum na falta local.
+#
+# Sem CACHE_COMPARTILHADO (o padrão, e o caso de um processo só) ficam os
+# caches em memória de sempre. O arquivo é só cache: pode ser apagado com os
+# serviços parados. Um erro do SQLite não derruba a requisição: o worker
+# avisa e segue com o cache local.
+
+ARQUIVO_CACHE_COMPARTILHADO = os.environ.get('CACHE_COMPARTILHADO', '')
+PRAZO_RESERVA_SEGUNDOS = 60.0   # reserva de quem caiu no meio da busca expira depois disso
+ESPERA_RESERVA_SEGUNDOS = 0.05  # intervalo entre conferências de quem espera a busca de outro
+APARAR_A_CADA = 64              # gravações de resultados entre uma poda e outra
+
+
+def _json_para_bytes(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class AreaCompartilhada:
+    """
+    O arquivo SQLite comum aos processos: valores versionados, reservas de
+    busca e resultados. A conexão é do processo; depois de um fork o filho
+    abre a sua na primeira operação.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self._trava = threading.Lock()
+        self._conexao = None
+        self._pid = None
+        self._gravacoes_resultados = 0
+        self._ultimo_aviso = -float('inf')
+        with self._trava:
+            conexao = self._conectar()
+            conexao.executescript("""
+                CREATE TABLE IF NOT EXISTS valores (
+                    cache TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    versao INTEGER NOT NULL,
+                    instante REAL NOT NULL,
+                    dados BLOB NOT NULL,
+                    PRIMARY KEY (cache, chave)
+                );
+                CREATE TABLE IF NOT EXISTS reservas (
+                    cache TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    ate REAL NOT NULL,
+                    PRIMARY KEY (cache, chave)
+                );
+                CREATE TABLE IF NOT EXISTS resultados (
+                    cache TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    gravado_em REAL NOT NULL,
+                    dados BLOB NOT NULL,
+                    PRIMARY KEY (cache, chave)
+                );
+                CREATE INDEX IF NOT EXISTS resultados_por_idade ON resultados (cache, gravado_em);
+            """)
+
+    def _conectar(self):
+        if self._pid != os.getpid():
+            self._conexao = sqlite3.connect(self.caminho, timeout=2, check_same_thread=False)
+            self._conexao.execute('PRAGMA journal_mode=WAL')
+            # É só cache: não vale esperar o disco a cada gravação
+            self._conexao.execute('PRAGMA synchronous=OFF')
+            self._pid = os.getpid()
+        return self._conexao
+
+    def _escrever(self, sql, parametros):
+        def operacao(conexao):
+            with conexao:
+                conexao.execute(sql, parametros)
+        self._usar(operacao, None)
+
+    def _usar(self, operacao, padrao):
+        """'operacao(conexao)'; num erro do SQLite avisa (no máximo uma vez por minuto) e devolve 'padrao'."""
+        with self._trava:
+            try:
+                return operacao(self._conectar())
+            except sqlite3.Error as e:
+                agora = time.monotonic()
+                if agora - self._ultimo_aviso > 60:
+                    self._ultimo_aviso = agora
+                    print(f"  [AVISO] Cache compartilhado '{self.caminho}' indisponível ({e}); "
+                          f"seguindo com o cache local.")
+                return padrao
+
+    # --- VALORES VERSIONADOS ---
+
+    def ler(self, cache, chave, exceto_versao=None):
+        """(versão, instante, dados) da chave, ou None; 'dados' é None se a versão for 'exceto_versao'."""
+        return self._usar(lambda conexao: conexao.execute(
+            'SELECT versao, instante, CASE WHEN versao IS ? THEN NULL ELSE dados END '
+            'FROM valores WHERE cache = ? AND chave = ?', (exceto_versao, cache, chave)).fetchone(), None)
+
+    def gravar(self, cache, chave, dados, instante):
+        """
+        Grava uma versão nova, a menos que a guardada seja de uma busca igual
+        ou mais recente, e libera a reserva. Devolve a versão gravada ou None.
+        """
+        def operacao(conexao):
+            with conexao:
+                linha = conexao.execute(
+                    'INSERT INTO valores (cache, chave, versao, instante, dados) VALUES (?, ?, 1, ?, ?) '
+                    'ON CONFLICT (cache, chave) DO UPDATE SET versao = versao + 1, instante = excluded.instante, '
+                    'dados = excluded.dados WHERE excluded.instante > valores.instante RETURNING versao',
+                    (cache, chave, instante, dados)).fetchall()
+                conexao.execute('DELETE FROM reservas WHERE cache = ? AND chave = ?', (cache, chave))
+            return linha[0][0] if linha else None
+        return self._usar(operacao, None)
+
+    def invalidar(self, cache, chave=None):
+        if chave is None:
+            self._escrever('DELETE FROM valores WHERE cache = ?', (cache,))
+        else:
+            self._escrever('DELETE FROM valores WHERE cache = ? AND chave = ?', (cache, chave))
+
+    # --- RESERVA DA BUSCA ---
+
+    def reservar(self, cache, chave, prazo):
+        """True se este processo ficou com a busca da chave (ninguém a tinha, ou a reserva expirou)."""
+        agora = time.time()
+
+        def operacao(conexao):
+            with conexao:
+                return bool(conexao.execute(
+                    'INSERT INTO reservas (cache, chave, ate) VALUES (?, ?, ?) ON CONFLICT (cache, chave) '
+                    'DO UPDATE SET ate = excluded.ate WHERE reservas.ate < ? RETURNING 1',
+                    (cache, chave, agora + prazo, agora)).fetchall())
+        # Sem a área, cada processo busca por conta própria
+        return self._usar(operacao, True)
+
+    def liberar(self, cache, chave):
+        self._escrever('DELETE FROM reservas WHERE cache = ? AND chave = ?', (cache, chave))
+
+    # --- RESULTADOS IMUTÁVEIS ---
+
+    def ler_resultado(self, cache, chave):
+        linha = self._usar(lambda conexao: conexao.execute(
+            'SELECT dados FROM resultados WHERE cache = ? AND chave = ?', (cache, chave)).fetchone(), None)
+        return linha[0] if linha else None
+
+    def gravar_resultado(self, cache, chave, dados, capacidade):
+        """Grava o resultado e, de tempos em tempos, apaga os mais antigos além de 'capacidade'."""
+        def operacao(conexao):
+            with conexao:
+                conexao.execute(
+                    'INSERT OR REPLACE INTO resultados (cache, chave, gravado_em, dados) VALUES (?, ?, ?, ?)',
+                    (cache, chave, time.time(), dados))
+                self._gravacoes_resultados += 1
+                if self._gravacoes_resultados % APARAR_A_CADA == 0:
+                    conexao.execute(
+                        'DELETE FROM resultados WHERE cache = ? AND gravado_em <= (SELECT gravado_em FROM resultados '
+                        'WHERE cache = ? ORDER BY gravado_em DESC LIMIT 1 OFFSET ?)', (cache, cache, capacidade))
+        self._usar(operacao, None)
+
+    def limpar_resultados(self, cache):
+        self._escrever('DELETE FROM resultados WHERE cache = ?', (cache,))
+
+    def fechar(self):
+        """No mestre antes do fork (e ao encerrar): os filhos abrem as suas conexões."""
+        with self._trava:
+            if self._conexao is not None and self._pid == os.getpid():
+                self._conexao.close()
+            self._conexao = None
+            self._pid = None
+
+
+class CachePrevisaoCompartilhada(CachePrevisao):
+    """
+    CachePrevisao (mesma interface e mesmas regras de TTL e de valor
+    obsoleto) com os valores versionados na 'area' sob o nome 'nome'.
+    'codificar' e 'decodificar' convertem o valor em bytes e de volta.
+    """
+
+    def __init__(self, area, nome, funcao_busca, codificar, decodificar, prazo_busca=PRAZO_RESERVA_SEGUNDOS,
+                 **kwargs):
+        super().__init__(funcao_busca, **kwargs)
+        self.area = area
+        self.nome = nome
+        self.codificar = codificar
+        self.decodificar = decodificar
+        self.prazo_busca = prazo_busca
+        self._versoes = {}  # chave -> versão da área que está em '_entradas'
+
+    def _carregar(self, chave, linha):
+        """Decodifica a versão lida da área (se for nova) e a deixa no cache local. Devolve a entrada."""
+        versao, instante, dados = linha
+        if dados is None:  # é a versão que já está no cache local
+            with self._trava:
+                return self._entradas.get(chave)
+        entrada = _Entrada(self.decodificar(dados), instante)
+        with self._trava:
+            self._entradas[chave] = entrada
+            self._versoes[chave] = versao
+            self._erros.pop(chave, None)
+        return entrada
+
+    def sincronizar(self, chave):
+        """
+        Traz para este processo a versão da área, se ela mudou desde a última
+        leitura. Bloqueia (SQLite): o servidor assíncrono chama fora do event loop.
+        """
+        linha = self.area.ler(self.nome, chave_local(chave), self._versoes.get(chave))
+        if linha is not None:
+            self._carregar(chave, linha)
+
+    def obter(self, chave):
+        self.sincronizar(chave)
+        return super().obter(chave)
+
+    # 'consultar' continua só na memória do processo (nunca bloqueia): quem
+    # quiser a versão dos outros workers chama 'sincronizar' antes
+
+    def guardar(self, chave, dados, instante=None):
+        instante = time.time() if instante is None else instante
+        self._publicar(chave, dados, instante)
+        super().guardar(chave, dados, instante)
+
+    def _publicar(self, chave, dados, instante):
+        versao = self.area.gravar(self.nome, chave_local(chave), self.codificar(dados), instante)
+        if versao is not None:
+            with self._trava:
+                self._versoes[chave] = versao
+
+    def _buscar(self, chave):
+        """
+        Só um processo por vez busca a chave na API; os outros esperam a
+        versão que ele gravar (ou assumem a busca se ele falhar).
+        """
+        texto = chave_local(chave)
+        while True:
+            linha = self.area.ler(self.nome, texto, self._versoes.get(chave))
+            if linha is not None and time.time() - linha[1] < self.ttl:
+                entrada = self._carregar(chave, linha)
+                if entrada is not None:
+                    return entrada.dados, entrada.instante
+            if self.area.reservar(self.nome, texto, self.prazo_busca):
+                break
+            time.sleep(ESPERA_RESERVA_SEGUNDOS)
+        try:
+            dados = self.funcao_busca(chave)
+        except Exception:
+            self.area.liberar(self.nome, texto)
+            raise
+        instante = time.time()
+        self._publicar(chave, dados, instante)
+        return dados, instante
+
+    def invalidar(self, chave=None):
+        self.area.invalidar(self.nome, None if chave is None else chave_local(chave))
+        with self._trava:
+            if chave is None:
+                self._versoes.clear()
+            else:
+                self._versoes.pop(chave, None)
+        super().invalidar(chave)
+
+
+class CacheResultadosCompartilhado(CacheResultados):
+    """
+    CacheResultados (LRU local de 'capacidade' entradas) com uma segunda
+    camada na 'area'. Os resultados são dicionários JSON; a chave na área é
+    o hash da chave (o mesmo da ETag).
+    """
+
+    def __init__(self, area, nome, capacidade):
+        super().__init__(capacidade)
+        self.area = area
+        self.nome = nome
+
+    def obter(self, chave):
+        resultado = self.obter_em_memoria(chave)
+        if resultado is not None or self.capacidade <= 0:
+            return resultado
+        dados = self.area.ler_resultado(self.nome, etag_da_chave(chave))
+        if dados is None:
+            return None
+        resultado = json.loads(dados)
+        super().guardar(chave, resultado)
+        return resultado
+
+    def guardar(self, chave, resultado):
+        if self.capacidade <= 0:
+            return
+        super().guardar(chave, resultado)
+        self.area.gravar_resultado(self.nome, etag_da_chave(chave), _json_para_bytes(resultado), self.capacidade)
+
+    def limpar(self):
+        super().limpar()
+        self.area.limpar_resultados(self.nome)
+
+
+# --- CONSTRUÇÃO PELAS APIS ---
+
+def abrir_area(caminho=ARQUIVO_CACHE_COMPARTILHADO):
+    """A área configurada; None se desligada (CACHE_COMPARTILHADO='') ou se falhar."""
+    if not caminho:
+        return None
+    try:
+        area = AreaCompartilhada(caminho)
+    except (sqlite3.Error, OSError) as e:
+        print(f"ERRO ao abrir o cache compartilhado '{caminho}': {e}. Seguindo com os caches de cada processo.")
+        return None
+    print(f"  [OK] Cache compartilhado entre processos em '{caminho}'.")
+    return area
+
+
+def criar_cache_previsao(area, nome, funcao_busca, codificar=_json_para_bytes, decodificar=json.loads, **kwargs):
+    """Cache de previsão sobre a 'area', ou o CachePrevisao em memória se ela for None."""
+    if area is None:
+        return CachePrevisao(funcao_busca, **kwargs)
+    return CachePrevisaoCompartilhada(area, nome, funcao_busca, codificar, decodificar, **kwargs)
+
+
+def criar_cache_resultados(area, nome, capacidade):
+    """Cache de resultados sobre a 'area', ou o CacheResultados em memória se ela for None."""
+    if area is None:
+        return CacheResultados(capacidade)
+    return CacheResultadosCompartilhado(area, nome, capacidade)
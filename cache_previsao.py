@@ -0,0 +1,143 @@
+import threading
+import time
+
+# Passo da previsão do OpenWeatherMap (/forecast): um ponto a cada 3 horas.
+PASSO_PREVISAO_SEGUNDOS = 3 * 60 * 60
+
+
+def segundos_ate_proximo_passo(agora=None):
+    """Segundos até a próxima fronteira de 3h (00h, 03h, 06h... UTC, como os passos do /forecast)."""
+    agora = time.time() if agora is None else agora
+    return int(PASSO_PREVISAO_SEGUNDOS - agora % PASSO_PREVISAO_SEGUNDOS)
+
+
+class _Entrada:
+    """Um valor guardado no cache junto com o instante em que foi buscado."""
+
+    __slots__ = ('dados', 'instante')
+
+    def __init__(self, dados, instante):
+        self.dados = dados
+        self.instante = instante
+
+
+class CachePrevisao:
+    """
+    Cache em memória para a previsão do tempo, compartilhado por todas as
+    requisições do processo e indexado pela localização (cidade, estado, país).
+
+    - Dentro do TTL, devolve o valor guardado sem tocar na API externa.
+    - Vencido o TTL (mas dentro de 'max_obsoleto'), devolve o valor antigo
+      na hora e dispara UMA atualização em segundo plano (stale-while-revalidate).
+    - Sem valor utilizável, só a primeira requisição chama a API; as outras
+      que chegarem ao mesmo tempo esperam por esse mesmo resultado (single-flight).
+    """
+
+    def __init__(self, funcao_busca, ttl=PASSO_PREVISAO_SEGUNDOS, max_obsoleto=None, ao_consultar=None):
+        self.funcao_busca = funcao_busca
+        # Chamada com 'acerto', 'obsoleto' ou 'falta' a cada consulta (métricas)
+        self.ao_consultar = ao_consultar or (lambda resultado: None)
+        self.ttl = ttl
+        # Por padrão aceitamos servir um valor vencido por até mais um passo de previsão.
+        self.max_obsoleto = max_obsoleto if max_obsoleto is not None else 2 * ttl
+        self._entradas = {}
+        self._em_andamento = {}  # chave -> threading.Event da busca em curso
+        self._erros = {}  # chave -> exceção da última busca síncrona
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        """Devolve os dados para 'chave', buscando na API apenas quando necessário."""
+        agora = time.time()
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                idade = agora - entrada.instante
+                if idade < self.ttl:
+                    self.ao_consultar('acerto')
+                    return entrada.dados
+                if idade < self.max_obsoleto:
+                    self.ao_consultar('obsoleto')
+                    # Serve o valor antigo e atualiza em segundo plano (se ninguém já estiver atualizando)
+                    if chave not in self._em_andamento:
+                        self._em_andamento[chave] = threading.Event()
+                        threading.Thread(target=self._atualizar, args=(chave,), daemon=True).start()
+                    return entrada.dados
+
+            self.ao_consultar('falta')
+            evento = self._em_andamento.get(chave)
+            lider = evento is None
+            if lider:
+                evento = threading.Event()
+                self._em_andamento[chave] = evento
+
+        if lider:
+            self._atualizar(chave)
+        else:
+            evento.wait()
+
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            erro = self._erros.get(chave)
+        if entrada is not None and time.time() - entrada.instante < self.max_obsoleto:
+            return entrada.dados
+        if erro is not None:
+            raise erro
+        raise RuntimeError(f"Não foi possível obter a previsão para {chave}.")
+
+    def consultar(self, chave):
+        """
+        Versão que nunca bloqueia (para o servidor asyncio): devolve o valor
+        se ainda for utilizável, disparando a atualização em segundo plano se
+        estiver vencido, ou None se for preciso buscar na API.
+        """
+        agora = time.time()
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is None or agora - entrada.instante >= self.max_obsoleto:
+                self.ao_consultar('falta')
+                return None
+            if agora - entrada.instante < self.ttl:
+                self.ao_consultar('acerto')
+                return entrada.dados
+            self.ao_consultar('obsoleto')
+            if chave not in self._em_andamento:
+                self._em_andamento[chave] = threading.Event()
+                threading.Thread(target=self._atualizar, args=(chave,), daemon=True).start()
+            return entrada.dados
+
+    def guardar(self, chave, dados, instante=None):
+        """
+        Guarda um valor buscado por fora (ex.: pelo cliente assíncrono, ou
+        lido do armazém ao subir, com o 'instante' original da busca).
+        """
+        with self._trava:
+            self._entradas[chave] = _Entrada(dados, time.time() if instante is None else instante)
+            self._erros.pop(chave, None)
+
+    def _buscar(self, chave):
+        """(dados, instante) de uma busca nova na API."""
+        return self.funcao_busca(chave), time.time()
+
+    def _atualizar(self, chave):
+        """Executa a busca na API e acorda todas as requisições que esperavam por ela."""
+        try:
+            dados, instante = self._buscar(chave)
+        except Exception as e:
+            print(f"  [CACHE] Falha ao atualizar a previsão de {chave}: {e}")
+            with self._trava:
+                self._erros[chave] = e
+                evento = self._em_andamento.pop(chave)
+        else:
+            with self._trava:
+                self._entradas[chave] = _Entrada(dados, instante)
+                self._erros.pop(chave, None)
+                evento = self._em_andamento.pop(chave)
+        evento.set()
+
+    def invalidar(self, chave=None):
+        """Descarta uma entrada (ou todas, se 'chave' for None)."""
+        with self._trava:
+            if chave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(chave, None)
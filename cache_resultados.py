@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CacheResultados:
+    """
+    Cache LRU limitado para as respostas já calculadas das rotas de risco.
+
+    A chave inclui tudo de que a resposta depende (bairro, dias e as versões
+    da previsão, dos modelos e do índice de bairros): uma previsão nova ou uma
+    recarga muda a chave, e as entradas antigas só saem pelo fim da fila LRU.
+    Os valores são os dicionários da resposta e não devem ser alterados.
+    Com 'capacidade' 0 o cache fica desligado.
+    """
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        """Devolve o resultado guardado (e o marca como usado), ou None."""
+        return self.obter_em_memoria(chave)
+
+    def obter_em_memoria(self, chave):
+        """Como 'obter', mas só na memória do processo: nunca bloqueia (event loop do servidor assíncrono)."""
+        with self._trava:
+            resultado = self._entradas.get(chave)
+            if resultado is not None:
+                self._entradas.move_to_end(chave)
+            return resultado
+
+    def guardar(self, chave, resultado):
+        if self.capacidade <= 0:
+            return
+        with self._trava:
+            self._entradas[chave] = resultado
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.capacidade:
+                self._entradas.popitem(last=False)
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+def etag_da_chave(chave):
+    """ETag forte derivada da chave: a mesma chave sempre gera o mesmo corpo."""
+    return hashlib.blake2b(repr(chave).encode('utf-8'), digest_size=12).hexdigest()
+
+
+def etag_corresponde(if_none_match, etag):
+    """Se o cabeçalho If-None-Match (ex.: '"a", W/"b"' ou '*') cobre a 'etag' (sem aspas)."""
+    if not if_none_match:
+        return False
+    for valor in if_none_match.split(','):
+        valor = valor.strip()
+        if valor == '*':
+            return True
+        if valor.startswith('W/'):
+            valor = valor[2:]
+        if valor.strip('"') == etag:
+            return True
+    return False
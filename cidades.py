@@ -0,0 +1,81 @@
+import json
+import math
+import os
+
+# -----------------------------------------------------------------------------
+# CIDADES ATENDIDAS (UM PROCESSO PARA TODOS OS MUNICÍPIOS)
+# -----------------------------------------------------------------------------
+# Cada cidade de 'cidades.json' tem a sua planilha de bairros (e, se houver,
+# a da api_dengue) e a sua previsão no cache (a chave é a localização), mas
+# os modelos são os mesmos para todas. As rotas recebem '?cidade=<id>' ou
+# '?lat=..&lon=..' (vale a cidade configurada mais próxima, até RAIO_MAXIMO_KM);
+# sem nenhum dos dois, a CIDADE_PADRAO.
+#
+# As planilhas de bairros de outras cidades seguem o formato das de Montes
+# Claros (aba 'Dados Dengue', colunas 'BAIRRO' e 'IIP%'; na da api_dengue,
+# 'bairro' e 'iip_percentual').
+
+ARQUIVO_CIDADES = os.environ.get('ARQUIVO_CIDADES', 'cidades.json')
+CIDADE_PADRAO = os.environ.get('CIDADE_PADRAO', 'montes_claros')
+RAIO_MAXIMO_KM = float(os.environ.get('RAIO_MAXIMO_KM', '50'))
+
+
+class Cidade:
+    """Uma cidade de 'cidades.json'; 'local' é a chave usada no OpenWeatherMap e nos caches."""
+
+    def __init__(self, id_cidade, nome, estado, pais, lat=None, lon=None, bairros=None, bairros_dengue=None):
+        self.id = id_cidade
+        self.nome = nome
+        self.estado = estado
+        self.pais = pais
+        self.lat = lat
+        self.lon = lon
+        self.bairros = bairros                # planilha da api_mestra
+        self.bairros_dengue = bairros_dengue  # planilha da api_dengue (opcional)
+        self.local = (nome, estado, pais)
+
+
+def carregar_cidades(caminho=ARQUIVO_CIDADES):
+    """{id: Cidade}, na ordem do arquivo. A CIDADE_PADRAO precisa estar nele."""
+    with open(caminho, encoding='utf-8') as f:
+        configuracao = json.load(f)
+    cidades = {id_cidade: Cidade(id_cidade, **dados) for id_cidade, dados in configuracao.items()}
+    if CIDADE_PADRAO not in cidades:
+        raise KeyError(f"A cidade padrão '{CIDADE_PADRAO}' não está em '{caminho}'.")
+    return cidades
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distância pela fórmula de haversine."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def resolver_cidade(cidades, parametros):
+    """
+    Cidade pedida nos parâmetros da URL ('cidade', ou 'lat' e 'lon').
+    Devolve (Cidade, None) ou (None, (mensagem, status_http)).
+    """
+    id_cidade = parametros.get('cidade')
+    if id_cidade:
+        cidade = cidades.get(id_cidade.strip().lower())
+        if cidade is None:
+            return None, (f"Cidade '{id_cidade}' não atendida. Disponíveis: {', '.join(cidades)}.", 404)
+        return cidade, None
+
+    lat, lon = parametros.get('lat'), parametros.get('lon')
+    if lat is None and lon is None:
+        return cidades[CIDADE_PADRAO], None
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None, ("Informe 'lat' e 'lon' numéricos (ou 'cidade').", 400)
+
+    candidatas = [(distancia_km(lat, lon, c.lat, c.lon), c) for c in cidades.values() if c.lat is not None]
+    if not candidatas:
+        return None, ("Nenhuma cidade configurada tem coordenadas.", 404)
+    distancia, cidade = min(candidatas, key=lambda par: par[0])
+    if distancia > RAIO_MAXIMO_KM:
+        return None, (f"Nenhuma cidade atendida a menos de {RAIO_MAXIMO_KM:.0f} km de ({lat}, {lon}).", 404)
+    return cidade, None
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# -----------------------------------------------------------------------------
+# CLIENTE HTTP DO OPENWEATHERMAP
+# -----------------------------------------------------------------------------
+# Um único cliente por processo, com conexões reaproveitadas (keep-alive),
+# timeouts explícitos e novas tentativas limitadas com espera aleatória
+# (jitter), para que uma falha passageira da API não vire erro para o usuário
+# e uma API lenta não prenda o servidor indefinidamente.
+
+URL_BASE = os.environ.get('OPENWEATHER_URL_BASE', 'http://api.openweathermap.org/data/2.5')
+TIMEOUT_CONEXAO = 3.05     # segundos para abrir a conexão
+TIMEOUT_LEITURA = 10.0     # segundos esperando a resposta
+MAX_TENTATIVAS = 3         # total de tentativas por chamada
+ESPERA_BASE = 0.25         # base do backoff exponencial (segundos)
+ESPERA_MAXIMA = 2.0
+TAMANHO_POOL = 20          # conexões mantidas abertas por host
+
+# Respostas que valem uma nova tentativa (limite de taxa e falhas do servidor)
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+
+def montar_url(endpoint, local, api_key):
+    """URL de '/weather' ou '/forecast' para a localização (cidade, estado, país)."""
+    cidade, estado, pais = local
+    return f"{URL_BASE}/{endpoint}?q={cidade},{estado},{pais}&appid={api_key}&units=metric&lang=pt_br"
+
+
+def tempo_espera(tentativa):
+    """Backoff exponencial com 'full jitter': espera aleatória entre 0 e base * 2^tentativa."""
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * (2 ** tentativa)))
+
+
+class ClienteMeteorologia:
+    """Cliente síncrono (requests.Session) com pool de conexões, timeouts e retentativas."""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=TAMANHO_POOL, pool_maxsize=TAMANHO_POOL)
+        self.sessao.mount('http://', adaptador)
+        self.sessao.mount('https://', adaptador)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='meteorologia')
+
+    def buscar(self, endpoint, local):
+        """
+        Busca o JSON do endpoint. Erros definitivos (ex.: 401, 404) sobem na hora;
+        timeouts, falhas de conexão e 429/5xx são tentados de novo até MAX_TENTATIVAS.
+        """
+        url = montar_url(endpoint, local, self.api_key)
+        for tentativa in range(MAX_TENTATIVAS):
+            ultima = tentativa == MAX_TENTATIVAS - 1
+            try:
+                resposta = self.sessao.get(url, timeout=(TIMEOUT_CONEXAO, TIMEOUT_LEITURA))
+                if resposta.status_code in STATUS_RETENTAVEIS and not ultima:
+                    time.sleep(tempo_espera(tentativa))
+                    continue
+                resposta.raise_for_status()
+                return resposta.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if ultima:
+                    raise
+                time.sleep(tempo_espera(tentativa))
+
+    def buscar_varios(self, endpoints, local):
+        """Busca vários endpoints independentes ao mesmo tempo. Devolve na mesma ordem."""
+        futuros = [self._executor.submit(self.buscar, endpoint, local) for endpoint in endpoints]
+        return [futuro.result() for futuro in futuros]
+
+
+class ClienteMeteorologiaAsync:
+    """
+    Versão assíncrona (aiohttp) para o servidor asyncio. A sessão é criada no
+    primeiro uso, dentro do event loop, e reaproveita as conexões entre chamadas.
+    """
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self._sessao = None
+
+    def _obter_sessao(self):
+        import aiohttp
+
+        if self._sessao is None or self._sessao.closed:
+            conector = aiohttp.TCPConnector(limit_per_host=TAMANHO_POOL, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(sock_connect=TIMEOUT_CONEXAO, sock_read=TIMEOUT_LEITURA)
+            self._sessao = aiohttp.ClientSession(connector=conector, timeout=timeout, raise_for_status=False)
+        return self._sessao
+
+    async def buscar(self, endpoint, local):
+        import aiohttp
+
+        url = montar_url(endpoint, local, self.api_key)
+        sessao = self._obter_sessao()
+        for tentativa in range(MAX_TENTATIVAS):
+            ultima = tentativa == MAX_TENTATIVAS - 1
+            try:
+                async with sessao.get(url) as resposta:
+                    if resposta.status in STATUS_RETENTAVEIS and not ultima:
+                        await asyncio.sleep(tempo_espera(tentativa))
+                        continue
+                    resposta.raise_for_status()
+                    return await resposta.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if ultima:
+                    raise
+                await asyncio.sleep(tempo_espera(tentativa))
+
+    async def buscar_varios(self, endpoints, local):
+        """Busca vários endpoints independentes em paralelo."""
+        return await asyncio.gather(*(self.buscar(endpoint, local) for endpoint in endpoints))
+
+    async def fechar(self):
+        if self._sessao is not None:
+            await self._sessao.close()
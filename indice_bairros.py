@@ -0,0 +1,141 @@
+import os
+import threading
+import unicodedata
+
+
+def normalizar_nome(nome):
+    """
+    Normaliza o nome do bairro para busca: sem acentos, maiúsculo, sem
+    espaços nas pontas e com espaços internos simples ("São  Luíz " -> "SAO LUIZ").
+    """
+    sem_acento = unicodedata.normalize('NFKD', str(nome))
+    sem_acento = ''.join(c for c in sem_acento if not unicodedata.combining(c))
+    return ' '.join(sem_acento.upper().split())
+
+
+class _Tabela:
+    """Fotografia imutável do índice; trocada inteira a cada recarga."""
+
+    __slots__ = ('nomes', 'posicoes', 'iips', 'registros', 'mtime')
+
+    def __init__(self, nomes, posicoes, iips, registros, mtime):
+        self.nomes = nomes          # nome original (como na planilha), na ordem das linhas
+        self.posicoes = posicoes    # nome normalizado -> posição da linha
+        self.iips = iips            # array float com o IIP de cada linha
+        self.registros = registros  # dict com todos os atributos de cada linha
+        self.mtime = mtime
+
+
+class IndiceBairros:
+    """
+    Índice dos bairros montado uma vez, na carga: cada consulta é um único
+    acesso a dicionário, sem pandas no caminho da requisição.
+
+    'funcao_leitura' devolve o DataFrame (índice = nome do bairro) a partir de
+    'caminho'. Se a planilha mudar no disco, 'iniciar_monitoramento' reconstrói
+    o índice em segundo plano e o troca de forma atômica, sem reiniciar o processo.
+    """
+
+    def __init__(self, caminho, funcao_leitura, coluna_iip, df_inicial=None):
+        self.caminho = caminho
+        self.funcao_leitura = funcao_leitura
+        self.coluna_iip = coluna_iip
+        self._tabela = None
+        self._monitor = None
+        self._mtime_com_erro = None
+        if df_inicial is None:
+            self.recarregar()
+        else:
+            self._tabela = self._montar(df_inicial, self._mtime_fonte())
+
+    def _mtime_fonte(self):
+        try:
+            return os.path.getmtime(self.caminho)
+        except OSError:
+            return None
+
+    def _montar(self, df, mtime):
+        if self.coluna_iip not in df.columns:
+            raise KeyError(f"A coluna de IIP ('{self.coluna_iip}') não foi encontrada. Colunas disponíveis: {list(df.columns)}")
+
+        nomes = [str(nome).strip().upper() for nome in df.index]
+        registros = df.to_dict(orient='records')
+        posicoes = {}
+        for posicao, nome in enumerate(nomes):
+            chave = normalizar_nome(nome)
+            if chave in posicoes:
+                print(f"  [AVISO] Bairro duplicado após normalização: '{nome}' (mantida a última linha).")
+            posicoes[chave] = posicao
+        iips = df[self.coluna_iip].to_numpy(dtype=float)
+        return _Tabela(nomes, posicoes, iips, registros, mtime)
+
+    def recarregar(self):
+        """Lê a planilha de novo e troca o índice inteiro de uma vez."""
+        mtime = self._mtime_fonte()
+        self._tabela = self._montar(self.funcao_leitura(self.caminho), mtime)
+
+    # --- CONSULTAS (caminho da requisição) ---
+
+    def posicao(self, nome):
+        """Posição da linha do bairro, ou None se não existir."""
+        return self._tabela.posicoes.get(normalizar_nome(nome))
+
+    def obter(self, nome):
+        """Devolve o registro (dict, somente leitura) do bairro, ou None se não existir."""
+        tabela = self._tabela
+        posicao = tabela.posicoes.get(normalizar_nome(nome))
+        return None if posicao is None else tabela.registros[posicao]
+
+    def iip(self, nome):
+        """IIP do bairro, ou None se não existir."""
+        tabela = self._tabela
+        posicao = tabela.posicoes.get(normalizar_nome(nome))
+        return None if posicao is None else float(tabela.iips[posicao])
+
+    def listar(self):
+        """(nomes, iips) de todos os bairros, da mesma versão do índice."""
+        tabela = self._tabela
+        return tabela.nomes, tabela.iips
+
+    def __len__(self):
+        return len(self._tabela.nomes)
+
+    @property
+    def versao(self):
+        """Muda a cada recarga (mtime da planilha lida); entra na chave dos resultados em cache."""
+        return self._tabela.mtime
+
+    # --- RECARGA AUTOMÁTICA ---
+
+    def verificar_alteracao(self):
+        """Recarrega se a planilha mudou no disco. Devolve True se recarregou."""
+        mtime = self._mtime_fonte()
+        if mtime is None or mtime in (self._tabela.mtime, self._mtime_com_erro):
+            return False
+        try:
+            self.recarregar()
+            print(f"  [OK] Índice de bairros recarregado de '{self.caminho}' ({len(self)} bairros).")
+            return True
+        except Exception as e:
+            # Mantém o índice antigo se a planilha nova estiver inválida (ou ainda sendo salva)
+            self._mtime_com_erro = mtime
+            print(f"  [ERRO] Falha ao recarregar '{self.caminho}': {e}")
+            return False
+
+    def iniciar_monitoramento(self, intervalo_segundos=5.0):
+        """Verifica a planilha periodicamente numa thread em segundo plano."""
+        if self._monitor is not None:
+            return
+
+        def monitorar():
+            while not parar.wait(intervalo_segundos):
+                self.verificar_alteracao()
+
+        parar = threading.Event()
+        self._monitor = parar
+        threading.Thread(target=monitorar, daemon=True).start()
+
+    def parar_monitoramento(self):
+        if self._monitor is not None:
+            self._monitor.set()
+            self._monitor = None
@@ -0,0 +1,178 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# -----------------------------------------------------------------------------
+# MÉTRICAS (HISTOGRAMAS E CONTADORES) NO FORMATO TEXTO DO PROMETHEUS
+# -----------------------------------------------------------------------------
+# Histogramas de faixas fixas e contadores em memória, baratos o bastante
+# para ficar em cada requisição (um perf_counter, um bisect e um lock curto
+# por observação). Cada API tem o seu RegistroMetricas, com um prefixo
+# próprio, e o expõe em '/metrics'.
+
+# Faixas (em segundos) para latências: de 0,25 ms a 10 s
+FAIXAS_LATENCIA = (0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _formatar_rotulos(nomes, valores, extra=''):
+    pares = [f'{nome}="{str(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class _Metrica:
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock()
+
+    def _chave(self, valores_rotulos):
+        return tuple(valores_rotulos[nome] for nome in self.rotulos)
+
+
+class Contador(_Metrica):
+    """Contador que só cresce (ex.: erros da API externa, acertos do cache)."""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores = {}
+
+    def incrementar(self, quantidade=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + quantidade
+
+    def linhas(self):
+        with self._trava:
+            valores = dict(self._valores)
+        return [f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {valor}' for chave, valor in valores.items()]
+
+
+class Medidor(_Metrica):
+    """Valor lido na hora da coleta (ex.: se a API está pronta)."""
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, funcao):
+        super().__init__(nome, ajuda)
+        self.funcao = funcao
+
+    def linhas(self):
+        return [f'{self.nome} {float(self.funcao())}']
+
+
+class Histograma(_Metrica):
+    """Histograma de faixas fixas, com soma e contagem, por combinação de rótulos."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), faixas=FAIXAS_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.faixas = tuple(faixas)
+        self._series = {}  # chave dos rótulos -> [contagens por faixa (+Inf no fim), soma]
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        faixa = bisect_left(self.faixas, valor)
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.faixas) + 1), 0.0]
+            serie[0][faixa] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def linhas(self):
+        with self._trava:
+            series = {chave: (list(contagens), soma) for chave, (contagens, soma) in self._series.items()}
+        saida = []
+        for chave, (contagens, soma) in series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.faixas + ('+Inf',), contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, chave, 'le="%s"' % limite)
+                saida.append(f'{self.nome}_bucket{rotulos} {acumulado}')
+            saida.append(f'{self.nome}_sum{_formatar_rotulos(self.rotulos, chave)} {soma}')
+            saida.append(f'{self.nome}_count{_formatar_rotulos(self.rotulos, chave)} {acumulado}')
+        return saida
+
+
+class RegistroMetricas:
+    """As métricas de uma API; os nomes recebem o prefixo dela (ex.: 'mestra_')."""
+
+    def __init__(self, prefixo):
+        self.prefixo = prefixo
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(f'{self.prefixo}{nome}', ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), faixas=FAIXAS_LATENCIA):
+        return self._registrar(Histograma(f'{self.prefixo}{nome}', ajuda, rotulos, faixas))
+
+    def medidor(self, nome, ajuda, funcao):
+        return self._registrar(Medidor(f'{self.prefixo}{nome}', ajuda, funcao))
+
+    def texto_prometheus(self):
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            linhas.extend(metrica.linhas())
+        return '\n'.join(linhas) + '\n'
+
+
+def instrumentar_flask(app, registro, funcao_pronta):
+    """
+    Liga um app Flask ao registro: latência total e contagem de requisições
+    por rota e status (nos ganchos do Flask), '/metrics' no formato do
+    Prometheus e '/health', que responde 200 só quando 'funcao_pronta()'
+    for verdadeira (503 enquanto os artefatos não carregaram).
+    """
+    from flask import Response, g, jsonify, request
+
+    requisicoes = registro.histograma('requisicao_segundos', "Latência total da requisição.", ('rota',))
+    respostas = registro.contador('requisicoes_total', "Requisições atendidas.", ('rota', 'status'))
+    registro.medidor('pronta', "1 se a API carregou os artefatos e aceita requisições.", lambda: bool(funcao_pronta()))
+
+    @app.before_request
+    def _iniciar_cronometro():
+        g.inicio_requisicao = time.perf_counter()
+
+    @app.after_request
+    def _registrar_requisicao(resposta):
+        inicio = g.pop('inicio_requisicao', None)
+        # Rota pelo padrão ('/prever_risco/<string:nome_bairro>'), não pela URL: evita um rótulo por bairro
+        rota = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+        if inicio is not None:
+            requisicoes.observar(time.perf_counter() - inicio, rota=rota)
+        respostas.incrementar(rota=rota, status=resposta.status_code)
+        return resposta
+
+    @app.route('/metrics', methods=['GET'])
+    def metricas():
+        return Response(registro.texto_prometheus(), content_type=TIPO_CONTEUDO)
+
+    @app.route('/health', methods=['GET'])
+    def saude():
+        if funcao_pronta():
+            return jsonify({"status": "pronta"})
+        return jsonify({"status": "indisponivel"}), 503
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from LSTM.inferencia_numpy import NormalizacaoAfim, carregar_modelo_numpy, salvar_modelo_npz, carregar_modelo_npz
+
+# -----------------------------------------------------------------------------
+# PACOTE DE ARTEFATOS COMPILADOS
+# -----------------------------------------------------------------------------
+# Em vez de abrir o joblib do scaler, interpretar o Excel dos bairros e
+# reconstruir três modelos Keras a cada inicialização, compilamos tudo uma
+# vez num diretório de arquivos .npz (sem compressão, sem pickle), que
+# carregam em milissegundos e podem ser lidos em paralelo.
+#
+# Uso:  python pacote_artefatos.py   (a partir da raiz do projeto)
+
+DIRETORIO_PACOTE = 'artefatos_compilados'
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+# Mesmas fontes usadas pela api_mestra.py
+FONTE_SCALER = 'Treinar API models/scaler_features_dengue.joblib'
+FONTE_BAIRROS = 'DIC/dengue_classificados_clima.xlsx'
+FONTES_MODELOS = {
+    '1': 'Treinar API models/modelo_lstm_24h.keras',
+    '3': 'Treinar API models/modelo_lstm_3d.keras',
+    '5': 'Treinar API models/modelo_lstm_5d.keras',
+}
+
+
+def ler_tabela_bairros(caminho):
+    """Lê a planilha dos bairros com o índice normalizado (como a api_mestra faz)."""
+    df = pd.read_excel(caminho, sheet_name='Dados Dengue', index_col='BAIRRO')
+    df.index = df.index.astype(str).str.strip().str.upper()
+    return df
+
+
+# --- COMPILAÇÃO ---
+
+def _salvar_tabela_colunar(df, caminho):
+    """Grava o DataFrame coluna a coluna (números como números, textos como unicode fixo)."""
+    colunas = {'indice': df.index.to_numpy(dtype=str), 'nomes_colunas': np.array(df.columns, dtype=str)}
+    for i, coluna in enumerate(df.columns):
+        serie = df[coluna]
+        if pd.api.types.is_numeric_dtype(serie):
+            colunas[f'coluna{i}'] = serie.to_numpy()
+        else:
+            colunas[f'coluna{i}'] = serie.fillna('').to_numpy(dtype=str)
+    np.savez(caminho, **colunas)
+
+
+def compilar_pacote(destino=DIRETORIO_PACOTE):
+    """Gera o pacote a partir dos artefatos originais e grava o manifesto."""
+    import joblib
+
+    os.makedirs(destino, exist_ok=True)
+    arquivos = {}
+
+    scaler = joblib.load(FONTE_SCALER)
+    nomes = getattr(scaler, 'feature_names_in_', None)
+    np.savez(os.path.join(destino, 'scaler.npz'), scale_=scaler.scale_, min_=scaler.min_,
+             feature_names_in_=np.array(nomes if nomes is not None else [], dtype=str))
+    arquivos['scaler'] = 'scaler.npz'
+    print(f"  [OK] Normalizador '{FONTE_SCALER}' compilado.")
+
+    _salvar_tabela_colunar(ler_tabela_bairros(FONTE_BAIRROS), os.path.join(destino, 'bairros.npz'))
+    arquivos['bairros'] = 'bairros.npz'
+    print(f"  [OK] Tabela de bairros '{FONTE_BAIRROS}' compilada.")
+
+    for dias, fonte in FONTES_MODELOS.items():
+        nome_arquivo = f'modelo_{dias}d.npz'
+        salvar_modelo_npz(carregar_modelo_numpy(fonte), os.path.join(destino, nome_arquivo))
+        arquivos[f'modelo_{dias}'] = nome_arquivo
+        print(f"  [OK] Modelo '{fonte}' compilado.")
+
+    fontes = [FONTE_SCALER, FONTE_BAIRROS, *FONTES_MODELOS.values()]
+    manifesto = {
+        'criado_em': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'arquivos': arquivos,
+        'fontes': {fonte: os.path.getmtime(fonte) for fonte in fontes},
+    }
+    with open(os.path.join(destino, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    print(f"\nPacote compilado em '{destino}/'.")
+
+
+# --- CARREGAMENTO ---
+
+def ler_manifesto(destino=DIRETORIO_PACOTE):
+    """
+    Devolve o manifesto se o pacote existir e estiver em dia com as fontes;
+    None se não existir ou se algum artefato original for mais novo que ele.
+    """
+    caminho = os.path.join(destino, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        manifesto = json.load(f)
+    for fonte, mtime in manifesto['fontes'].items():
+        if os.path.exists(fonte) and os.path.getmtime(fonte) > mtime:
+            print(f"  [AVISO] '{fonte}' mudou depois da compilação; o pacote será ignorado.")
+            return None
+    return manifesto
+
+
+def carregar_scaler_pacote(manifesto, destino=DIRETORIO_PACOTE):
+    """O scaler compilado já como a NormalizacaoAfim usada na inferência (x * scale_ + min_)."""
+    with np.load(os.path.join(destino, manifesto['arquivos']['scaler'])) as arquivo:
+        return NormalizacaoAfim(arquivo['scale_'], arquivo['min_'])
+
+
+def carregar_bairros_pacote(manifesto, destino=DIRETORIO_PACOTE):
+    with np.load(os.path.join(destino, manifesto['arquivos']['bairros'])) as arquivo:
+        nomes_colunas = arquivo['nomes_colunas']
+        dados = {nome: arquivo[f'coluna{i}'] for i, nome in enumerate(nomes_colunas)}
+        return pd.DataFrame(dados, index=pd.Index(arquivo['indice'], name='BAIRRO'))
+
+
+def carregar_modelo_pacote(manifesto, dias, destino=DIRETORIO_PACOTE):
+    return carregar_modelo_npz(os.path.join(destino, manifesto['arquivos'][f'modelo_{dias}']))
+
+
+if __name__ == '__main__':
+    print("Compilando artefatos da API Mestra...")
+    compilar_pacote()
@@ -0,0 +1,194 @@
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+# -----------------------------------------------------------------------------
+# PERFILAMENTO SOB DEMANDA DE REQUISIÇÕES
+# -----------------------------------------------------------------------------
+# Para investigar UMA requisição lenta: com PERFIL_HABILITADO=1, quem manda o
+# cabeçalho 'X-Perfil' (ou '?perfil=') recebe a resposta normal com um
+# 'X-Trace-Id', e o perfil da requisição fica gravado em PERFIL_DIRETORIO
+# com esse ID no nome:
+#
+#   X-Perfil: cprofile   -> <data>_<trace>_<rota>.prof   (pstats; 'python -m pstats arquivo')
+#   X-Perfil: amostras   -> <data>_<trace>_<rota>.folded (pilhas colapsadas; flamegraph.pl, speedscope)
+#
+# Se PERFIL_TOKEN estiver definido, o valor precisa ser '<modo>:<token>'.
+# PERFIL_AMOSTRAGEM (ex.: 0.001) perfila essa fração do tráfego normal com o
+# amostrador de pilhas, que custa bem menos que o cProfile. Os arquivos mais
+# antigos são apagados quando o diretório passa de PERFIL_MAX_MB.
+#
+# O cProfile só enxerga a thread da requisição: o predict feito na thread de
+# um micro-lote aparece como espera. O amostrador olha apenas essa thread
+# também (no servidor asyncio, a do event loop, com as outras requisições).
+
+PERFIL_HABILITADO = os.environ.get('PERFIL_HABILITADO', '0') == '1'
+PERFIL_TOKEN = os.environ.get('PERFIL_TOKEN', '')
+PERFIL_AMOSTRAGEM = float(os.environ.get('PERFIL_AMOSTRAGEM', '0'))
+PERFIL_DIRETORIO = os.environ.get('PERFIL_DIRETORIO', 'perfis')
+PERFIL_MAX_MB = float(os.environ.get('PERFIL_MAX_MB', '50'))
+PERFIL_INTERVALO_MS = float(os.environ.get('PERFIL_INTERVALO_MS', '1'))
+
+CABECALHO_PERFIL = 'X-Perfil'
+PARAMETRO_PERFIL = 'perfil'
+CABECALHO_TRACE = 'X-Trace-Id'
+MODOS = ('cprofile', 'amostras')
+
+_trava_rotacao = threading.Lock()
+
+
+def escolher_modo(valor_pedido):
+    """
+    Decide se a requisição será perfilada e como. 'valor_pedido' é o
+    cabeçalho X-Perfil (ou o parâmetro ?perfil=), ou None. Devolve
+    'cprofile', 'amostras' ou None.
+    """
+    if not PERFIL_HABILITADO:
+        return None
+    if valor_pedido:
+        modo, _, token = valor_pedido.partition(':')
+        if PERFIL_TOKEN and token != PERFIL_TOKEN:
+            return None
+        return modo if modo in MODOS else 'cprofile'
+    if PERFIL_AMOSTRAGEM > 0 and random.random() < PERFIL_AMOSTRAGEM:
+        return 'amostras'
+    return None
+
+
+class AmostradorPilhas:
+    """
+    Perfilador por amostragem: uma thread lê a pilha da thread alvo a cada
+    'intervalo' segundos (sys._current_frames) e conta as pilhas iguais.
+    Não instrumenta chamada nenhuma, então o custo para a requisição é só o
+    do GIL disputado durante cada leitura.
+    """
+
+    def __init__(self, id_thread, intervalo=PERFIL_INTERVALO_MS / 1000):
+        self.id_thread = id_thread
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name='amostrador-perfil', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.id_thread)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})')
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def texto_colapsado(self):
+        """Formato 'f1;f2;f3 contagem' por linha, aceito por flamegraph.pl e speedscope."""
+        return ''.join(f'{pilha} {contagem}\n' for pilha, contagem in self.pilhas.most_common())
+
+
+class PerfilRequisicao:
+    """Perfil de uma requisição em andamento, do início ao fim da rota."""
+
+    def __init__(self, modo, rota):
+        self.modo = modo
+        self.rota = rota
+        self.trace_id = uuid.uuid4().hex[:16]
+        self._perfilador = None
+
+    def iniciar(self):
+        if self.modo == 'cprofile':
+            self._perfilador = cProfile.Profile()
+            try:
+                self._perfilador.enable()
+                return self
+            except ValueError:
+                # Python 3.12+: só um cProfile ativo por processo; cai no amostrador
+                self.modo = 'amostras'
+        self._perfilador = AmostradorPilhas(threading.get_ident())
+        self._perfilador.iniciar()
+        return self
+
+    def finalizar(self):
+        """Para o perfilador e grava o arquivo. Devolve o caminho (ou None se falhar)."""
+        if self.modo == 'cprofile':
+            self._perfilador.disable()
+        else:
+            self._perfilador.parar()
+        try:
+            return self._gravar()
+        except OSError as e:
+            print(f"ERRO ao gravar o perfil {self.trace_id}: {e}")
+            return None
+
+    def _gravar(self):
+        os.makedirs(PERFIL_DIRETORIO, exist_ok=True)
+        rota = ''.join(c if c.isalnum() else '_' for c in self.rota).strip('_') or 'raiz'
+        extensao = 'prof' if self.modo == 'cprofile' else 'folded'
+        caminho = os.path.join(PERFIL_DIRETORIO, f"{time.strftime('%Y%m%d_%H%M%S')}_{self.trace_id}_{rota}.{extensao}")
+        if self.modo == 'cprofile':
+            self._perfilador.dump_stats(caminho)
+        else:
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(self._perfilador.texto_colapsado())
+        rotacionar(PERFIL_DIRETORIO, PERFIL_MAX_MB * 1024 * 1024, manter=caminho)
+        return caminho
+
+
+def rotacionar(diretorio, limite_bytes, manter=None):
+    """Apaga os perfis mais antigos até o diretório caber em 'limite_bytes' (nunca apaga 'manter')."""
+    with _trava_rotacao:
+        arquivos = []
+        for entrada in os.scandir(diretorio):
+            if entrada.is_file() and entrada.name.endswith(('.prof', '.folded')) and entrada.path != manter:
+                info = entrada.stat()
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        if manter is not None:
+            total += os.path.getsize(manter)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= limite_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass  # outro processo já apagou
+            total -= tamanho
+
+
+def instrumentar_perfil_flask(app):
+    """Liga o perfilamento sob demanda às rotas de um app Flask (nada acontece com PERFIL_HABILITADO=0)."""
+    if not PERFIL_HABILITADO:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _iniciar_perfil():
+        modo = escolher_modo(request.headers.get(CABECALHO_PERFIL) or request.args.get(PARAMETRO_PERFIL))
+        if modo is not None:
+            rota = request.url_rule.rule if request.url_rule is not None else request.path
+            g.perfil = PerfilRequisicao(modo, rota).iniciar()
+
+    @app.teardown_request
+    def _finalizar_perfil(_erro):
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.finalizar()
+
+    @app.after_request
+    def _anunciar_trace(resposta):
+        perfil = g.get('perfil')
+        if perfil is not None:
+            resposta.headers[CABECALHO_TRACE] = perfil.trace_id
+        return resposta
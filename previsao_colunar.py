@@ -0,0 +1,133 @@
+import hashlib
+import io
+
+import numpy as np
+
+
+class PrevisaoColunar:
+    """
+    A lista de passos de 3h do '/forecast' convertida UMA vez em colunas NumPy.
+    Tanto a entrada do modelo quanto o resumo diário saem dessas colunas, e o
+    objeto fica guardado no cache junto com a previsão: requisições seguintes
+    não interpretam o JSON de novo.
+    """
+
+    def __init__(self, timestamps, datas, temp, temp_min, temp_max, umidade, chuva_3h, pop,
+                 codigo_descricao, descricoes):
+        self.timestamps = timestamps              # int64, epoch (s) de cada passo
+        self.datas = datas                        # 'AAAA-MM-DD' de cada passo (do dt_txt)
+        self.temp = temp
+        self.temp_min = temp_min
+        self.temp_max = temp_max
+        self.umidade = umidade
+        self.chuva_3h = chuva_3h
+        self.pop = pop
+        self.codigo_descricao = codigo_descricao  # índice em 'descricoes'
+        self.descricoes = descricoes
+        # Entrada do modelo [temperatura, umidade, chuva_mm]: os horizontes usam prefixos dela
+        self.clima = np.ascontiguousarray(np.column_stack([temp, umidade, chuva_3h]))
+        self._resumo = None
+        self._versao = None
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def sequencia_clima(self, seq_len):
+        """Os primeiros 'seq_len' passos de [temperatura, umidade, chuva_mm] (view, sem cópia)."""
+        return self.clima[:seq_len]
+
+    @property
+    def versao(self):
+        """
+        Hash do conteúdo da previsão, calculado uma vez. Só muda quando a
+        previsão muda de fato: buscar de novo os mesmos dados mantém a versão.
+        """
+        if self._versao is None:
+            h = hashlib.blake2b(digest_size=8)
+            for coluna in (self.timestamps, self.clima, self.temp_min, self.temp_max, self.pop, self.codigo_descricao):
+                h.update(np.ascontiguousarray(coluna).tobytes())
+            h.update('\0'.join(self.datas.tolist() + self.descricoes).encode('utf-8'))
+            self._versao = h.hexdigest()
+        return self._versao
+
+    def resumo_diario(self, dias_analise):
+        """Resumo por dia (min, max, prob. de chuva e tempo mais frequente), calculado uma vez."""
+        if self._resumo is None:
+            self._resumo = _resumir_por_dia(self)
+        return self._resumo[:dias_analise]
+
+
+def converter_previsao(dados_forecast):
+    """Percorre 'dados_forecast['list']' uma única vez e devolve a PrevisaoColunar."""
+    lista = dados_forecast.get('list', [])
+    n = len(lista)
+    timestamps = np.empty(n, dtype=np.int64)
+    numericos = np.empty((n, 6), dtype=np.float64)  # temp, temp_min, temp_max, umidade, chuva, pop
+    datas = []
+    codigos = np.empty(n, dtype=np.int32)
+    descricoes = {}
+
+    for i, previsao in enumerate(lista):
+        principal = previsao['main']
+        timestamps[i] = previsao.get('dt', 0)
+        datas.append(previsao['dt_txt'].split(' ')[0])
+        numericos[i] = (principal['temp'], principal['temp_min'], principal['temp_max'],
+                        principal['humidity'], previsao.get('rain', {}).get('3h', 0), previsao['pop'])
+        descricao = previsao['weather'][0]['description']
+        codigos[i] = descricoes.setdefault(descricao, len(descricoes))
+
+    return PrevisaoColunar(timestamps, np.array(datas, dtype=str), *numericos.T, codigos, list(descricoes))
+
+
+COLUNAS_SERIALIZADAS = ('timestamps', 'datas', 'temp', 'temp_min', 'temp_max', 'umidade', 'chuva_3h', 'pop',
+                        'codigo_descricao')
+
+
+def previsao_para_bytes(previsao):
+    """As colunas da PrevisaoColunar num .npz (sem pickle), para o cache compartilhado entre processos."""
+    buffer = io.BytesIO()
+    np.savez(buffer, descricoes=np.array(previsao.descricoes, dtype=str),
+             **{nome: getattr(previsao, nome) for nome in COLUNAS_SERIALIZADAS})
+    return buffer.getvalue()
+
+
+def previsao_de_bytes(dados):
+    """Inverso de 'previsao_para_bytes': a mesma previsão (e a mesma versão)."""
+    with np.load(io.BytesIO(dados), allow_pickle=False) as arquivo:
+        colunas = {nome: arquivo[nome] for nome in COLUNAS_SERIALIZADAS}
+        descricoes = arquivo['descricoes'].tolist()
+    return PrevisaoColunar(**colunas, descricoes=descricoes)
+
+
+def _resumir_por_dia(previsao):
+    """Agrupamento vetorizado por fronteira de dia (os passos vêm em ordem cronológica)."""
+    n = len(previsao)
+    if n == 0:
+        return []
+
+    datas = previsao.datas
+    inicios = np.flatnonzero(np.r_[True, datas[1:] != datas[:-1]])
+    minimas = np.minimum.reduceat(previsao.temp_min, inicios)
+    maximas = np.maximum.reduceat(previsao.temp_max, inicios)
+    # A maior probabilidade de chuva do dia é a mais importante
+    pops = np.maximum.reduceat(previsao.pop, inicios)
+
+    # Tempo mais frequente do dia; no empate vence o que apareceu primeiro no dia
+    dia_de_cada_passo = np.repeat(np.arange(len(inicios)), np.diff(np.r_[inicios, n]))
+    n_descricoes = len(previsao.descricoes)
+    contagens = np.zeros((len(inicios), n_descricoes), dtype=np.int64)
+    np.add.at(contagens, (dia_de_cada_passo, previsao.codigo_descricao), 1)
+    primeira_vez = np.full((len(inicios), n_descricoes), n, dtype=np.int64)
+    np.minimum.at(primeira_vez, (dia_de_cada_passo, previsao.codigo_descricao), np.arange(n))
+    mais_frequente = np.argmax(contagens * (n + 1) - primeira_vez, axis=1)
+
+    return [
+        {
+            "data": str(datas[inicio]),
+            "minima_c": float(minima),
+            "maxima_c": float(maxima),
+            "probabilidade_chuva_pct": round(float(pop) * 100, 2),  # Converte de 0.8 para 80
+            "resumo_tempo": previsao.descricoes[codigo]
+        }
+        for inicio, minima, maxima, pop, codigo in zip(inicios, minimas, maximas, pops, mais_frequente)
+    ]
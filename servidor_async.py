@@ -0,0 +1,236 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import ClientResponseError, web
+
+import api_dengue
+import api_mestra
+from api_mestra import ErroPedido
+from armazem_previsoes import registrar
+from cache_compartilhado import CachePrevisaoCompartilhada
+from cache_resultados import etag_corresponde, etag_da_chave
+from cliente_meteorologia import ClienteMeteorologiaAsync
+from metricas import TIPO_CONTEUDO
+from perfilamento import (CABECALHO_PERFIL, CABECALHO_TRACE, PARAMETRO_PERFIL, PERFIL_HABILITADO,
+                          PerfilRequisicao, escolher_modo)
+from previsao_colunar import converter_previsao
+
+# -----------------------------------------------------------------------------
+# SERVIDOR ASSÍNCRONO (asyncio + aiohttp)
+# -----------------------------------------------------------------------------
+# Serve as mesmas rotas da api_mestra.py e da api_dengue.py num único event
+# loop. As chamadas ao OpenWeatherMap são assíncronas (pool keep-alive,
+# timeouts, retentativas), então uma API lenta não prende uma thread por
+# requisição; a inferência do modelo roda num pool de threads separado,
+# fora do event loop.
+#
+# Uso:  python servidor_async.py   (a partir da raiz do projeto)
+
+PORTA = int(os.environ.get('PORTA', '5010'))
+THREADS_INFERENCIA = int(os.environ.get('THREADS_INFERENCIA', str(os.cpu_count() or 2)))
+
+executor_inferencia = ThreadPoolExecutor(max_workers=THREADS_INFERENCIA, thread_name_prefix='inferencia')
+cliente = ClienteMeteorologiaAsync(api_mestra.API_KEY_WEATHER)
+_buscas_em_andamento = {}  # (id do cache, local) -> asyncio.Task (single-flight dentro do event loop)
+
+
+async def _buscar_e_guardar(cache, endpoint, local, converter):
+    # Converte uma vez, antes de guardar (igual ao caminho síncrono)
+    with api_mestra.chamadas_externas.cronometrar(endpoint=endpoint):
+        try:
+            dados = await cliente.buscar(endpoint, local)
+        except Exception as e:
+            api_mestra.erros_externos.incrementar(endpoint=endpoint, tipo=type(e).__name__)
+            raise
+    # A gravação no SQLite é bloqueante (ainda que curta): fica fora do event loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, registrar, api_mestra.armazem_previsoes, endpoint, local, dados)
+    valor = converter(dados) if converter else dados
+    # Com o cache compartilhado, guardar também grava a versão nova no SQLite
+    await loop.run_in_executor(None, cache.guardar, local, valor)
+    return valor
+
+
+async def obter_cacheado(cache, endpoint, local, converter=None):
+    """Usa o mesmo cache das APIs Flask; na falta, só UMA busca assíncrona por cache e local."""
+    if isinstance(cache, CachePrevisaoCompartilhada):
+        # A versão gravada pelos outros processos é lida do SQLite: fora do event loop
+        await asyncio.get_running_loop().run_in_executor(None, cache.sincronizar, local)
+    valor = cache.consultar(local)
+    if valor is not None:
+        return valor
+    chave = (id(cache), local)
+    tarefa = _buscas_em_andamento.get(chave)
+    if tarefa is None:
+        tarefa = asyncio.ensure_future(_buscar_e_guardar(cache, endpoint, local, converter))
+        _buscas_em_andamento[chave] = tarefa
+        tarefa.add_done_callback(lambda _: _buscas_em_andamento.pop(chave, None))
+    # shield: se um cliente desconectar, a busca continua para os outros
+    return await asyncio.shield(tarefa)
+
+
+async def obter_previsao(local):
+    return await obter_cacheado(api_mestra.cache_previsao, 'forecast', local, converter_previsao)
+
+
+async def _em_thread(funcao, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor_inferencia, funcao, *args)
+
+
+def _erro(mensagem, status):
+    return web.json_response({"erro": mensagem}, status=status)
+
+
+async def _responder_com_cache(request, chave, calcular, *args):
+    """Mesmo cache de resultados e GET condicional das rotas Flask da api_mestra."""
+    etag = etag_da_chave(chave)
+    cabecalhos = api_mestra.cabecalhos_cache(etag)
+    if etag_corresponde(request.headers.get('If-None-Match'), etag):
+        api_mestra.consultas_resultados.incrementar(resultado='nao_modificado')
+        return web.Response(status=304, headers=cabecalhos)
+    # Acerto na memória é só uma consulta a dicionário: nem sai do event loop. A
+    # camada compartilhada (SQLite) só é lida na thread, por 'obter_resultado'
+    resposta = api_mestra.cache_resultados.obter_em_memoria(chave)
+    if resposta is not None:
+        api_mestra.consultas_resultados.incrementar(resultado='acerto')
+    else:
+        resposta = await _em_thread(api_mestra.obter_resultado, chave, calcular, *args)
+    return web.json_response(resposta, headers=cabecalhos)
+
+
+# --- ROTAS DA API MESTRA ---
+
+async def prever_risco(request):
+    if not api_mestra.api_pronta:
+        return _erro("Erro interno: A API não está pronta. Verifique os logs do servidor.", 500)
+
+    nome_bairro = request.match_info['nome_bairro']
+    periodo_dias = request.query.get('dias', '1')
+    try:
+        horizontes = api_mestra.validar_periodo(periodo_dias)
+        cidade = api_mestra.validar_cidade(request.query)
+        iip_do_bairro = api_mestra.validar_bairro(nome_bairro, cidade)
+        try:
+            previsao = await obter_previsao(cidade.local)
+        except Exception as e:
+            return _erro(f"Erro ao buscar dados de meteorologia: {e}", 502)
+        chave = api_mestra.chave_resultado('bairro', nome_bairro, periodo_dias, previsao, cidade)
+        return await _responder_com_cache(request, chave, api_mestra.calcular_risco_bairro, nome_bairro,
+                                          periodo_dias, horizontes, iip_do_bairro, previsao, cidade)
+    except ErroPedido as e:
+        return _erro(e.mensagem, e.status)
+
+
+async def prever_risco_lote(request):
+    if not api_mestra.api_pronta:
+        return _erro("Erro interno: A API não está pronta. Verifique os logs do servidor.", 500)
+
+    periodo_dias = request.query.get('dias', '1')
+    try:
+        horizontes = api_mestra.validar_periodo(periodo_dias)
+        cidade = api_mestra.validar_cidade(request.query)
+        try:
+            previsao = await obter_previsao(cidade.local)
+        except Exception as e:
+            return _erro(f"Erro ao buscar dados de meteorologia: {e}", 502)
+        chave = api_mestra.chave_resultado('lote', '', periodo_dias, previsao, cidade)
+        return await _responder_com_cache(request, chave, api_mestra.calcular_risco_lote, periodo_dias,
+                                          horizontes, previsao, cidade)
+    except ErroPedido as e:
+        return _erro(e.mensagem, e.status)
+
+
+# --- ROTA DA API DENGUE (alerta por regras) ---
+
+async def previsao_bairro(request):
+    cidade, erro = api_dengue.resolver_cidade_bairros(request.query)
+    if erro is not None:
+        return _erro(*erro)
+    indice = api_dengue.indices_bairros[cidade.id]
+    if indice is None:
+        return _erro("Erro interno: não foi possível carregar os dados dos bairros.", 500)
+
+    nome_bairro = request.match_info['nome_bairro']
+    info_bairro = indice.obter(nome_bairro)
+    if info_bairro is None:
+        return _erro(f"Bairro '{nome_bairro}' não encontrado na base de dados.", 404)
+
+    try:
+        # Tempo atual e previsão em paralelo
+        dados_weather, dados_forecast = await asyncio.gather(
+            obter_cacheado(api_dengue.cache_tempo_atual, 'weather', cidade.local),
+            obter_cacheado(api_dengue.cache_previsao, 'forecast', cidade.local))
+    except ClientResponseError as err:
+        return _erro(f"Erro ao buscar dados de meteorologia: {err}", 502)
+    except Exception as err:
+        return _erro(f"Erro de conexão com a API de meteorologia: {err}", 503)
+
+    return web.json_response(api_dengue.montar_resposta_previsao(nome_bairro, info_bairro, dados_weather, dados_forecast))
+
+
+async def listar_cidades(request):
+    return web.json_response(api_mestra.descrever_cidades())
+
+
+# --- MÉTRICAS E PRONTIDÃO ---
+
+async def metricas(request):
+    # Os registros das duas APIs (as etapas compartilhadas alimentam os mesmos histogramas)
+    texto = api_mestra.metricas.texto_prometheus() + api_dengue.metricas.texto_prometheus()
+    return web.Response(body=texto.encode('utf-8'), headers={'Content-Type': TIPO_CONTEUDO})
+
+
+async def saude(request):
+    if api_mestra.api_pronta:
+        return web.json_response({"status": "pronta"})
+    return web.json_response({"status": "indisponivel"}, status=503)
+
+
+@web.middleware
+async def cors(request, handler):
+    # Mesmo comportamento do flask_cors na api_mestra: a interface roda em outra origem
+    resposta = await handler(request)
+    resposta.headers['Access-Control-Allow-Origin'] = '*'
+    return resposta
+
+
+@web.middleware
+async def perfil(request, handler):
+    # Perfil sob demanda (ver perfilamento.py). No event loop, o perfil inclui
+    # o que as outras requisições executaram enquanto esta esperava.
+    modo = escolher_modo(request.headers.get(CABECALHO_PERFIL) or request.query.get(PARAMETRO_PERFIL))
+    if modo is None:
+        return await handler(request)
+    rota = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+    perfil_requisicao = PerfilRequisicao(modo, rota).iniciar()
+    try:
+        resposta = await handler(request)
+    finally:
+        perfil_requisicao.finalizar()
+    resposta.headers[CABECALHO_TRACE] = perfil_requisicao.trace_id
+    return resposta
+
+
+async def _fechar(app):
+    await cliente.fechar()
+    executor_inferencia.shutdown(wait=False)
+
+
+def criar_app():
+    app = web.Application(middlewares=[cors, perfil] if PERFIL_HABILITADO else [cors])
+    app.router.add_get('/prever_risco/{nome_bairro}', prever_risco)
+    app.router.add_get('/prever_risco_lote', prever_risco_lote)
+    app.router.add_get('/previsao/{nome_bairro}', previsao_bairro)
+    app.router.add_get('/cidades', listar_cidades)
+    app.router.add_get('/metrics', metricas)
+    app.router.add_get('/health', saude)
+    app.on_cleanup.append(_fechar)
+    return app
+
+
+if __name__ == '__main__':
+    if api_mestra.api_pronta:
+        web.run_app(criar_app(), port=PORTA)
+    else:
+        print("\n--- SERVIDOR NÃO INICIADO DEVIDO A ERROS DE CARREGAMENTO ---")
@@ -0,0 +1,276 @@
+import argparse
+import gc
+import importlib
+import itertools
+import os
+import random
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+# -----------------------------------------------------------------------------
+# SERVIDOR DE PRODUÇÃO PRÉ-FORK
+# -----------------------------------------------------------------------------
+# 'app.run(debug=True)' é para desenvolvimento: o reloader importa o módulo
+# duas vezes (carregando modelos e planilhas duas vezes) e tudo roda num único
+# processo. Aqui o mestre abre a porta, carrega os artefatos UMA vez e faz
+# fork de N workers, que herdam modelos, scaler e índices de bairros por cópia
+# na escrita (o gc.freeze() evita que a coleta de lixo suje essas páginas).
+#
+#   python servidor_producao.py mestra --workers 4 --porta 5010
+#   python servidor_producao.py dengue --workers 2
+#
+# Cada worker usa cpus / workers threads de BLAS (e de TensorFlow), para que
+# os N workers não disputem os mesmos núcleos; as variáveis já definidas no
+# ambiente (OMP_NUM_THREADS etc.) são respeitadas.
+#
+# Reciclagem sem derrubar requisições:
+#   --max-requisicoes N   o worker para de aceitar depois de ~N requisições
+#                         (+ até 10%, para não reciclarem todos juntos), termina
+#                         as que estão em andamento e o mestre o substitui
+#   kill -HUP <mestre>    substitui todos os workers, um a um
+#   kill -TERM <mestre>   encerra; os workers terminam o que estão atendendo
+#                         (até --tempo-gracioso segundos)
+# Os substitutos partem dos artefatos do mestre: modelos novos pedem reiniciar
+# o mestre (as planilhas de bairros se recarregam sozinhas em cada worker).
+#
+# O TensorFlow não sobrevive ao fork (o predict trava no processo filho). Por
+# isso a API mestra roda aqui com BACKEND_INFERENCIA=numpy por padrão; com
+# 'keras', cada worker carrega os seus modelos depois do fork, sem compartilhar
+# memória.
+#
+# Com mais de um worker, os caches de previsão e de resultados ficam num
+# arquivo comum em /dev/shm (CACHE_COMPARTILHADO; '' desliga): uma busca no
+# OpenWeatherMap e um cálculo por bairro valem para todos os workers. As
+# métricas são de cada worker: '/metrics' mostra o worker que atendeu.
+
+APIS = {
+    'mestra': {'modulo': 'api_mestra', 'porta': 5010, 'pronta': lambda api: api.api_pronta},
+    'dengue': {'modulo': 'api_dengue', 'porta': 5000, 'pronta': lambda api: api.indice_bairros is not None},
+}
+
+VARIAVEIS_THREADS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+                     'TF_NUM_INTRAOP_THREADS')
+
+# Código de saída do worker que não conseguiu carregar a API: o mestre desiste
+# em vez de reiniciá-lo em laço
+CODIGO_FALHA_CARGA = 3
+VIDA_MINIMA_SEGUNDOS = 1.0  # worker que morre antes disso é reiniciado com espera
+
+
+def configurar_threads(workers):
+    """Divide os núcleos entre os workers. Precisa rodar antes de importar NumPy/TensorFlow."""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    for variavel in VARIAVEIS_THREADS:
+        os.environ.setdefault(variavel, str(threads))
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+    return threads
+
+
+def abrir_soquete(host, porta, fila):
+    """Soquete de escuta do mestre; os workers herdam o mesmo e disputam o accept()."""
+    soquete = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    soquete.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    soquete.bind((host, porta))
+    soquete.listen(fila)
+    return soquete
+
+
+def executar_worker(config, api, soquete, args):
+    """Corpo do processo filho. Devolve o código de saída."""
+    for sinal in (signal.SIGINT, signal.SIGHUP):
+        signal.signal(sinal, signal.SIG_IGN)  # Ctrl+C e HUP são tratados pelo mestre
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    if api is None:
+        api = importlib.import_module(config['modulo'])
+        if not config['pronta'](api):
+            return CODIGO_FALHA_CARGA
+    else:
+        api.reiniciar_apos_fork()
+
+    def parar(*_):
+        # shutdown() espera o serve_forever sair: não pode rodar na thread dele
+        threading.Thread(target=servidor.shutdown, daemon=True).start()
+
+    aplicacao = api.app
+    if args.max_requisicoes:
+        limite = args.max_requisicoes + random.randint(0, args.max_requisicoes // 10)
+        atendidas = itertools.count(1)
+
+        def aplicacao(environ, start_response):
+            if next(atendidas) == limite:
+                parar()
+            return api.app(environ, start_response)
+
+    from werkzeug.serving import make_server
+    servidor = make_server(args.host, args.porta, aplicacao, threaded=True, fd=soquete.fileno())
+    # server_close() espera as requisições em andamento terminarem
+    servidor.daemon_threads = False
+    servidor.block_on_close = True
+    signal.signal(signal.SIGTERM, parar)
+    servidor.serve_forever()
+    servidor.server_close()
+    return 0
+
+
+class Mestre:
+    """Mantém 'workers' processos filhos vivos, recicla com SIGHUP e encerra com SIGTERM/SIGINT."""
+
+    def __init__(self, config, api, soquete, args):
+        self.config = config
+        self.api = api  # módulo já carregado (pré-carga) ou None
+        self.soquete = soquete
+        self.args = args
+        self.workers = {}       # pid -> (número, instante em que começou)
+        self.aposentados = set()  # pids que receberam SIGTERM numa reciclagem
+        self.encerrando = False
+        self.reciclar = False
+
+    def _iniciar_worker(self, numero):
+        pid = os.fork()
+        if pid == 0:
+            codigo = 1
+            try:
+                codigo = executar_worker(self.config, self.api, self.soquete, self.args)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(codigo)
+        self.workers[pid] = (numero, time.monotonic())
+        print(f"  [OK] Worker {numero} iniciado (pid {pid}).", flush=True)
+
+    def _recolher(self):
+        """Trata os workers que saíram. Devolve False se for preciso desistir."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return True
+            if pid == 0:
+                return True
+            numero, inicio = self.workers.pop(pid)
+            codigo = os.waitstatus_to_exitcode(status)
+            if pid in self.aposentados:
+                self.aposentados.discard(pid)
+                continue
+            if self.encerrando:
+                continue
+            if codigo == CODIGO_FALHA_CARGA:
+                print(f"ERRO: o worker {numero} não conseguiu carregar a API. Encerrando.", flush=True)
+                return False
+            motivo = "reciclado" if codigo == 0 else f"saiu com código {codigo}"
+            print(f"  Worker {numero} (pid {pid}) {motivo}; iniciando outro.", flush=True)
+            if time.monotonic() - inicio < VIDA_MINIMA_SEGUNDOS:
+                time.sleep(VIDA_MINIMA_SEGUNDOS)
+            self._iniciar_worker(numero)
+        return True
+
+    def _reciclar_todos(self):
+        """Um substituto por vez, antes de aposentar o antigo: a capacidade não cai."""
+        print("  Reciclando os workers...", flush=True)
+        for pid, (numero, _) in list(self.workers.items()):
+            if pid in self.aposentados:
+                continue
+            self._iniciar_worker(numero)
+            self.aposentados.add(pid)
+            os.kill(pid, signal.SIGTERM)
+
+    def _encerrar_workers(self):
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        prazo = time.monotonic() + self.args.tempo_gracioso
+        while self.workers and time.monotonic() < prazo:
+            self._recolher()
+            time.sleep(0.1)
+        for pid, (numero, _) in self.workers.items():
+            print(f"  Worker {numero} (pid {pid}) não terminou a tempo; encerrando à força.", flush=True)
+            os.kill(pid, signal.SIGKILL)
+
+    def executar(self):
+        def pedir_encerramento(*_):
+            self.encerrando = True
+
+        def pedir_reciclagem(*_):
+            self.reciclar = True
+
+        signal.signal(signal.SIGTERM, pedir_encerramento)
+        signal.signal(signal.SIGINT, pedir_encerramento)
+        signal.signal(signal.SIGHUP, pedir_reciclagem)
+
+        for numero in range(1, self.args.workers + 1):
+            self._iniciar_worker(numero)
+
+        codigo = 0
+        while not self.encerrando:
+            if self.reciclar:
+                self.reciclar = False
+                self._reciclar_todos()
+            if not self._recolher():
+                codigo = 1
+                break
+            time.sleep(0.2)
+
+        print("\nEncerrando os workers...", flush=True)
+        self.encerrando = True
+        self._encerrar_workers()
+        return codigo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de produção pré-fork das APIs Flask.")
+    parser.add_argument('api', choices=sorted(APIS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--porta', type=int, default=None, help="padrão: a porta de desenvolvimento da API")
+    parser.add_argument('--fila', type=int, default=1024, help="backlog do soquete de escuta")
+    parser.add_argument('--max-requisicoes', type=int, default=0,
+                        help="recicla o worker depois de ~N requisições (0 = nunca)")
+    parser.add_argument('--tempo-gracioso', type=float, default=30.0,
+                        help="segundos para os workers terminarem as requisições ao encerrar")
+    args = parser.parse_args()
+    config = APIS[args.api]
+    args.porta = args.porta or config['porta']
+
+    threads = configurar_threads(args.workers)
+    if args.workers > 1:
+        diretorio = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        os.environ.setdefault('CACHE_COMPARTILHADO', os.path.join(diretorio, 'analise_preditiva_cache.db'))
+    if args.api == 'mestra':
+        os.environ.setdefault('BACKEND_INFERENCIA', 'numpy')
+    pre_carga = os.environ.get('BACKEND_INFERENCIA') != 'keras' or args.api != 'mestra'
+
+    # A porta é aberta antes da carga: se estiver ocupada, falha na hora
+    soquete = abrir_soquete(args.host, args.porta, args.fila)
+
+    api = None
+    if pre_carga:
+        api = importlib.import_module(config['modulo'])
+        if not config['pronta'](api):
+            print("\n--- SERVIDOR NÃO INICIADO DEVIDO A ERROS DE CARREGAMENTO ---")
+            return 1
+        if 'tensorflow' in sys.modules:
+            print("ERRO: o TensorFlow foi carregado no mestre e travaria os workers. "
+                  "Use BACKEND_INFERENCIA=numpy (ou 'keras' para carregar em cada worker).")
+            return 1
+        api.preparar_fork()
+        # Tudo o que foi carregado até aqui sai do alcance do coletor de lixo:
+        # as páginas dos artefatos continuam compartilhadas entre os workers
+        gc.freeze()
+    else:
+        print("  [AVISO] Backend 'keras': cada worker carrega os seus modelos (sem memória compartilhada).")
+
+    print(f"\nMestre {os.getpid()}: {args.workers} worker(s) em http://{args.host}:{args.porta} "
+          f"({threads} thread(s) de BLAS por worker; artefatos "
+          f"{'compartilhados' if pre_carga else 'carregados em cada worker'}).", flush=True)
+    return Mestre(config, api, soquete, args).executar()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
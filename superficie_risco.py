@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# SUPERFÍCIE DE RISCO POR IIP
+# -----------------------------------------------------------------------------
+# Para uma mesma previsão e um mesmo horizonte, os bairros só diferem no IIP
+# que entra no modelo. Então, na primeira consulta de cada previsão, o modelo
+# roda UMA vez (um único lote) numa grade de IIPs e as consultas passam a ser
+# uma interpolação linear nessa curva, sem tocar no modelo.
+#
+# A curva só é aceita se o erro da interpolação, medido contra a inferência
+# exata nos pontos médios da grade e nos IIPs dos bairros conhecidos (no mesmo
+# lote), ficar dentro de 'erro_maximo'; senão a grade é refinada (pontos - 1
+# dobra) até 'pontos_maximos', e se ainda assim não couber o horizonte segue
+# na inferência exata. IIPs fora da grade, e valores tão perto do limiar de
+# ALTO/BAIXO que o erro poderia trocar o nível, também vão para a exata.
+
+
+class CurvaRisco:
+    """Risco x IIP de uma previsão num horizonte (grade crescente)."""
+
+    def __init__(self, grade, riscos, erro_medido):
+        self.grade = grade
+        self.riscos = riscos
+        self.erro_medido = erro_medido
+
+    def interpolar(self, iips):
+        """(riscos interpolados, máscara dos IIPs fora da grade)."""
+        fora = (iips < self.grade[0]) | (iips > self.grade[-1])
+        return np.interp(iips, self.grade, self.riscos), fora
+
+
+class SuperficiesRisco:
+    """
+    Curvas por (versão da previsão, horizonte), montadas sob demanda e
+    guardadas para as últimas 'max_curvas'. 'prever(sequencia_clima, iips,
+    horizontes)' é a inferência exata ({dias: probabilidades}).
+    """
+
+    def __init__(self, prever, limites_iip, pontos=65, erro_maximo=0.001, pontos_maximos=1025,
+                 limiar=0.5, max_curvas=32):
+        self.prever = prever
+        self.iip_min, self.iip_max = limites_iip
+        self.pontos = pontos
+        self.erro_maximo = erro_maximo
+        self.pontos_maximos = pontos_maximos
+        self.limiar = limiar
+        self.max_curvas = max_curvas
+        self._curvas = OrderedDict()  # (versão, dias) -> CurvaRisco, ou None se não coube no erro
+        self._trava = threading.Lock()
+        self._trava_montagem = threading.Lock()
+        self.linhas_interpoladas = 0
+        self.linhas_exatas = 0
+
+    def _montar(self, sequencia_clima, dias, iips_conferir):
+        """Grade, pontos médios e IIPs a conferir numa única inferência; refina enquanto o erro não couber."""
+        conferir_bairros = iips_conferir[(iips_conferir >= self.iip_min) & (iips_conferir <= self.iip_max)]
+        pontos = self.pontos
+        while True:
+            grade = np.linspace(self.iip_min, self.iip_max, pontos)
+            conferir = np.concatenate([(grade[:-1] + grade[1:]) / 2, conferir_bairros])
+            exatos = self.prever(sequencia_clima, np.concatenate([grade, conferir]), [dias])[dias]
+            riscos = np.array(exatos[:pontos], dtype=float)
+            erro = float(np.max(np.abs(np.interp(conferir, grade, riscos) - exatos[pontos:])))
+            if erro <= self.erro_maximo:
+                print(f"  [OK] Superfície de risco de {dias} dia(s): {pontos} pontos, erro {erro:.2e}.")
+                return CurvaRisco(grade, riscos, erro)
+            if pontos >= self.pontos_maximos:
+                print(f"  [AVISO] Superfície de risco de {dias} dia(s) com erro {erro:.2e} > {self.erro_maximo} "
+                      f"mesmo com {pontos} pontos; usando a inferência exata.")
+                return None
+            pontos = 2 * pontos - 1
+
+    def curva(self, versao, sequencia_clima, dias, iips_conferir=()):
+        """Curva do horizonte 'dias' para a previsão 'versao' (montada na primeira chamada), ou None."""
+        chave = (versao, dias)
+        with self._trava:
+            if chave in self._curvas:
+                self._curvas.move_to_end(chave)
+                return self._curvas[chave]
+        # Uma montagem por vez: quem chegar junto espera e reaproveita a curva pronta
+        with self._trava_montagem:
+            with self._trava:
+                if chave in self._curvas:
+                    return self._curvas[chave]
+            curva = self._montar(sequencia_clima, dias, np.asarray(iips_conferir, dtype=float))
+            with self._trava:
+                self._curvas[chave] = curva
+                while len(self._curvas) > self.max_curvas:
+                    self._curvas.popitem(last=False)
+            return curva
+
+    def prever_iips(self, versao, sequencia_clima, iips, horizontes, iips_conferir=()):
+        """
+        ({dias: probabilidades} dos 'iips', linhas que foram para a inferência
+        exata), interpolando onde a curva garante o erro máximo.
+        """
+        iips = np.asarray(iips, dtype=float)
+        probabilidades = {}
+        total_exatas = 0
+        for dias in horizontes:
+            curva = self.curva(versao, sequencia_clima, dias, iips_conferir)
+            if curva is None:
+                exatas = np.ones(len(iips), dtype=bool)
+                riscos = np.empty(len(iips))
+            else:
+                riscos, exatas = curva.interpolar(iips)
+                exatas |= np.abs(riscos - self.limiar) <= self.erro_maximo
+            if exatas.any():
+                riscos[exatas] = self.prever(sequencia_clima, iips[exatas], [dias])[dias]
+            probabilidades[dias] = riscos
+            n_exatas = int(exatas.sum())
+            total_exatas += n_exatas
+            with self._trava:
+                self.linhas_exatas += n_exatas
+                self.linhas_interpoladas += len(iips) - n_exatas
+        return probabilidades, total_exatas
+
+    def estatisticas(self):
+        with self._trava:
+            curvas = [
+                {'previsao': versao, 'horizonte': dias, 'pontos': len(curva.grade) if curva else None,
+                 'erro_medido': curva.erro_medido if curva else None}
+                for (versao, dias), curva in self._curvas.items()
+            ]
+            return {'erro_maximo': self.erro_maximo, 'linhas_interpoladas': self.linhas_interpoladas,
+                    'linhas_exatas': self.linhas_exatas, 'curvas': curvas}